@@ -0,0 +1,212 @@
+import asyncio
+import logging
+import math
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+
+from observability import LLM_ADMISSION_REJECTED, LLM_ADMISSION_WAIT
+
+logger = logging.getLogger(__name__)
+
+
+class Overloaded(Exception):
+    """
+    Raised instead of waiting longer: the lane's queue is full, or no slot
+    came free within the caller's timeout. `retry_after` is a hint in
+    whole seconds.
+    """
+
+    def __init__(self, lane: str, reason: str, retry_after: int):
+        super().__init__(f"LLM backend busy ({reason} in the {lane} lane); retry after {retry_after}s.")
+        self.lane = lane
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class _Waiter:
+    __slots__ = ("lane", "wake", "enqueued_at", "granted")
+
+    def __init__(self, lane: str, wake):
+        self.lane = lane
+        self.wake = wake
+        self.enqueued_at = time.monotonic()
+        self.granted = False
+
+
+class AdmissionController:
+    """
+    Gate in front of the LLM backend, shared by every kind of call.
+
+    A call needs a token from a bucket refilled at `per_minute` tokens a
+    minute (holding at most `burst`), and one of `max_concurrent` slots,
+    held until `release()`. Waiting calls are admitted by lane in the order
+    of `lanes`, so queued RAG answers go before summaries and crew calls,
+    and first come first served within a lane. A lane holds at most
+    `max_queued` waiting calls; more are rejected with `Overloaded` straight
+    away rather than piling up retries against the provider.
+
+    Usable from threads (`acquire`, `slot`) and from the event loop
+    (`acquire_async`, `async_slot`).
+    """
+
+    def __init__(self, max_concurrent: int = 8, per_minute: int = 60, burst: int = 10, max_queued: int = 50,
+                 lanes=("rag", "summary", "crew")):
+        self.max_concurrent = max_concurrent
+        self.rate = per_minute / 60.0
+        self.burst = burst
+        self.max_queued = max_queued
+        self.lanes = tuple(lanes)
+        self._lock = threading.Lock()
+        self._queues = {lane: deque() for lane in self.lanes}
+        self._in_flight = 0
+        self._tokens = float(burst)
+        self._refilled_at = time.monotonic()
+        self._timer = None
+        self._counters = {
+            lane: {"admitted": 0, "rejected": 0, "wait_s": 0.0} for lane in self.lanes
+        }
+
+    def _refill(self, now: float):
+        self._tokens = min(self.burst, self._tokens + (now - self._refilled_at) * self.rate)
+        self._refilled_at = now
+
+    def _retry_after(self, lane: str) -> int:
+        # Calls ahead of a new one in `lane`, at the bucket's rate
+        ahead = sum(len(self._queues[other]) for other in self.lanes[:self.lanes.index(lane) + 1])
+        return max(1, math.ceil((ahead + 1 - self._tokens) / self.rate))
+
+    def _reject(self, lane: str, reason: str) -> Overloaded:
+        # Called with the lock held
+        self._counters[lane]["rejected"] += 1
+        LLM_ADMISSION_REJECTED.labels(lane, reason).inc()
+        return Overloaded(lane, reason, self._retry_after(lane))
+
+    def _enqueue(self, lane: str, wake) -> _Waiter:
+        if lane not in self._queues:
+            raise ValueError(f"Unknown lane {lane!r}; expected one of {self.lanes}.")
+        with self._lock:
+            if len(self._queues[lane]) >= self.max_queued:
+                raise self._reject(lane, "queue_full")
+            waiter = _Waiter(lane, wake)
+            self._queues[lane].append(waiter)
+            self._dispatch()
+            return waiter
+
+    def _dispatch(self):
+        # Called with the lock held: admit waiters while slots and tokens last
+        while self._in_flight < self.max_concurrent:
+            queue = next((self._queues[lane] for lane in self.lanes if self._queues[lane]), None)
+            if queue is None:
+                return
+            now = time.monotonic()
+            self._refill(now)
+            if self._tokens < 1:
+                self._schedule((1 - self._tokens) / self.rate)
+                return
+            waiter = queue.popleft()
+            self._tokens -= 1
+            self._in_flight += 1
+            waiter.granted = True
+            waited = now - waiter.enqueued_at
+            counters = self._counters[waiter.lane]
+            counters["admitted"] += 1
+            counters["wait_s"] += waited
+            LLM_ADMISSION_WAIT.labels(waiter.lane).observe(waited)
+            waiter.wake()
+
+    def _schedule(self, delay: float):
+        # One timer admits the next waiter once the bucket has a token again
+        if self._timer is None:
+            self._timer = threading.Timer(delay, self._on_timer)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _on_timer(self):
+        with self._lock:
+            self._timer = None
+            self._dispatch()
+
+    def _withdraw(self, waiter: _Waiter) -> bool:
+        """
+        Take a waiter out of its queue; False if it was admitted meanwhile.
+        """
+        with self._lock:
+            if waiter.granted:
+                return False
+            self._queues[waiter.lane].remove(waiter)
+            return True
+
+    def _timed_out(self, waiter: _Waiter) -> Overloaded:
+        with self._lock:
+            return self._reject(waiter.lane, "timeout")
+
+    def release(self):
+        with self._lock:
+            self._in_flight -= 1
+            self._dispatch()
+
+    def acquire(self, lane: str, timeout: float = None) -> float:
+        """
+        Block until admitted; returns the seconds waited. Raises Overloaded
+        if the lane is full or `timeout` passes first.
+        """
+        admitted = threading.Event()
+        waiter = self._enqueue(lane, admitted.set)
+        if not admitted.wait(timeout) and self._withdraw(waiter):
+            raise self._timed_out(waiter)
+        return time.monotonic() - waiter.enqueued_at
+
+    async def acquire_async(self, lane: str, timeout: float = None) -> float:
+        """
+        Same as acquire(), without blocking the event loop.
+        """
+        loop = asyncio.get_running_loop()
+        admitted = loop.create_future()
+
+        def wake():
+            # Runs on whichever thread admitted the waiter
+            loop.call_soon_threadsafe(lambda: admitted.done() or admitted.set_result(None))
+
+        waiter = self._enqueue(lane, wake)
+        if not waiter.granted:
+            try:
+                await asyncio.wait_for(asyncio.shield(admitted), timeout)
+            except asyncio.TimeoutError:
+                if self._withdraw(waiter):
+                    raise self._timed_out(waiter)
+            except asyncio.CancelledError:
+                # The client went away; give the slot back if it was granted meanwhile
+                if not self._withdraw(waiter):
+                    self.release()
+                raise
+        return time.monotonic() - waiter.enqueued_at
+
+    @contextmanager
+    def slot(self, lane: str, timeout: float = None):
+        waited = self.acquire(lane, timeout)
+        try:
+            yield waited
+        finally:
+            self.release()
+
+    @asynccontextmanager
+    async def async_slot(self, lane: str, timeout: float = None):
+        waited = await self.acquire_async(lane, timeout)
+        try:
+            yield waited
+        finally:
+            self.release()
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._refill(time.monotonic())
+            stats = {"in_flight": self._in_flight, "tokens": round(self._tokens, 2)}
+            for lane in self.lanes:
+                counters = self._counters[lane]
+                stats[f"{lane}_queued"] = len(self._queues[lane])
+                stats[f"{lane}_admitted"] = counters["admitted"]
+                stats[f"{lane}_rejected"] = counters["rejected"]
+                stats[f"{lane}_avg_wait_s"] = round(counters["wait_s"] / counters["admitted"], 3) if counters["admitted"] else 0.0
+            return stats
@@ -1,10 +1,16 @@
-from crewai import Agent
+import os
+
+from crewai import Agent, LLM
 from tools import any_website_tool
 from dotenv import load_dotenv
+from crew_llm import AdmittedLLM
 
 # Load environment variables
 load_dotenv()
 
+# crewai's default model, with every call admitted through the shared LLM gate
+crew_llm = AdmittedLLM(LLM(model=os.getenv("MODEL") or os.getenv("OPENAI_MODEL_NAME") or "gpt-4o-mini"))
+
 # Create a senior travel content researcher
 travel_itinerary_researcher = Agent(
     role="Travel Itinerary Researcher",
@@ -19,6 +25,7 @@ travel_itinerary_researcher = Agent(
         "building detailed day-by-day itineraries, and providing actionable insights for travelers."
     ),
     tools=[any_website_tool],  # Replace this with appropriate web scraping or content extraction tools
+    llm=crew_llm,
     allow_delegation=True,
 )
 
@@ -37,5 +44,6 @@ travel_itinerary_writer = Agent(
         "and accommodation recommendations."
     ),
     tools=[any_website_tool],  # Replace or extend with relevant tools for drafting and formatting itineraries
+    llm=crew_llm,
     allow_delegation=False,
 )
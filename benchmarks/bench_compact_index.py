@@ -0,0 +1,239 @@
+"""
+Compact index benchmark: builds a Chroma store, exports it with
+compact_index.export_index() and compares the two on the same queries:
+
+- recall@k against exact float32 brute force, and how many of Chroma's
+  top k the compact index also returns
+- query latency p50/p95
+- cold start: a fresh interpreter opening the index and answering its
+  first query, and the memory that took
+- bytes on disk
+
+    python benchmarks/bench_compact_index.py
+    python benchmarks/bench_compact_index.py --synthetic 100000 --dtypes int8 --rescore-factor 8
+    python benchmarks/bench_compact_index.py --corpus fixtures --space cosine
+    python benchmarks/bench_compact_index.py --compare benchmarks/results/compact-abc1234.json benchmarks/results/compact-def5678.json
+
+The synthetic corpus is clustered random vectors of the embedding model's
+dimension, queried with noisy copies of corpus vectors; the fixture corpus
+is the saved pages and questions embedded with the hashing embedder.
+"""
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+from langchain.vectorstores import Chroma
+
+from bench_rag import FIXTURES, StageTimer, build_index, compare, directory_size, git_commit
+
+ROOT = Path(__file__).resolve().parent.parent
+RESULTS = Path(__file__).resolve().parent / "results"
+
+sys.path.insert(0, str(ROOT))
+
+from compact_index import CompactIndex, export_index  # noqa: E402
+from providers import HashingEmbeddings  # noqa: E402
+
+PROBE = """
+import json, sys, time
+import numpy as np
+sys.path.insert(0, {root!r})
+query = np.load({query!r})
+start = time.perf_counter()
+{open}
+opened = time.perf_counter()
+{search}
+done = time.perf_counter()
+# Resident memory, and the part of it no other process can share (Linux; in kB)
+memory = {{}}
+for name in ("status", "smaps_rollup"):
+    with open(f"/proc/self/{{name}}") as f:
+        for line in f:
+            key, value = line.split(":", 1)
+            memory[key] = int(value.split()[0]) if value.strip().endswith("kB") else 0
+print(json.dumps({{
+    "open_ms": (opened - start) * 1000,
+    "first_query_ms": (done - opened) * 1000,
+    "rss_mb": memory["VmRSS"] / 1024,
+    "private_mb": (memory["Private_Clean"] + memory["Private_Dirty"]) / 1024,
+}}))
+"""
+OPEN_CHROMA = """
+from langchain.vectorstores import Chroma
+collection = Chroma(persist_directory={directory!r})._collection
+"""
+SEARCH_CHROMA = "collection.query(query_embeddings=[query.tolist()], n_results={k}, include=['distances'])"
+OPEN_COMPACT = """
+from compact_index import CompactIndex
+index = CompactIndex({directory!r}, None)
+"""
+SEARCH_COMPACT = "index.search(query, {k})"
+
+
+def synthetic_corpus(args, rng) -> tuple:
+    # Clusters of nearby vectors, like chunks of the same pages, with queries near corpus rows
+    centers = rng.normal(size=(max(1, args.synthetic // 50), args.dim)).astype(np.float32)
+    vectors = centers[rng.integers(len(centers), size=args.synthetic)]
+    vectors += rng.normal(scale=0.5, size=vectors.shape).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    queries = vectors[rng.integers(args.synthetic, size=args.queries)]
+    queries = queries + rng.normal(scale=0.02, size=queries.shape).astype(np.float32)
+    return vectors, queries / np.linalg.norm(queries, axis=1, keepdims=True)
+
+
+def build_chroma(args, directory: str, rng) -> tuple:
+    metadata = {"hnsw:space": args.space}
+    if args.corpus == "fixtures":
+        embedding_model = HashingEmbeddings(dim=args.dim)
+        build_args = argparse.Namespace(site_dir=args.site_dir, chunk_size=1000, chunk_overlap=100, batch_size=64)
+        # build_index() creates the store with Chroma's default space; recreate it in --space
+        vector_store, _ = build_index(build_args, embedding_model, StageTimer(), directory + "-build")
+        data = vector_store.get(include=["embeddings", "documents", "metadatas"])
+        vector_store._client.close()
+        store = Chroma(persist_directory=directory, collection_metadata=metadata)
+        store._collection.add(
+            ids=data["ids"], embeddings=data["embeddings"], documents=data["documents"], metadatas=data["metadatas"]
+        )
+        questions = [item["question"] for item in json.loads(Path(args.questions).read_text())]
+        queries = np.asarray(embedding_model.embed_documents(questions), dtype=np.float32)
+        return store, queries
+
+    vectors, queries = synthetic_corpus(args, rng)
+    store = Chroma(persist_directory=directory, collection_metadata=metadata)
+    for start in range(0, len(vectors), 5000):
+        rows = range(start, min(start + 5000, len(vectors)))
+        store._collection.add(
+            ids=[f"row-{i}" for i in rows], embeddings=vectors[rows.start:rows.stop],
+            documents=[f"Chunk {i}" for i in rows], metadatas=[{"row": i} for i in rows],
+        )
+    return store, queries
+
+
+def exact_top_k(vectors: np.ndarray, query: np.ndarray, space: str, k: int) -> np.ndarray:
+    if space == "l2":
+        distances = ((vectors - query) ** 2).sum(axis=1)
+    elif space == "cosine":
+        distances = 1 - vectors @ query / (np.linalg.norm(vectors, axis=1) * np.linalg.norm(query))
+    else:
+        distances = 1 - vectors @ query
+    return np.argsort(distances, kind="stable")[:k]
+
+
+def latency_summary(seconds: list) -> dict:
+    values = np.array(seconds) * 1000
+    return {f"p{q}_ms": round(float(np.percentile(values, q)), 3) for q in (50, 95)}
+
+
+def cold_start(open_code: str, search_code: str, query_path: str, repeat: int) -> dict:
+    runs = []
+    for _ in range(repeat):
+        code = PROBE.format(root=str(ROOT), query=query_path, open=open_code, search=search_code)
+        completed = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+        runs.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+    return {key: round(float(np.median([run[key] for run in runs])), 1) for key in runs[0]}
+
+
+def run(args) -> dict:
+    rng = np.random.default_rng(args.seed)
+    with tempfile.TemporaryDirectory() as workdir:
+        chroma_dir = str(Path(workdir) / "chroma")
+        start = time.perf_counter()
+        store, queries = build_chroma(args, chroma_dir, rng)
+        build_s = time.perf_counter() - start
+        query_path = str(Path(workdir) / "query.npy")
+        np.save(query_path, queries[0])
+        k = args.k
+
+        exports = {}
+        for dtype in args.dtypes:
+            manifest = export_index(store, str(Path(workdir) / f"compact-{dtype}"), dtype=dtype)
+            exports[dtype] = (CompactIndex(str(Path(workdir) / f"compact-{dtype}"), None, args.rescore_factor), manifest)
+        # Exported rows are in the order the store returned them; ground truth uses the same rows
+        reference, _ = next(iter(exports.values()))
+        ids = reference.get(include=[])["ids"]
+        exact = np.asarray(reference.exact, dtype=np.float32)
+        truth = [{ids[row] for row in exact_top_k(exact, query, args.space, k)} for query in queries]
+
+        chroma_latencies, chroma_results = [], []
+        for query in queries:
+            start = time.perf_counter()
+            result = store._collection.query(query_embeddings=[query.tolist()], n_results=k, include=["distances"])
+            chroma_latencies.append(time.perf_counter() - start)
+            chroma_results.append(set(result["ids"][0]))
+        store._client.close()
+        results = {
+            "chroma": {
+                "recall_at_k": round(float(np.mean([len(r & t) / k for r, t in zip(chroma_results, truth)])), 4),
+                "latency": latency_summary(chroma_latencies),
+                "cold_start": cold_start(
+                    OPEN_CHROMA.format(directory=chroma_dir), SEARCH_CHROMA.format(k=k), query_path, args.cold_repeat
+                ),
+                "disk_bytes": directory_size(chroma_dir),
+            }
+        }
+        for dtype, (index, manifest) in exports.items():
+            latencies, found = [], []
+            for query in queries:
+                start = time.perf_counter()
+                rows, _ = index.search(query, k)
+                latencies.append(time.perf_counter() - start)
+                found.append({ids[row] for row in rows})
+            directory = str(index.directory)
+            results[f"compact_{dtype}"] = {
+                "recall_at_k": round(float(np.mean([len(f & t) / k for f, t in zip(found, truth)])), 4),
+                "overlap_with_chroma": round(float(np.mean([len(f & c) / k for f, c in zip(found, chroma_results)])), 4),
+                "latency": latency_summary(latencies),
+                "cold_start": cold_start(
+                    OPEN_COMPACT.format(directory=directory), SEARCH_COMPACT.format(k=k), query_path, args.cold_repeat
+                ),
+                "disk_bytes": directory_size(directory),
+                "scanned_bytes": (index.directory / "vectors.npy").stat().st_size,
+                "export_s": manifest["export_s"],
+            }
+
+    config = {
+        "corpus": args.corpus, "rows": len(ids), "dim": int(exact.shape[1]), "queries": len(queries),
+        "space": args.space, "k": k, "rescore_factor": args.rescore_factor, "seed": args.seed,
+    }
+    return {
+        "commit": git_commit(), "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "config": config,
+        "chroma_build_s": round(build_s, 3), **results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", choices=["synthetic", "fixtures"], default="synthetic")
+    parser.add_argument("--synthetic", type=int, default=20000, help="rows in the synthetic corpus")
+    parser.add_argument("--dim", type=int, default=384, help="vector dimension (all-MiniLM-L6-v2 has 384)")
+    parser.add_argument("--queries", type=int, default=200, help="synthetic queries")
+    parser.add_argument("--site-dir", default=str(FIXTURES / "site"), help="saved HTML pages for --corpus fixtures")
+    parser.add_argument("--questions", default=str(FIXTURES / "questions.json"))
+    parser.add_argument("--space", choices=["l2", "cosine", "ip"], default="l2", help="Chroma distance (app default: l2)")
+    parser.add_argument("--dtypes", nargs="+", choices=["int8", "float16"], default=["int8", "float16"])
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--rescore-factor", type=int, default=4, help="shortlist size as a multiple of k")
+    parser.add_argument("--cold-repeat", type=int, default=3, help="fresh interpreters per cold start measurement")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="JSON results path (default benchmarks/results/compact-<commit>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="print two saved results side by side")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+    results = run(args)
+    output = Path(args.output or RESULTS / f"compact-{results['commit']}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2))
+    print(json.dumps(results, indent=2))
+    print(f"Saved {output}")
+
+
+if __name__ == "__main__":
+    main()
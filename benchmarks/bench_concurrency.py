@@ -0,0 +1,117 @@
+"""
+Fire N concurrent questions at two versions of the /get_response/ handler,
+built on the same ChainRegistry, with a slow stand-in retriever and LLM:
+
+  blocking     - sync `invoke` inside `async def` (the old handler)
+  non-blocking - `ainvoke`, with sync work on a BlockingExecutor
+
+    python benchmarks/bench_concurrency.py --requests 20 --llm-ms 300 --retriever-ms 50
+"""
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+import httpx
+from fastapi import FastAPI
+from langchain_core.documents import Document
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.retrievers import BaseRetriever
+from pydantic import BaseModel
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from chain_registry import ChainRegistry  # noqa: E402
+from concurrency import BlockingExecutor  # noqa: E402
+
+
+class SlowChatModel(BaseChatModel):
+    latency: float = 0.3
+
+    @property
+    def _llm_type(self) -> str:
+        return "slow-stand-in"
+
+    def _result(self) -> ChatResult:
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="Try the Goan fish curry."))])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        time.sleep(self.latency)
+        return self._result()
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        await asyncio.sleep(self.latency)
+        return self._result()
+
+
+class SlowRetriever(BaseRetriever):
+    latency: float = 0.05
+
+    def _get_relevant_documents(self, query, *, run_manager=None):
+        time.sleep(self.latency)
+        return [Document(page_content="Goa is known for seafood.", metadata={"source": "stand-in"})]
+
+
+class UserInput(BaseModel):
+    question: str
+
+
+def make_app(llm_latency: float, retriever_latency: float) -> FastAPI:
+    registry = ChainRegistry(
+        retriever_factory=lambda vector_store: SlowRetriever(latency=retriever_latency),
+        llm_factory=lambda **config: SlowChatModel(latency=llm_latency),
+        prompt_factory=lambda: ChatPromptTemplate.from_messages([("system", "{context}"), ("user", "{input}")]),
+        llm_config={},
+    )
+    executor = BlockingExecutor(32, "bench")
+    vector_store = object()
+    app = FastAPI()
+
+    @app.post("/blocking/")
+    async def blocking(user_input: UserInput):
+        response = registry.get(vector_store).invoke({"input": user_input.question})
+        return {"answer": response["answer"]}
+
+    @app.post("/non_blocking/")
+    async def non_blocking(user_input: UserInput):
+        chain = await executor.run(registry.get, vector_store)
+        response = await chain.ainvoke({"input": user_input.question})
+        return {"answer": response["answer"]}
+
+    return app
+
+
+async def fire(app: FastAPI, path: str, requests: int) -> float:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        await client.post(path, json={"question": "warm up"})
+        start = time.perf_counter()
+        responses = await asyncio.gather(*[
+            client.post(path, json={"question": f"where to eat in goa {i}"}) for i in range(requests)
+        ])
+        elapsed = time.perf_counter() - start
+    assert all(response.status_code == 200 for response in responses)
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--llm-ms", type=float, default=300.0)
+    parser.add_argument("--retriever-ms", type=float, default=50.0)
+    args = parser.parse_args()
+
+    app = make_app(args.llm_ms / 1000, args.retriever_ms / 1000)
+    single = (args.llm_ms + args.retriever_ms) / 1000
+    for path in ["/blocking/", "/non_blocking/"]:
+        elapsed = asyncio.run(fire(app, path, args.requests))
+        print(f"{path:<15} {args.requests} concurrent requests in {elapsed:.2f}s "
+              f"({elapsed / single:.1f}x the latency of one request)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Crawl a local stand-in site of synthetic pages, sequentially and with the
+concurrent Crawler, and print both crawl reports.
+
+    python benchmarks/bench_crawl.py --pages 300 --latency-ms 20 --workers 16
+"""
+import argparse
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from crawler import Crawler, CrawlReport  # noqa: E402
+
+
+def make_handler(pages: int, latency: float, flaky_every: int):
+    hits = {}
+    lock = threading.Lock()
+
+    class SyntheticSiteHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(latency)
+            name = self.path.strip("/")
+            if not name.startswith("page-") or not name[5:].isdigit() or int(name[5:]) >= pages:
+                self.send_error(404)
+                return
+            number = int(name[5:])
+            with lock:
+                hits[number] = hits.get(number, 0) + 1
+                first_hit = hits[number] == 1
+            # Fail the first request for some pages so retries are exercised.
+            if flaky_every and number % flaky_every == 0 and first_hit:
+                self.send_error(503)
+                return
+            body = (
+                f"<html lang='en'><head><title>Page {number}</title></head>"
+                f"<body><h1>Destination {number}</h1>"
+                f"<p>{'Street food and beaches. ' * 40}</p></body></html>"
+            ).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return SyntheticSiteHandler
+
+
+def crawl_sequentially(crawler: Crawler, urls) -> CrawlReport:
+    report = CrawlReport()
+    start = time.perf_counter()
+    for url in urls:
+        try:
+            crawler.load(url, report)
+            report.pages += 1
+        except Exception as e:
+            report.failed += 1
+            report.errors[url] = str(e)
+    report.elapsed = time.perf_counter() - start
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=300)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--rps", type=float, default=0.0, help="per-host rate limit, 0 disables it")
+    parser.add_argument("--flaky-every", type=int, default=25)
+    parser.add_argument("--skip-sequential", action="store_true")
+    args = parser.parse_args()
+
+    handler = make_handler(args.pages, args.latency_ms / 1000, args.flaky_every)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+    urls = [f"{base_url}/page-{number}" for number in range(args.pages)]
+
+    try:
+        if not args.skip_sequential:
+            # Sequential baseline, like the old WebBaseLoader loop.
+            sequential = Crawler(max_workers=1, requests_per_second=args.rps, backoff=0.05)
+            print("sequential:", crawl_sequentially(sequential, urls).as_dict())
+            handler = make_handler(args.pages, args.latency_ms / 1000, args.flaky_every)
+            server.RequestHandlerClass = handler
+
+        concurrent = Crawler(max_workers=args.workers, requests_per_second=args.rps, backoff=0.05)
+        documents, report = concurrent.crawl(urls)
+        print("concurrent:", report.as_dict())
+        assert len(documents) == args.pages, f"expected {args.pages} documents, got {len(documents)}"
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Compare the old indexing input (all page text, RecursiveCharacterTextSplitter)
+with main-content extraction, boilerplate stripping, heading-aware chunking
+and near-duplicate removal, and print how much smaller the index gets.
+
+Runs on synthetic blog pages by default, or on saved pages:
+
+    python benchmarks/bench_extraction.py --pages 200
+    python benchmarks/bench_extraction.py --html-dir saved_pages/
+"""
+import argparse
+import random
+import sys
+from pathlib import Path
+
+from bs4 import BeautifulSoup
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain_core.documents import Document
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from chunking import HeadingTextSplitter, NearDuplicateFilter  # noqa: E402
+from crawler import html_to_document  # noqa: E402
+from extraction import BoilerplateFilter  # noqa: E402
+from indexer import extraction_report, split_page  # noqa: E402
+
+DISHES = ["fish curry", "prawn balchao", "pork vindaloo", "bebinca", "xacuti", "sorpotel", "cafreal", "thali"]
+PLACES = ["Panjim", "Calangute", "Anjuna", "Margao", "Vagator", "Palolem", "Candolim", "Mapusa"]
+CHROME = (
+    "<header><nav class='main-menu'><ul>" + "".join(f"<li><a href='/{p}'>{p}</a></li>" for p in PLACES) +
+    "</ul></nav></header>"
+    "<aside class='sidebar'><h3>Popular posts</h3><ul>" +
+    "".join(f"<li><a>Best {d} in Goa</a></li>" for d in DISHES) + "</ul></aside>"
+)
+FOOTER = (
+    "<footer><p>TravelloFoodie shares honest food and travel guides from across India.</p>"
+    "<p>Copyright 2024 TravelloFoodie. All rights reserved. Privacy policy. Terms of use.</p></footer>"
+)
+AUTHOR_BOX = (
+    "<p>About the author: Manideep is a food and travel blogger who has eaten their way "
+    "through every state in India and writes about it here.</p>"
+)
+INTRO = (
+    "Goa is famous for its beaches, but the food is the real reason to visit. Here is where "
+    "we ate, what we ordered and what it cost, so you can plan your own food trail."
+)
+
+
+def synthetic_page(number: int, rng: random.Random, written: list) -> str:
+    place = PLACES[number % len(PLACES)]
+    sections = []
+    for dish in rng.sample(DISHES, 4):
+        if written and rng.random() < 0.15:
+            # A section reposted from an older page with only the update date changed
+            sentences = f"{rng.choice(written)} Updated in {rng.choice(['May', 'June', 'July'])}."
+        else:
+            sentences = " ".join(
+                f"The {dish} at stall {rng.randint(1, 500)} in {place} costs {rng.randint(80, 600)} rupees "
+                f"and is {rng.choice(['spicy', 'tangy', 'rich', 'smoky', 'sweet'])}."
+                for _ in range(rng.randint(4, 12))
+            )
+            written.append(sentences)
+        sections.append(f"<h2>{dish.title()} in {place}</h2><p>{sentences}</p>")
+    return (
+        f"<html lang='en'><head><title>Food guide {number}</title></head><body>{CHROME}"
+        f"<main><article><h1>Eating in {place}, part {number}</h1><p>{INTRO}</p>{''.join(sections)}"
+        f"<div class='author-box'>{AUTHOR_BOX}</div><div class='share-bar'>Share on X / Facebook</div>"
+        f"</article></main>{FOOTER}</body></html>"
+    )
+
+
+def load_pages(args) -> list:
+    if args.html_dir:
+        paths = sorted(Path(args.html_dir).glob("**/*.htm*"))
+        return [(f"file://{path}", path.read_bytes()) for path in paths]
+    rng = random.Random(0)
+    written = []
+    return [(f"http://bench/page-{i}", synthetic_page(i, rng, written)) for i in range(args.pages)]
+
+
+def baseline(pages: list) -> dict:
+    splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=100, add_start_index=True)
+    documents = [
+        Document(page_content=BeautifulSoup(html, "html.parser").get_text(), metadata={"source": url})
+        for url, html in pages
+    ]
+    chunks = [chunk for document in documents for chunk in split_page(document, splitter)[0]]
+    return {"chunks": len(chunks), "chunk_chars": sum(len(chunk.page_content) for chunk in chunks)}
+
+
+def extracted(pages: list) -> tuple:
+    documents = [html_to_document(url, html) for url, html in pages]
+    boilerplate = BoilerplateFilter().fit(documents)
+    near_duplicates = NearDuplicateFilter()
+    splitter = HeadingTextSplitter(chunk_size=1000, chunk_overlap=100)
+    chunks = [
+        chunk
+        for document in documents
+        for chunk in split_page(boilerplate.strip(document), splitter, near_duplicates)[0]
+    ]
+    result = {"chunks": len(chunks), "chunk_chars": sum(len(chunk.page_content) for chunk in chunks)}
+    return result, extraction_report(boilerplate, near_duplicates, len(chunks))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--html-dir", help="directory of saved .html pages to use instead of synthetic ones")
+    args = parser.parse_args()
+
+    pages = load_pages(args)
+    before = baseline(pages)
+    after, report = extracted(pages)
+    print(f"{len(pages)} pages")
+    print(f"get_text + recursive splitter: {before['chunks']} chunks, {before['chunk_chars']} chars")
+    print(f"extraction + heading chunks:   {after['chunks']} chunks, {after['chunk_chars']} chars")
+    print(f"index is {1 - after['chunks'] / before['chunks']:.0%} smaller in chunks, "
+          f"{1 - after['chunk_chars'] / before['chunk_chars']:.0%} smaller in text to embed")
+    print(f"extraction report: {report}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+"""
+End-to-end RAG benchmark on a fixture corpus of saved HTML pages and a
+labelled question set, with a stub LLM, so it needs no network access.
+
+Times every stage (load, split, embed, index, retrieve, prompt, generate)
+and reports p50/p95/p99 latency, recall@k, MRR, how often the expected
+answer reaches the context and the answer, index size and peak RSS. The
+results are written as JSON, named after the current commit, so runs can be
+compared across commits:
+
+    python benchmarks/bench_rag.py
+    python benchmarks/bench_rag.py --chunk-size 500 --k 6 --retriever vector
+    python benchmarks/bench_rag.py --embedding-model all-MiniLM-L6-v2
+    python benchmarks/bench_rag.py --compare benchmarks/results/rag-abc1234.json benchmarks/results/rag-def5678.json
+
+The default embedder hashes words into a fixed-size vector, so results are
+reproducible offline; pass --embedding-model to use a HuggingFace model.
+"""
+import argparse
+import json
+import re
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+
+import numpy as np
+from langchain.vectorstores import Chroma
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from chunking import HeadingTextSplitter, NearDuplicateFilter  # noqa: E402
+from context_packing import ContextPacker  # noqa: E402
+from crawler import html_to_document  # noqa: E402
+from embedding_pipeline import EmbeddingPipeline, batched  # noqa: E402
+from extraction import BoilerplateFilter  # noqa: E402
+from indexer import split_page  # noqa: E402
+from providers import HashingEmbeddings  # noqa: E402
+from retrieval import BM25Index, HybridRetriever, tokenize  # noqa: E402
+
+FIXTURES = Path(__file__).resolve().parent / "fixtures"
+RESULTS = Path(__file__).resolve().parent / "results"
+STAGES = ["load", "split", "embed", "index", "retrieve", "prompt", "generate"]
+
+
+class StubChatModel(BaseChatModel):
+    """
+    Answers with the context sentence that shares the most words with the
+    question, after `latency` seconds.
+    """
+
+    latency: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "extractive-stub"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        time.sleep(self.latency)
+        question = set(tokenize(messages[-1].content))
+        sentences = re.split(r"(?<=[.!?])\s+", messages[0].content)
+        answer = max(sentences, key=lambda sentence: len(question & set(tokenize(sentence))))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=answer.strip()))])
+
+
+def get_prompt():
+    # Same shape as the services' prompt: context in the system message, then history and question
+    return ChatPromptTemplate.from_messages([
+        ("system", "Answer strictly from the website content below.\n\n{context}"),
+        MessagesPlaceholder(variable_name="chat_history"),
+        ("user", "{input}"),
+    ])
+
+
+class StageTimer:
+    def __init__(self):
+        self.samples = defaultdict(list)
+
+    def time(self, stage: str, fn, *args, **kwargs):
+        start = time.perf_counter()
+        result = fn(*args, **kwargs)
+        self.samples[stage].append((time.perf_counter() - start) * 1000)
+        return result
+
+    def summary(self) -> dict:
+        summary = {}
+        for stage in STAGES + ["end_to_end"]:
+            values = np.array(self.samples.get(stage, []))
+            if not len(values):
+                continue
+            summary[stage] = {
+                "count": len(values),
+                "total_ms": round(float(values.sum()), 3),
+                "mean_ms": round(float(values.mean()), 3),
+                **{f"p{q}_ms": round(float(np.percentile(values, q)), 3) for q in (50, 95, 99)},
+            }
+        return summary
+
+
+def directory_size(path: str) -> int:
+    return sum(f.stat().st_size for f in Path(path).rglob("*") if f.is_file())
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=Path(__file__).resolve().parent,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def build_index(args, embedding_model, timer: StageTimer, persist_directory: str):
+    pages = sorted(Path(args.site_dir).glob("*.htm*"))
+    documents = [timer.time("load", html_to_document, page.name, page.read_bytes()) for page in pages]
+
+    splitter = HeadingTextSplitter(chunk_size=args.chunk_size, chunk_overlap=args.chunk_overlap)
+    boilerplate = BoilerplateFilter().fit(documents)
+    near_duplicates = NearDuplicateFilter()
+    chunks_with_ids = []
+    for document in documents:
+        chunks, ids = timer.time("split", split_page, boilerplate.strip(document), splitter, near_duplicates)
+        chunks_with_ids.extend(zip(ids, chunks))
+
+    vector_store = Chroma(persist_directory=persist_directory, embedding_function=embedding_model)
+    for batch in batched(chunks_with_ids, args.batch_size):
+        texts = [chunk.page_content for _, chunk in batch]
+        embeddings = timer.time("embed", embedding_model.embed_documents, texts)
+        timer.time("index", EmbeddingPipeline._write, vector_store, batch, embeddings)
+    return vector_store, {"pages": len(documents), "chunks": len(chunks_with_ids)}
+
+
+def make_retriever(args, vector_store):
+    if args.retriever == "vector":
+        return vector_store.as_retriever(search_type="similarity", search_kwargs={"k": args.k})
+    return HybridRetriever(
+        vector_store=vector_store, bm25=BM25Index.from_vector_store(vector_store), k=args.k, fetch_k=args.fetch_k
+    )
+
+
+def ask(args, question: dict, retriever, packer, prompt, llm, timer: StageTimer) -> dict:
+    start = time.perf_counter()
+    documents = timer.time("retrieve", retriever.invoke, question["question"])
+
+    def build_prompt():
+        packed = packer.pack(documents)
+        context = "\n\n".join(document.page_content for document in packed)
+        return context, prompt.format_messages(context=context, chat_history=[], input=question["question"])
+
+    context, messages = timer.time("prompt", build_prompt)
+    answer = timer.time("generate", llm.invoke, messages).content
+    timer.samples["end_to_end"].append((time.perf_counter() - start) * 1000)
+
+    sources = [document.metadata.get("source") for document in documents]
+    rank = next((i + 1 for i, source in enumerate(sources) if source in question["sources"]), None)
+    expected = question["answer"].lower()
+    return {
+        "hit": rank is not None,
+        "reciprocal_rank": 1 / rank if rank else 0.0,
+        "context_hit": expected in context.lower(),
+        "answer_hit": expected in answer.lower(),
+        "context_tokens": sum(len(document.page_content) // 4 + 1 for document in documents),
+    }
+
+
+def run(args) -> dict:
+    if args.embedding_model == "hashing":
+        embedding_model = HashingEmbeddings()
+    else:
+        from langchain.embeddings import HuggingFaceEmbeddings
+        embedding_model = HuggingFaceEmbeddings(model_name=args.embedding_model)
+
+    timer = StageTimer()
+    questions = json.loads(Path(args.questions).read_text())
+    with tempfile.TemporaryDirectory() as persist_directory:
+        vector_store, corpus = build_index(args, embedding_model, timer, persist_directory)
+        index_bytes = directory_size(persist_directory)
+        retriever = make_retriever(args, vector_store)
+        packer = ContextPacker(token_budget=args.token_budget)
+        prompt = get_prompt()
+        llm = StubChatModel(latency=args.llm_ms / 1000)
+        outcomes = [
+            ask(args, question, retriever, packer, prompt, llm, timer)
+            for _ in range(args.repeat)
+            for question in questions
+        ]
+
+    return {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": {
+            "site_dir": args.site_dir,
+            "embedding_model": args.embedding_model,
+            "retriever": args.retriever,
+            "chunk_size": args.chunk_size,
+            "chunk_overlap": args.chunk_overlap,
+            "k": args.k,
+            "fetch_k": args.fetch_k,
+            "token_budget": args.token_budget,
+            "llm_ms": args.llm_ms,
+            "repeat": args.repeat,
+        },
+        "quality": {
+            "questions": len(questions),
+            f"recall@{args.k}": round(float(np.mean([o["hit"] for o in outcomes])), 3),
+            "mrr": round(float(np.mean([o["reciprocal_rank"] for o in outcomes])), 3),
+            "context_hit_rate": round(float(np.mean([o["context_hit"] for o in outcomes])), 3),
+            "answer_hit_rate": round(float(np.mean([o["answer_hit"] for o in outcomes])), 3),
+            "mean_retrieved_tokens": round(float(np.mean([o["context_tokens"] for o in outcomes])), 1),
+            "context_packing": packer.stats(),
+        },
+        "index": {**corpus, "bytes": index_bytes},
+        "stages": timer.summary(),
+        # ru_maxrss is in kilobytes on Linux
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+
+def flatten(data: dict, prefix: str = "") -> dict:
+    flat = {}
+    for key, value in data.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{prefix}{key}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[f"{prefix}{key}"] = value
+    return flat
+
+
+def compare(old_path: str, new_path: str):
+    old, new = (json.loads(Path(path).read_text()) for path in (old_path, new_path))
+    print(f"{'metric':<45} {old['commit']:>12} {new['commit']:>12} {'change':>9}")
+    old_flat, new_flat = flatten(old), flatten(new)
+    for key in sorted(old_flat.keys() & new_flat.keys()):
+        before, after = old_flat[key], new_flat[key]
+        change = f"{(after - before) / before:+.0%}" if before else ""
+        print(f"{key:<45} {before:>12} {after:>12} {change:>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--site-dir", default=str(FIXTURES / "site"), help="saved HTML pages to index")
+    parser.add_argument("--questions", default=str(FIXTURES / "questions.json"),
+                        help='JSON list of {"question", "sources": [file names], "answer": expected phrase}')
+    parser.add_argument("--embedding-model", default="hashing")
+    parser.add_argument("--retriever", choices=["hybrid", "vector"], default="hybrid")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--chunk-overlap", type=int, default=100)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--fetch-k", type=int, default=20)
+    parser.add_argument("--token-budget", type=int, default=1500)
+    parser.add_argument("--llm-ms", type=float, default=0.0, help="simulated generation latency")
+    parser.add_argument("--repeat", type=int, default=5, help="passes over the question set")
+    parser.add_argument("--output", help="JSON results path (default benchmarks/results/rag-<commit>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="print two saved results side by side")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+    results = run(args)
+    output = Path(args.output or RESULTS / f"rag-{results['commit']}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2))
+    print(json.dumps({key: results[key] for key in ("quality", "index", "peak_rss_mb")}, indent=2))
+    for stage, summary in results["stages"].items():
+        print(f"{stage:<11} n={summary['count']:<4} p50={summary['p50_ms']:>9.3f}ms "
+              f"p95={summary['p95_ms']:>9.3f}ms p99={summary['p99_ms']:>9.3f}ms")
+    print(f"Saved {output}")
+
+
+if __name__ == "__main__":
+    main()
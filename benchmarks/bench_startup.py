@@ -0,0 +1,120 @@
+"""
+Startup benchmark: imports the app in fresh interpreters and reports the
+import time, the memory after import, and which heavy packages the import
+pulled in (torch, sentence-transformers, chromadb, crewai, ...). Those
+should load in the warm-up, not on import; a package showing up here, or
+the import time growing, is a startup regression.
+
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --app agents_main --repeat 5
+    python benchmarks/bench_startup.py --load-models      # also time the warm-up's model load
+    python benchmarks/bench_startup.py --max-import-s 3   # exit 1 if the median import is slower
+    python benchmarks/bench_startup.py --compare benchmarks/results/startup-main-abc1234.json benchmarks/results/startup-main-def5678.json
+
+Each run imports the app in an empty working directory, so no index is
+loaded and nothing is fetched.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from bench_rag import compare, git_commit
+
+ROOT = Path(__file__).resolve().parent.parent
+RESULTS = Path(__file__).resolve().parent / "results"
+HEAVY_MODULES = ["torch", "transformers", "sentence_transformers", "chromadb", "crewai", "crewai_tools", "groq"]
+
+PROBE = """
+import json, resource, sys, time
+sys.path.insert(0, {root!r})
+start = time.perf_counter()
+module = __import__({app!r})
+result = {{"import_s": time.perf_counter() - start}}
+# ru_maxrss is in kilobytes on Linux
+result["rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+result["heavy_modules"] = [name for name in {heavy!r} if name in sys.modules]
+if {load_models!r}:
+    start = time.perf_counter()
+    sys.modules["core"].load_models()
+    result["load_models_s"] = time.perf_counter() - start
+    result["rss_after_load_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+print("RESULT " + json.dumps(result))
+"""
+
+
+def probe(app: str, load_models: bool, preload: bool) -> dict:
+    with tempfile.TemporaryDirectory() as workdir:
+        env = {
+            **os.environ,
+            "PRELOAD_MODELS": "1" if preload else "0",
+            "EMBEDDING_CACHE_DIR": os.path.join(workdir, "embedding_cache"),
+            "ITINERARY_DIR": os.path.join(workdir, "itineraries"),
+            "SESSION_DB_PATH": os.path.join(workdir, "sessions.db"),
+        }
+        code = PROBE.format(root=str(ROOT), app=app, heavy=HEAVY_MODULES, load_models=load_models)
+        start = time.perf_counter()
+        completed = subprocess.run(
+            [sys.executable, "-c", code], cwd=workdir, env=env, capture_output=True, text=True,
+        )
+        wall_s = time.perf_counter() - start
+    lines = [line for line in completed.stdout.splitlines() if line.startswith("RESULT ")]
+    if completed.returncode != 0 or not lines:
+        raise RuntimeError(f"Importing {app} failed:\n{completed.stderr[-2000:]}")
+    return {**json.loads(lines[-1][len("RESULT "):]), "process_s": wall_s}
+
+
+def interpreter_s() -> float:
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "pass"], check=True)
+    return time.perf_counter() - start
+
+
+def run(args) -> dict:
+    runs = [probe(args.app, args.load_models, args.preload) for _ in range(args.repeat)]
+    summary = {
+        key: round(statistics.median(run[key] for run in runs), 3)
+        for key in ("import_s", "process_s", "rss_mb", "load_models_s", "rss_after_load_mb")
+        if key in runs[0]
+    }
+    return {
+        "commit": git_commit(),
+        "config": {"app": args.app, "repeat": args.repeat, "load_models": args.load_models, "preload": args.preload},
+        "interpreter_s": round(interpreter_s(), 3),
+        "median": summary,
+        "heavy_modules": runs[0]["heavy_modules"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--app", default="main", help="module to import: main or agents_main")
+    parser.add_argument("--repeat", type=int, default=5, help="fresh interpreters to import in")
+    parser.add_argument("--load-models", action="store_true", help="also time load_models() after the import")
+    parser.add_argument("--preload", action="store_true", help="import with PRELOAD_MODELS=1")
+    parser.add_argument("--max-import-s", type=float, help="exit 1 if the median import takes longer")
+    parser.add_argument("--output", help="JSON results path (default benchmarks/results/startup-<app>-<commit>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="print two saved results side by side")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+    results = run(args)
+    output = Path(args.output or RESULTS / f"startup-{args.app}-{results['commit']}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2))
+    print(json.dumps(results, indent=2))
+    print(f"Saved {output}")
+    if args.max_import_s is not None and results["median"]["import_s"] > args.max_import_s:
+        print(f"Median import of {args.app} took {results['median']['import_s']}s, over {args.max_import_s}s.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
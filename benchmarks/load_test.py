@@ -0,0 +1,202 @@
+"""
+Load test for /get_response/: sends questions at a fixed rate and reports
+throughput, status codes and latency percentiles. The load is open loop:
+each request goes out on schedule whether or not earlier ones have
+returned, so a slow server shows up as latency instead of a lower rate.
+
+By default the service is started offline in a scratch directory, with the
+fake LLM, hashing embeddings and the saved pages in
+benchmarks/fixtures/site (see providers.py). Neither Groq nor
+travellofoodie.com is called. Use --url to load a server that is already
+running instead.
+
+    python benchmarks/load_test.py --rps 20 --duration 30
+    python benchmarks/load_test.py --rps 50 --llm-ms 800 --tokens-per-s 100
+    python benchmarks/load_test.py --app agents_main --llm-max-rpm 600
+    python benchmarks/load_test.py --url http://127.0.0.1:8000 --rps 5
+    python benchmarks/load_test.py --compare benchmarks/results/load-abc1234.json benchmarks/results/load-def5678.json
+
+Questions come from benchmarks/fixtures/questions.json, in turn, so repeats
+are answered from the semantic cache as they would be in production.
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+
+import httpx
+import numpy as np
+
+from bench_rag import FIXTURES, compare, git_commit
+
+ROOT = Path(__file__).resolve().parent.parent
+RESULTS = Path(__file__).resolve().parent / "results"
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(args, workdir: str, port: int) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "LLM_PROVIDER": "fake",
+        "FAKE_LLM_LATENCY_MS": str(args.llm_ms),
+        "FAKE_LLM_TOKENS_PER_S": str(args.tokens_per_s),
+        "EMBEDDING_PROVIDER": "hashing",
+        "FETCHER": "fixtures",
+        "FIXTURE_SITE_DIR": args.site_dir,
+        "LLM_MAX_RPM": str(args.llm_max_rpm),
+        "LLM_BURST": str(args.llm_max_rpm),
+        "LLM_MAX_CONCURRENT": str(args.llm_max_concurrent),
+        "PERSIST_DIRECTORY": os.path.join(workdir, "chroma_db"),
+        "EMBEDDING_CACHE_DIR": os.path.join(workdir, "embedding_cache"),
+        "ITINERARY_DIR": os.path.join(workdir, "itineraries"),
+        "SESSION_DB_PATH": os.path.join(workdir, "sessions.db"),
+    }
+    command = [
+        sys.executable, "-m", "uvicorn", f"{args.app}:app", "--app-dir", str(ROOT),
+        "--port", str(port), "--log-level", "warning",
+    ]
+    # The server's log goes to a file, so it does not drown the report
+    log = open(os.path.join(workdir, "server.log"), "wb")
+    return subprocess.Popen(command, cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT)
+
+
+def wait_ready(url: str, server: subprocess.Popen, timeout: float):
+    # /readyz turns 200 once the fixture site is crawled and indexed
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server is not None and server.poll() is not None:
+            raise RuntimeError(f"The server exited with code {server.returncode}.")
+        try:
+            if httpx.get(f"{url}/readyz", timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"{url} was not ready after {timeout:.0f}s.")
+
+
+async def run_load(url: str, questions: list, rps: float, duration: float, timeout: float) -> dict:
+    outcomes = []
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=100)
+    async with httpx.AsyncClient(base_url=url, timeout=timeout, limits=limits) as client:
+        loop = asyncio.get_running_loop()
+
+        async def send(i: int, lag: float):
+            start = time.perf_counter()
+            try:
+                response = await client.post("/get_response/", json={"question": questions[i % len(questions)]})
+                status = str(response.status_code)
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            outcomes.append((status, time.perf_counter() - start, lag))
+
+        tasks = []
+        started = loop.time()
+        for i in range(int(rps * duration)):
+            due = started + i / rps
+            await asyncio.sleep(max(0.0, due - loop.time()))
+            tasks.append(asyncio.create_task(send(i, loop.time() - due)))
+        await asyncio.gather(*tasks)
+        elapsed = loop.time() - started
+
+    statuses = Counter(status for status, _, _ in outcomes)
+    latencies = np.array([latency for status, latency, _ in outcomes if status == "200"]) * 1000
+    return {
+        "requests": {"sent": len(outcomes), "ok": statuses.get("200", 0), "status": dict(sorted(statuses.items()))},
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(statuses.get("200", 0) / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": {
+            "mean": round(float(latencies.mean()), 1),
+            **{f"p{q}": round(float(np.percentile(latencies, q)), 1) for q in (50, 90, 95, 99)},
+            "max": round(float(latencies.max()), 1),
+        } if len(latencies) else {},
+        # How late the generator itself sent requests; large values mean the numbers understate the load
+        "max_send_lag_ms": round(max((lag for _, _, lag in outcomes), default=0.0) * 1000, 1),
+    }
+
+
+def run(args) -> dict:
+    questions = [item["question"] for item in json.loads(Path(args.questions).read_text())]
+    with tempfile.TemporaryDirectory() as workdir:
+        server, url = None, args.url
+        if url is None:
+            port = free_port()
+            url = f"http://127.0.0.1:{port}"
+            server = start_server(args, workdir, port)
+        try:
+            try:
+                wait_ready(url, server, args.ready_timeout)
+            except RuntimeError:
+                if server is not None:
+                    print(Path(workdir, "server.log").read_text()[-4000:], file=sys.stderr)
+                raise
+            if args.warmup:
+                asyncio.run(run_load(url, questions, args.rps, args.warmup, args.timeout))
+            results = asyncio.run(run_load(url, questions, args.rps, args.duration, args.timeout))
+            try:
+                results["server_llm_stats"] = httpx.get(f"{url}/llm_stats/", timeout=5.0).json()
+            except (httpx.HTTPError, ValueError):
+                pass
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait(timeout=30)
+    config = {"url": args.url or "offline", "rps": args.rps, "duration": args.duration, "questions": len(questions)}
+    if args.url is None:
+        config.update(
+            app=args.app, llm_ms=args.llm_ms, tokens_per_s=args.tokens_per_s,
+            llm_max_rpm=args.llm_max_rpm, llm_max_concurrent=args.llm_max_concurrent,
+        )
+    return {"commit": git_commit(), "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "config": config, **results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="load a running server instead of starting one offline")
+    parser.add_argument("--app", default="main", help="module to serve offline: main or agents_main")
+    parser.add_argument("--rps", type=float, default=10.0, help="target requests per second")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds of measured load")
+    parser.add_argument("--warmup", type=float, default=5.0, help="seconds of unmeasured load first")
+    parser.add_argument("--timeout", type=float, default=60.0, help="per-request timeout in seconds")
+    parser.add_argument("--questions", default=str(FIXTURES / "questions.json"))
+    parser.add_argument("--site-dir", default=str(FIXTURES / "site"), help="saved pages the offline server crawls")
+    parser.add_argument("--llm-ms", type=float, default=300.0, help="fake LLM time to first token")
+    parser.add_argument("--tokens-per-s", type=float, default=200.0, help="fake LLM output rate")
+    parser.add_argument("--llm-max-rpm", type=int, default=100000,
+                        help="LLM gate budget; lower it to test admission control (default: no limit)")
+    parser.add_argument("--llm-max-concurrent", type=int, default=64)
+    parser.add_argument("--ready-timeout", type=float, default=120.0)
+    parser.add_argument("--max-p99-ms", type=float, help="exit 1 if the p99 latency is higher")
+    parser.add_argument("--output", help="JSON results path (default benchmarks/results/load-<commit>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="print two saved results side by side")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+    results = run(args)
+    output = Path(args.output or RESULTS / f"load-{results['commit']}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2))
+    print(json.dumps(results, indent=2))
+    print(f"Saved {output}")
+    p99 = results["latency_ms"].get("p99")
+    if args.max_p99_ms is not None and (p99 is None or p99 > args.max_p99_ms):
+        print(f"p99 latency {p99} ms is over {args.max_p99_ms} ms.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+import logging
+import re
+import zlib
+
+import numpy as np
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+logger = logging.getLogger(__name__)
+
+HEADING = re.compile(r"^(#{1,6}) (.+)$", re.MULTILINE)
+# Universal hashing modulo a Mersenne prime; every product stays below 2**62
+MERSENNE_PRIME = (1 << 31) - 1
+
+
+class HeadingTextSplitter:
+    """
+    Splits markdown-style page text (see extraction.extract_main_text) on its
+    headings before splitting by size, so a chunk never starts in the middle
+    of one section and ends in the next.
+
+    Consecutive small sections are packed together up to `chunk_size`;
+    sections longer than that are split further with overlap. Each chunk
+    gets `start_index` in the page text and its heading path as `section`
+    ("Goa > Where to eat").
+    """
+
+    def __init__(self, chunk_size: int = 1000, chunk_overlap: int = 100):
+        self.chunk_size = chunk_size
+        self._splitter = RecursiveCharacterTextSplitter(
+            chunk_size=chunk_size, chunk_overlap=chunk_overlap, add_start_index=True
+        )
+
+    @staticmethod
+    def _sections(text: str) -> list:
+        """
+        (start, end, heading path) spans covering `text`, one per heading.
+        """
+        sections, path = [], []
+        starts = [(match.start(), len(match.group(1)), match.group(2).strip()) for match in HEADING.finditer(text)]
+        if not starts or starts[0][0] > 0:
+            sections.append([0, starts[0][0] if starts else len(text), []])
+        for i, (start, level, title) in enumerate(starts):
+            path = [(lvl, name) for lvl, name in path if lvl < level] + [(level, title)]
+            end = starts[i + 1][0] if i + 1 < len(starts) else len(text)
+            sections.append([start, end, [name for _, name in path]])
+        return sections
+
+    def _packed(self, text: str) -> list:
+        packed = []
+        for section in self._sections(text):
+            if packed and section[1] - packed[-1][0] <= self.chunk_size:
+                packed[-1][1] = section[1]
+            else:
+                packed.append(section)
+        # Drop spans that are only headings
+        return [section for section in packed if HEADING.sub("", text[section[0]:section[1]]).strip()]
+
+    def split_documents(self, documents) -> list:
+        chunks = []
+        for document in documents:
+            text = document.page_content
+            for start, end, path in self._packed(text):
+                metadata = dict(document.metadata)
+                if path:
+                    metadata["section"] = " > ".join(path)
+                for chunk in self._splitter.create_documents([text[start:end]], [metadata]):
+                    # A long section's heading can end up alone; `section` already carries it
+                    if not HEADING.sub("", chunk.page_content).strip():
+                        continue
+                    chunk.metadata["start_index"] += start
+                    chunks.append(chunk)
+        return chunks
+
+
+class NearDuplicateFilter:
+    """
+    Detects chunks that are near-copies of chunks already admitted (the same
+    paragraph with a different date or link text, recipe intros repeated
+    across posts) using MinHash signatures over word shingles and LSH
+    banding, so only candidate pairs are compared.
+
+    `add()` returns False for a chunk whose estimated Jaccard similarity with
+    an admitted one is at least `threshold`.
+    """
+
+    def __init__(self, threshold: float = 0.85, num_perm: int = 64, bands: int = 16, shingle_size: int = 5,
+                 seed: int = 1):
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, MERSENNE_PRIME, num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, MERSENNE_PRIME, num_perm, dtype=np.uint64)
+        self._signatures = []
+        self._buckets = [{} for _ in range(bands)]
+        self.checked = 0
+        self.dropped = 0
+
+    def signature(self, text: str) -> np.ndarray:
+        words = text.lower().split()
+        size = self.shingle_size
+        shingles = {" ".join(words[i:i + size]) for i in range(max(1, len(words) - size + 1))}
+        hashes = np.array([zlib.crc32(shingle.encode("utf-8")) % MERSENNE_PRIME for shingle in shingles],
+                          dtype=np.uint64)
+        return ((np.outer(hashes, self._a) + self._b) % MERSENNE_PRIME).min(axis=0)
+
+    def _band_keys(self, signature: np.ndarray) -> list:
+        return [signature[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(self.bands)]
+
+    def _insert(self, signature: np.ndarray, keys: list):
+        index = len(self._signatures)
+        self._signatures.append(signature)
+        for bucket, key in zip(self._buckets, keys):
+            bucket.setdefault(key, []).append(index)
+
+    def remember(self, text: str):
+        """
+        Admit `text` without checking it (chunks already in the index).
+        """
+        signature = self.signature(text)
+        self._insert(signature, self._band_keys(signature))
+
+    def add(self, text: str) -> bool:
+        self.checked += 1
+        signature = self.signature(text)
+        keys = self._band_keys(signature)
+        candidates = set()
+        for bucket, key in zip(self._buckets, keys):
+            candidates.update(bucket.get(key, ()))
+        for index in candidates:
+            if np.mean(self._signatures[index] == signature) >= self.threshold:
+                self.dropped += 1
+                return False
+        self._insert(signature, keys)
+        return True
+
+    def stats(self) -> dict:
+        return {"chunks_checked": self.checked, "near_duplicates_dropped": self.dropped}
@@ -0,0 +1,274 @@
+import json
+import logging
+import mmap
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.vectorstores import VectorStore
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE = "manifest.json"
+FORMAT_VERSION = 1
+DTYPES = {"int8": np.int8, "float16": np.float16}
+SPACES = ("l2", "cosine", "ip")
+# Rows read from the vector store per page while exporting, and scored per block while searching
+EXPORT_PAGE_SIZE = 5000
+SCORE_BLOCK_ROWS = 1024
+
+
+def collection_space(vector_store) -> str:
+    """
+    The distance Chroma ranks the collection by: "l2" (its default),
+    "cosine" or "ip".
+    """
+    collection = vector_store._collection
+    space = (collection.metadata or {}).get("hnsw:space")
+    if space is None:
+        configuration = getattr(collection, "configuration", None) or {}
+        space = (configuration.get("hnsw") or {}).get("space")
+    return space or "l2"
+
+
+def export_index(vector_store, directory: str, dtype: str = "int8", model_name: str = None,
+                 source_version: str = None) -> dict:
+    """
+    Write a read-only copy of a Chroma store to `directory` for CompactIndex:
+
+    - vectors.npy: the embeddings quantized to `dtype` (int8 with one scale
+      per row in scales.npy, or float16), scanned for every query
+    - exact.npy and norms.npy: the float32 embeddings and their norms, read
+      only for the shortlist each query re-scores
+    - records.jsonl and offsets.npy: one {"id", "document", "metadata"} line
+      per row, and the byte offset of each line
+    - manifest.json: row count, dimension, dtype, distance, the embedding
+      model and `source_version` (see CompactIndex.load)
+
+    The export is written next to `directory` and moved into place when it
+    is complete, so processes reading the old one are not disturbed.
+    """
+    if dtype not in DTYPES:
+        raise ValueError(f"Unknown dtype {dtype!r}; expected one of {sorted(DTYPES)}.")
+    start = time.perf_counter()
+    target = Path(directory)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    # Unique names, so exports running at the same time cannot write into each other's files
+    tmp = Path(tempfile.mkdtemp(prefix=f"{target.name}.tmp-", dir=target.parent))
+    tmp.chmod(0o755)
+    count = vector_store._collection.count()
+    exact = vectors = scales = None
+    offsets = [0]
+    with open(tmp / "records.jsonl", "wb") as records:
+        for offset in range(0, count, EXPORT_PAGE_SIZE):
+            page = vector_store.get(
+                limit=EXPORT_PAGE_SIZE, offset=offset, include=["embeddings", "documents", "metadatas"]
+            )
+            embeddings = np.asarray(page["embeddings"], dtype=np.float32)
+            if exact is None:
+                dim = embeddings.shape[1]
+                exact = np.lib.format.open_memmap(tmp / "exact.npy", mode="w+", dtype=np.float32, shape=(count, dim))
+                vectors = np.lib.format.open_memmap(tmp / "vectors.npy", mode="w+", dtype=DTYPES[dtype], shape=(count, dim))
+                scales = np.ones(count, dtype=np.float32)
+            rows = slice(offset, offset + len(embeddings))
+            exact[rows] = embeddings
+            if dtype == "int8":
+                # Symmetric per-row scale, so each row uses the full int8 range
+                row_max = np.abs(embeddings).max(axis=1)
+                scales[rows] = np.where(row_max > 0, row_max / 127.0, 1.0)
+                vectors[rows] = np.round(embeddings / scales[rows, None]).astype(np.int8)
+            else:
+                vectors[rows] = embeddings.astype(np.float16)
+            for id_, text, metadata in zip(page["ids"], page["documents"], page["metadatas"]):
+                line = json.dumps({"id": id_, "document": text, "metadata": metadata or {}}).encode("utf-8") + b"\n"
+                records.write(line)
+                offsets.append(offsets[-1] + len(line))
+    if exact is None:
+        raise ValueError("The vector store is empty; there is nothing to export.")
+    exact.flush()
+    vectors.flush()
+    np.save(tmp / "norms.npy", np.linalg.norm(exact, axis=1).astype(np.float32))
+    np.save(tmp / "offsets.npy", np.asarray(offsets, dtype=np.int64))
+    if dtype == "int8":
+        np.save(tmp / "scales.npy", scales)
+    del exact, vectors
+    manifest = {
+        "format_version": FORMAT_VERSION,
+        "count": count,
+        "dim": dim,
+        "dtype": dtype,
+        "space": collection_space(vector_store),
+        "model_name": model_name,
+        "source_version": source_version,
+        "exported_at": time.time(),
+    }
+    (tmp / MANIFEST_FILE).write_text(json.dumps(manifest, indent=2))
+
+    old = Path(tempfile.mkdtemp(prefix=f"{target.name}.old-", dir=target.parent))
+    if target.exists():
+        os.replace(target, old)
+    os.replace(tmp, target)
+    shutil.rmtree(old, ignore_errors=True)
+    manifest["export_s"] = round(time.perf_counter() - start, 3)
+    logger.info(f"Exported {count} vectors to {target} as {dtype} in {manifest['export_s']}s.")
+    return manifest
+
+
+class CompactIndex(VectorStore):
+    """
+    Read-only vector index over an export_index() directory, memory-mapped
+    so opening it costs next to nothing and every process on the host
+    shares the same pages.
+
+    A query scans the quantized vectors with NumPy, keeps the best
+    `rescore_factor` x k rows, and ranks those by their exact float32
+    distance, in the same space and with the same distances as the Chroma
+    collection it was exported from. It answers the similarity_search
+    calls and the get() the retrievers use, like Chroma.
+    """
+
+    def __init__(self, directory: str, embedding, rescore_factor: int = 4):
+        self.directory = Path(directory)
+        self.manifest = json.loads((self.directory / MANIFEST_FILE).read_text())
+        self._embedding = embedding
+        self.rescore_factor = rescore_factor
+        self.space = self.manifest["space"]
+        if self.space not in SPACES:
+            raise ValueError(f"Unsupported distance {self.space!r} in {self.directory}.")
+        self.vectors = np.load(self.directory / "vectors.npy", mmap_mode="r")
+        self.exact = np.load(self.directory / "exact.npy", mmap_mode="r")
+        self.norms = np.load(self.directory / "norms.npy")
+        self.scales = np.load(self.directory / "scales.npy") if self.manifest["dtype"] == "int8" else None
+        self._offsets = np.load(self.directory / "offsets.npy")
+        with open(self.directory / "records.jsonl", "rb") as f:
+            self._records = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._ids = None
+
+    @classmethod
+    def load(cls, directory: str, embedding, model_name: str = None, source_version: str = None, **kwargs):
+        """
+        Open the export in `directory`. Raises FileNotFoundError if there is
+        none, and ValueError if it was made with another embedding model or
+        from another version of the source index than `source_version`.
+        """
+        manifest_path = Path(directory) / MANIFEST_FILE
+        if not manifest_path.exists():
+            raise FileNotFoundError(f"No compact index in {directory}.")
+        manifest = json.loads(manifest_path.read_text())
+        if manifest.get("format_version") != FORMAT_VERSION:
+            raise ValueError(f"{directory} has format {manifest.get('format_version')}, expected {FORMAT_VERSION}.")
+        if model_name is not None and manifest.get("model_name") != model_name:
+            raise ValueError(f"{directory} was exported for {manifest.get('model_name')}, not {model_name}.")
+        if source_version is not None and manifest.get("source_version") != source_version:
+            raise ValueError(f"{directory} is older than the vector store it was exported from.")
+        start = time.perf_counter()
+        index = cls(directory, embedding, **kwargs)
+        logger.info(
+            f"Opened compact index of {len(index)} {manifest['dtype']} vectors from {directory} "
+            f"in {(time.perf_counter() - start) * 1000:.1f} ms."
+        )
+        return index
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    @property
+    def embeddings(self):
+        return self._embedding
+
+    def _record(self, i: int) -> dict:
+        return json.loads(self._records[self._offsets[i]:self._offsets[i + 1]])
+
+    def _document(self, i: int) -> Document:
+        record = self._record(i)
+        return Document(page_content=record["document"], metadata=record["metadata"], id=record["id"])
+
+    def _approximate_scores(self, query: np.ndarray) -> np.ndarray:
+        # Higher is better; only the order matters for the shortlist
+        dots = np.empty(len(self), dtype=np.float32)
+        for start in range(0, len(self), SCORE_BLOCK_ROWS):
+            block = self.vectors[start:start + SCORE_BLOCK_ROWS]
+            dots[start:start + len(block)] = block.astype(np.float32) @ query
+        if self.scales is not None:
+            dots *= self.scales
+        if self.space == "l2":
+            return 2 * dots - self.norms ** 2
+        if self.space == "cosine":
+            return dots / np.maximum(self.norms, 1e-12)
+        return dots
+
+    def _exact_distances(self, rows: np.ndarray, query: np.ndarray) -> np.ndarray:
+        vectors = np.asarray(self.exact[rows], dtype=np.float32)
+        if self.space == "l2":
+            # Squared, as Chroma reports it
+            return ((vectors - query) ** 2).sum(axis=1)
+        dots = vectors @ query
+        if self.space == "cosine":
+            return 1 - dots / np.maximum(self.norms[rows] * np.linalg.norm(query), 1e-12)
+        return 1 - dots
+
+    def search(self, embedding, k: int = 4) -> tuple:
+        """
+        Row numbers and distances of the `k` nearest rows, nearest first.
+        """
+        query = np.asarray(embedding, dtype=np.float32)
+        k = min(k, len(self))
+        shortlist = min(len(self), max(k, k * self.rescore_factor))
+        scores = self._approximate_scores(query)
+        if shortlist < len(self):
+            rows = np.argpartition(-scores, shortlist - 1)[:shortlist]
+        else:
+            rows = np.arange(len(self))
+        # Sorted rows read the memory-mapped file front to back
+        rows = np.sort(rows)
+        distances = self._exact_distances(rows, query)
+        order = np.argsort(distances, kind="stable")[:k]
+        return rows[order], distances[order]
+
+    def similarity_search_by_vector_with_score(self, embedding, k: int = 4) -> list:
+        rows, distances = self.search(embedding, k)
+        return [(self._document(int(row)), float(distance)) for row, distance in zip(rows, distances)]
+
+    def similarity_search_by_vector(self, embedding, k: int = 4, **kwargs) -> list:
+        return [document for document, _ in self.similarity_search_by_vector_with_score(embedding, k)]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, **kwargs) -> list:
+        return self.similarity_search_by_vector_with_score(self._embedding.embed_query(query), k)
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs) -> list:
+        return [document for document, _ in self.similarity_search_with_score(query, k)]
+
+    def _select_relevance_score_fn(self):
+        return {
+            "l2": self._euclidean_relevance_score_fn,
+            "cosine": self._cosine_relevance_score_fn,
+            "ip": self._max_inner_product_relevance_score_fn,
+        }[self.space]
+
+    def get(self, ids=None, include=None, **kwargs) -> dict:
+        """
+        Chroma-style get() over the metadata table: ids, and the documents
+        and metadatas if `include` asks for them.
+        """
+        include = ["documents", "metadatas"] if include is None else include
+        if self._ids is None:
+            self._ids = {self._record(i)["id"]: i for i in range(len(self))}
+        rows = range(len(self)) if ids is None else [self._ids[id_] for id_ in ids if id_ in self._ids]
+        records = [self._record(i) for i in rows]
+        result = {"ids": [record["id"] for record in records]}
+        if "documents" in include:
+            result["documents"] = [record["document"] for record in records]
+        if "metadatas" in include:
+            result["metadatas"] = [record["metadata"] for record in records]
+        return result
+
+    def add_texts(self, texts, metadatas=None, **kwargs):
+        raise NotImplementedError("CompactIndex is read-only; update the Chroma store and export it again.")
+
+    @classmethod
+    def from_texts(cls, texts, embedding, metadatas=None, **kwargs):
+        raise NotImplementedError("Build a Chroma store and export it with export_index().")
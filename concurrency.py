@@ -0,0 +1,49 @@
+import asyncio
+import contextvars
+import functools
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+class BlockingExecutor:
+    """
+    A named, fixed-size thread pool for blocking work called from async
+    handlers (sync LLM calls, crew runs, HTTP fetches, index builds), so the
+    event loop keeps serving other requests while it runs.
+    """
+
+    def __init__(self, max_workers: int, name: str):
+        self.max_workers = max_workers
+        self.name = name
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+
+    def _tracked(self, fn, *args, **kwargs):
+        with self._lock:
+            self._in_flight += 1
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+    async def run(self, fn, *args, **kwargs):
+        """
+        Run `fn(*args, **kwargs)` on the pool and await its result, in a copy
+        of the caller's context so request-scoped tracing follows the work.
+        """
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(
+            self._executor, functools.partial(context.run, self._tracked, fn, *args, **kwargs)
+        )
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict:
+        return {"name": self.name, "max_workers": self.max_workers, "in_flight": self._in_flight}
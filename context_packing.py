@@ -0,0 +1,109 @@
+import logging
+import threading
+from collections import defaultdict
+
+from langchain_core.documents import Document
+
+from sessions import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+
+class ContextPacker:
+    """
+    Shapes retrieved chunks into the `{context}` of the stuff-documents
+    chain within a token budget.
+
+    Chunks of the same page that overlap or touch (by `start_index`) are
+    merged into one passage, so the splitter's overlap is not paid twice and
+    the LLM sees continuous text. Passages keep the retriever's ranking and
+    are added until `token_budget` is reached; the first passage that does
+    not fit is cut to the remaining budget if at least `min_tokens` are left.
+    """
+
+    def __init__(self, token_budget: int = 1500, min_tokens: int = 50, max_gap: int = 2):
+        self.token_budget = token_budget
+        self.min_tokens = min_tokens
+        # Chunks at most this many characters apart count as neighbours
+        self.max_gap = max_gap
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._tokens_in = 0
+        self._tokens_out = 0
+
+    def _merge(self, documents: list) -> list:
+        """
+        (rank, document) passages with overlapping and neighbouring chunks of
+        a page merged and exact repeats dropped.
+        """
+        by_source, passages, seen = defaultdict(list), [], set()
+        for rank, document in enumerate(documents):
+            if document.page_content in seen:
+                continue
+            seen.add(document.page_content)
+            if "start_index" in document.metadata:
+                by_source[document.metadata.get("source")].append((rank, document))
+            else:
+                passages.append((rank, document))
+
+        for chunks in by_source.values():
+            chunks.sort(key=lambda item: item[1].metadata["start_index"])
+            rank, first = chunks[0]
+            text, metadata = first.page_content, first.metadata
+            end = metadata["start_index"] + len(text)
+            for next_rank, chunk in chunks[1:]:
+                next_start = chunk.metadata["start_index"]
+                next_end = next_start + len(chunk.page_content)
+                overlap = end - next_start
+                if -overlap > self.max_gap:
+                    passages.append((rank, Document(page_content=text, metadata=metadata)))
+                    rank, text, metadata, end = next_rank, chunk.page_content, chunk.metadata, next_end
+                    continue
+                if next_end <= end:
+                    pass  # contained in the passage already
+                elif overlap >= 0 and text.endswith(chunk.page_content[:overlap]):
+                    text += chunk.page_content[overlap:]
+                else:
+                    # Whitespace between the chunks was stripped by the splitter
+                    text += "\n\n" + chunk.page_content
+                end = max(end, next_end)
+                rank = min(rank, next_rank)
+            passages.append((rank, Document(page_content=text, metadata=metadata)))
+        passages.sort(key=lambda item: item[0])
+        return passages
+
+    def pack(self, documents: list) -> list:
+        packed, used = [], 0
+        for _, document in self._merge(documents):
+            tokens = estimate_tokens(document.page_content)
+            remaining = self.token_budget - used
+            if tokens <= remaining:
+                packed.append(document)
+                used += tokens
+                continue
+            if remaining >= self.min_tokens:
+                # Roughly four characters per token, cut at a word boundary.
+                text = document.page_content[:remaining * 4].rsplit(" ", 1)[0]
+                packed.append(Document(page_content=text, metadata=document.metadata))
+                used += estimate_tokens(text)
+            break
+
+        tokens_in = sum(estimate_tokens(document.page_content) for document in documents)
+        with self._lock:
+            self._requests += 1
+            self._tokens_in += tokens_in
+            self._tokens_out += used
+        logger.info(
+            f"Packed {len(documents)} chunks into {len(packed)} passages: "
+            f"{used} of {tokens_in} context tokens, {tokens_in - used} saved."
+        )
+        return packed
+
+    def stats(self) -> dict:
+        return {
+            "token_budget": self.token_budget,
+            "requests": self._requests,
+            "tokens_in": self._tokens_in,
+            "tokens_out": self._tokens_out,
+            "tokens_saved": self._tokens_in - self._tokens_out,
+        }
@@ -0,0 +1,313 @@
+from langchain.vectorstores import Chroma
+from dotenv import load_dotenv
+from fastapi import HTTPException
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+import hashlib
+import logging
+import os
+from chain_registry import ChainRegistry
+from crawler import Crawler
+from frontier import Frontier
+from semantic_cache import SemanticCache
+from sessions import ConversationMemory, make_session_store
+from concurrency import BlockingExecutor
+from warmup import IndexWarmer
+from indexer import IndexManifest, build_vectorstore
+from compact_index import CompactIndex, export_index
+from embedding_pipeline import EmbeddingPipeline
+from embedding_cache import CachedEmbeddings
+from lazy import LazyEmbeddings
+from chunking import HeadingTextSplitter
+from retrieval import BM25Index, CrossEncoderReranker, HybridRetriever
+from context_packing import ContextPacker
+from observability import MetricsCallbackHandler, PayloadSampler, span
+from admission import AdmissionController
+from crawler import make_session
+from providers import FIXTURE_SITE_DIR, make_embeddings, make_llm, mount_fetcher
+
+# The parts every pipeline shares, one copy per process: the crawler and
+# index, the embedding model, the LLM client and RAG chains, the caches and
+# the chat history. See pipelines.py for what is built on top of them.
+
+logger = logging.getLogger(__name__)
+# GROQ_API_KEY and the settings below can also come from a .env file
+load_dotenv()
+# Share of requests whose full question and answer are logged (0 = none)
+PAYLOAD_LOG_SAMPLE_RATE = float(os.getenv("PAYLOAD_LOG_SAMPLE_RATE", "0"))
+payload_log = PayloadSampler(PAYLOAD_LOG_SAMPLE_RATE)
+# Times retrieval and LLM calls inside the chain and counts LLM tokens
+metrics_callbacks = MetricsCallbackHandler()
+
+# Backends (see providers.py). LLM_PROVIDER=fake, EMBEDDING_PROVIDER=hashing and
+# FETCHER=fixtures run the service offline, on the saved pages in FIXTURE_SITE_DIR.
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", "groq")
+FAKE_LLM_LATENCY_MS = float(os.getenv("FAKE_LLM_LATENCY_MS", "300"))
+FAKE_LLM_TOKENS_PER_S = float(os.getenv("FAKE_LLM_TOKENS_PER_S", "200"))
+EMBEDDING_PROVIDER = os.getenv("EMBEDDING_PROVIDER", "huggingface")
+FETCHER = os.getenv("FETCHER", "http")
+FIXTURE_SITE_DIR = os.getenv("FIXTURE_SITE_DIR", str(FIXTURE_SITE_DIR))
+
+def load_embeddings():
+    # With HuggingFace, imports sentence-transformers and torch, and loads the weights
+    return make_embeddings(EMBEDDING_PROVIDER, EMBEDDING_MODEL_NAME)
+
+# Constants
+ALLOWED_URL = "https://www.travellofoodie.com/"
+persist_directory = os.getenv("PERSIST_DIRECTORY", "./chroma_db")
+# Embeddings are cached on disk by (model name, text hash), so rebuilds only embed new chunks
+EMBEDDING_MODEL_NAME = "all-MiniLM-L6-v2" if EMBEDDING_PROVIDER == "huggingface" else EMBEDDING_PROVIDER
+EMBEDDING_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", "./embedding_cache")
+embedding_model = CachedEmbeddings(
+    LazyEmbeddings(load_embeddings, EMBEDDING_MODEL_NAME), EMBEDDING_MODEL_NAME, cache_dir=EMBEDDING_CACHE_DIR
+)
+# Load the models at import so a preforking server (gunicorn --preload) shares them
+# across its workers; otherwise they load in the background warm-up.
+PRELOAD_MODELS = os.getenv("PRELOAD_MODELS", "0") == "1"
+LLM_CONFIG = {
+    "model": "llama-3.1-8b-instant",
+    "temperature": 0.0,
+    "max_retries": 2,
+}
+# Every LLM call (RAG answers, history summaries, crew calls) is admitted through one gate:
+# LLM_MAX_RPM calls a minute (bursts of LLM_BURST), at most LLM_MAX_CONCURRENT at once.
+# Waiting RAG answers go first; a lane with LLM_MAX_QUEUED waiting calls turns new ones
+# away, and RAG answers give up after LLM_MAX_WAIT_S (the API then returns 429).
+LLM_MAX_RPM = int(os.getenv("LLM_MAX_RPM", "60"))
+LLM_BURST = int(os.getenv("LLM_BURST", "10"))
+LLM_MAX_CONCURRENT = int(os.getenv("LLM_MAX_CONCURRENT", "8"))
+LLM_MAX_QUEUED = int(os.getenv("LLM_MAX_QUEUED", "50"))
+LLM_MAX_WAIT_S = float(os.getenv("LLM_MAX_WAIT_S", "10"))
+llm_admission = AdmissionController(
+    max_concurrent=LLM_MAX_CONCURRENT, per_minute=LLM_MAX_RPM, burst=LLM_BURST, max_queued=LLM_MAX_QUEUED,
+    lanes=("rag", "summary", "crew"),
+)
+# Shared pooled HTTP session, bounded worker pool and per-host rate limit for scraping
+crawler = Crawler(
+    max_workers=8, requests_per_second=10.0, session=mount_fetcher(make_session(8), FETCHER, FIXTURE_SITE_DIR)
+)
+# Breadth-first link discovery limits (sitemap pages count as depth 0)
+CRAWL_MAX_DEPTH = int(os.getenv("CRAWL_MAX_DEPTH", "2"))
+CRAWL_MAX_PAGES = int(os.getenv("CRAWL_MAX_PAGES", "500"))
+# Chunks follow the page headings; see chunking.HeadingTextSplitter
+text_splitter = HeadingTextSplitter(chunk_size=1000, chunk_overlap=100)
+# Chunks are embedded in batches; EMBED_PROCESSES > 0 spreads them over worker processes
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))
+EMBED_PROCESSES = int(os.getenv("EMBED_PROCESSES", "0"))
+embedding_pipeline = EmbeddingPipeline(
+    embedding_model, batch_size=EMBED_BATCH_SIZE, processes=EMBED_PROCESSES, provider=EMBEDDING_PROVIDER
+)
+
+# Sync work called from async handlers (embedding, index builds, crawling) runs
+# here so a slow request never blocks the event loop for other users
+BLOCKING_WORKERS = int(os.getenv("BLOCKING_WORKERS", "16"))
+blocking_executor = BlockingExecutor(BLOCKING_WORKERS, "blocking")
+
+# Chunks put into the prompt, and candidates fetched from each of vector and BM25 search.
+# Set RERANKER_MODEL (e.g. cross-encoder/ms-marco-MiniLM-L-6-v2) to rerank the candidates.
+RETRIEVER_K = int(os.getenv("RETRIEVER_K", "4"))
+RETRIEVER_FETCH_K = int(os.getenv("RETRIEVER_FETCH_K", "20"))
+RERANKER_MODEL = os.getenv("RERANKER_MODEL", "")
+reranker = CrossEncoderReranker(RERANKER_MODEL) if RERANKER_MODEL else None
+# Retrieved chunks are merged and cut to this many tokens of {context}
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1500"))
+context_packer = ContextPacker(token_budget=CONTEXT_TOKEN_BUDGET)
+
+# COMPACT_INDEX=int8 or float16 serves a memory-mapped, quantized export of the index
+# (see compact_index.py) in COMPACT_INDEX_DIR instead of Chroma; it is re-exported
+# whenever the Chroma store changes.
+COMPACT_INDEX = os.getenv("COMPACT_INDEX", "")
+COMPACT_INDEX_DIR = os.getenv("COMPACT_INDEX_DIR", "./compact_index")
+
+# Near-duplicate questions reuse a stored answer; cleared whenever the index changes
+answer_cache = SemanticCache(embedding_model, threshold=0.9, ttl=3600, max_entries=1000)
+
+# The vector store, loaded once in the background; see main.lifespan()
+index_warmer = IndexWarmer(
+    lambda: warm_up(),
+    on_ready=lambda vector_store: chain_registry.get(vector_store),
+)
+WARMING_UP_MESSAGE = "I'm still getting ready to answer questions about TravelloFoodie. Please try again in a minute."
+
+# Chat history per session: "memory" (LRU) or "sqlite" backend, with a token budget
+SESSION_BACKEND = os.getenv("SESSION_BACKEND", "memory")
+SESSION_DB_PATH = os.getenv("SESSION_DB_PATH", "sessions.db")
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "1500"))
+
+def load_models():
+    """
+    Load the models that are otherwise loaded on first use.
+    """
+    embedding_model.underlying.load()
+    if reranker is not None:
+        reranker.load()
+
+def warm_up():
+    """
+    The background warm-up at startup: models first, then the vector store.
+    """
+    load_models()
+    return load_or_create_vectorstore(ALLOWED_URL)
+
+# Utility to check and load/create the vector store
+def load_or_create_vectorstore(url: str):
+    """
+    Load the vector store if it exists, otherwise scrape and create a new one.
+    With COMPACT_INDEX, an up-to-date export is opened instead when there is one.
+    """
+    if COMPACT_INDEX:
+        try:
+            return CompactIndex.load(
+                COMPACT_INDEX_DIR, embedding_model, model_name=EMBEDDING_MODEL_NAME, source_version=index_version()
+            )
+        except FileNotFoundError:
+            logger.info(f"No compact index in {COMPACT_INDEX_DIR} yet; it is exported after loading the vector store.")
+        except ValueError as e:
+            logger.warning(f"Not using the compact index: {e}")
+    if os.path.exists(persist_directory):
+        # Load the existing vector store
+        logger.info(f"Loading existing vector store from {persist_directory}.")
+        vector_store = open_vectorstore()
+    else:
+        # Create a new vector store by scraping the website
+        logger.info(f"Creating new vector store from {url}.")
+        vector_store = get_vectorstore_from_url(url)
+
+    if COMPACT_INDEX:
+        vector_store = compact_vectorstore(vector_store)
+    return vector_store
+
+def open_vectorstore():
+    return Chroma(persist_directory=persist_directory, embedding_function=embedding_model)
+
+def index_version():
+    # Chunk IDs are content hashes, so this changes exactly when the indexed chunks do
+    chunk_ids = sorted(chunk_id for page in IndexManifest(persist_directory).pages.values() for chunk_id in page["chunk_ids"])
+    return hashlib.sha1("\n".join(chunk_ids).encode("utf-8")).hexdigest() if chunk_ids else None
+
+def compact_vectorstore(vector_store):
+    """
+    Export the Chroma store to COMPACT_INDEX_DIR and open the export.
+    """
+    with span("index_export"):
+        export_index(
+            vector_store, COMPACT_INDEX_DIR, dtype=COMPACT_INDEX, model_name=EMBEDDING_MODEL_NAME,
+            source_version=index_version(),
+        )
+    return CompactIndex.load(COMPACT_INDEX_DIR, embedding_model, model_name=EMBEDDING_MODEL_NAME)
+
+# Scraping function to extract all links from the website
+def get_all_links(base_url: str) -> set:
+    return discover_site(base_url)[0]
+
+def discover_site(base_url: str) -> tuple:
+    """
+    The site's links, and the pages fetched while finding them (URL -> Page),
+    so a crawl of the links does not fetch those again.
+    """
+    if base_url != ALLOWED_URL:
+        raise HTTPException(status_code=400, detail=f"Only {ALLOWED_URL} is allowed.")
+
+    try:
+        logger.info(f"Fetching links from {base_url}...")
+        frontier = Frontier(crawler, base_url, max_depth=CRAWL_MAX_DEPTH, max_pages=CRAWL_MAX_PAGES)
+        links = set(frontier.discover())
+
+        logger.info(f"Found {len(links)} links.")
+        return links, frontier.pages
+    except Exception as e:
+        logger.error(f"Error fetching links from {base_url}: {e}")
+        raise HTTPException(status_code=500, detail=f"Error fetching links: {str(e)}")
+
+# Vector store creation from scraped website content
+def get_vectorstore_from_url(url: str):
+    """
+    Create a vector store from all pages of the specified URL.
+    Restricts scraping and storage to the predefined ALLOWED_URL.
+    """
+    if url != ALLOWED_URL:
+        raise HTTPException(status_code=400, detail="Only the fixed URL can be used to create the vector store.")
+
+    with span("crawl"):
+        links, fetched = discover_site(url)
+        pages, crawl_report = crawler.crawl_pages(links, fetched=fetched)
+    logger.info(f"Loaded {len(pages)} documents at {crawl_report.pages_per_second:.1f} pages/s.")
+
+    with span("index_build"):
+        vector_store = build_vectorstore(pages, embedding_model, text_splitter, persist_directory, embedding_pipeline)
+
+    logger.info("Vector store created successfully.")
+    return vector_store
+# Conversational RAG Chain setup
+def get_context_retriever_chain(vector_store):
+    """
+    Creates and returns a retriever chain from the given vector store.
+    """
+    try:
+        # Vector and BM25 search over the same chunks, fused and optionally reranked
+        retriever = HybridRetriever(
+            vector_store=vector_store,
+            bm25=BM25Index.from_vector_store(vector_store),
+            k=RETRIEVER_K,
+            fetch_k=RETRIEVER_FETCH_K,
+            reranker=reranker,
+        )
+        logger.info("Retriever chain created successfully.")
+        return retriever
+    except Exception as e:
+        logger.error(f"Error creating retriever chain: {e}")
+        raise HTTPException(status_code=500, detail="Failed to initialize the retriever chain.")
+
+
+def get_llm(**config):
+    return make_llm(
+        LLM_PROVIDER,
+        fake_latency=FAKE_LLM_LATENCY_MS / 1000,
+        fake_tokens_per_second=FAKE_LLM_TOKENS_PER_S,
+        **config,
+    )
+
+
+def get_prompt():
+    return ChatPromptTemplate.from_messages([(
+        "system", """
+        You are an intelligent assistant greet the customers politely based on their question you are responsible for answering user questions strictly based on the content provided from the specific website based on the given context:\n\n{context}
+        If the information is not available on provided specific website, respond with:
+        'I couldn't find the information to this question on the website'
+        """),
+        MessagesPlaceholder(variable_name="chat_history"),
+        ("user", "{input}")
+    ])
+
+
+def get_agents_prompt():
+    # The agents pipeline offers to search external sources when the site has no answer
+    return ChatPromptTemplate.from_messages([(
+        "system", """
+        You are an intelligent assistant. Greet customers politely and answer their questions strictly based on the content provided on the specific website only.
+        If the information is not available on provided specific website, respond with:
+        'I couldn't find the information to this question on the website'
+        verify with user and ask if they want to retrieve information from external resources.
+        If user says 'yes' or 'okay' find best places to visit based on the given context:\n\n{context}
+        """),
+        MessagesPlaceholder(variable_name="chat_history"),
+        ("user", "{input}")
+    ])
+
+
+# Shared across requests and pipelines; rebuilt only when the vector store or LLM_CONFIG changes
+chain_registry = ChainRegistry(
+    retriever_factory=get_context_retriever_chain,
+    llm_factory=get_llm,
+    prompt_factory=get_prompt,
+    llm_config=LLM_CONFIG,
+    context_packer=context_packer,
+    prompt_factories={"agents": get_agents_prompt},
+)
+
+conversation_memory = ConversationMemory(
+    make_session_store(SESSION_BACKEND, **({"path": SESSION_DB_PATH} if SESSION_BACKEND == "sqlite" else {})),
+    llm_provider=lambda: chain_registry.llm,
+    history_token_budget=HISTORY_TOKEN_BUDGET,
+    # A summary that cannot get in keeps the tail of the old turns instead
+    llm_slot=lambda: llm_admission.slot("summary", timeout=LLM_MAX_WAIT_S),
+)
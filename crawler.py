@@ -0,0 +1,255 @@
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from urllib.parse import urlparse
+
+import requests
+from bs4 import BeautifulSoup
+from langchain_core.documents import Document
+from requests.adapters import HTTPAdapter
+
+from extraction import extract_main_text
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = "TravelloFoodieBot/1.0 (+https://www.travellofoodie.com/)"
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+@dataclass
+class CrawlReport:
+    pages: int = 0
+    failed: int = 0
+    retries: int = 0
+    not_modified: int = 0
+    # Pages already fetched by the frontier while it collected links
+    reused: int = 0
+    bytes: int = 0
+    elapsed: float = 0.0
+    errors: dict = field(default_factory=dict)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    def add(self, **counts):
+        # Workers update the same report concurrently.
+        with self._lock:
+            for name, value in counts.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    @property
+    def pages_per_second(self) -> float:
+        return self.pages / self.elapsed if self.elapsed else 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "pages": self.pages,
+            "failed": self.failed,
+            "retries": self.retries,
+            "not_modified": self.not_modified,
+            "reused": self.reused,
+            "bytes": self.bytes,
+            "elapsed_s": round(self.elapsed, 3),
+            "pages_per_second": round(self.pages_per_second, 2),
+            "errors": dict(self.errors),
+        }
+
+
+@dataclass
+class Page:
+    url: str
+    # None when the server answered 304 Not Modified to a conditional GET
+    document: Document = None
+    etag: str = None
+    last_modified: str = None
+
+    @property
+    def not_modified(self) -> bool:
+        return self.document is None
+
+
+class HostRateLimiter:
+    """
+    Spaces requests to the same host at least 1 / requests_per_second apart.
+    """
+
+    def __init__(self, requests_per_second: float):
+        self.interval = 1.0 / requests_per_second if requests_per_second else 0.0
+        self._next_slot = {}
+        self._lock = threading.Lock()
+
+    def wait(self, host: str):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def make_session(pool_size: int) -> requests.Session:
+    """
+    Create a requests session whose connection pool fits `pool_size` workers.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers["User-Agent"] = USER_AGENT
+    return session
+
+
+def html_to_document(url: str, html) -> Document:
+    """
+    Build a Document with the same source, title, description and language
+    metadata as WebBaseLoader, but only the page's main content as text
+    (see extraction.extract_main_text) instead of every string on the page.
+    `html` may also be an already parsed BeautifulSoup, which is modified.
+    """
+    soup = html if isinstance(html, BeautifulSoup) else BeautifulSoup(html, "html.parser")
+    metadata = {"source": url}
+    if soup.title and soup.title.string:
+        metadata["title"] = soup.title.string.strip()
+    description = soup.find("meta", attrs={"name": "description"})
+    if description and description.get("content"):
+        metadata["description"] = description["content"]
+    html_tag = soup.find("html")
+    if html_tag and html_tag.get("lang"):
+        metadata["language"] = html_tag["lang"]
+    return Document(page_content=extract_main_text(soup), metadata=metadata)
+
+
+class Crawler:
+    """
+    Fetches pages over a shared pooled session with a bounded worker pool,
+    per-host rate limiting and retries with exponential backoff. A server's
+    Retry-After is honoured up to `max_retry_delay` seconds; a longer one
+    would hold a worker for that long, so backoff is used instead.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 8,
+        requests_per_second: float = 10.0,
+        max_retries: int = 3,
+        backoff: float = 0.5,
+        timeout: float = 10.0,
+        max_retry_delay: float = 30.0,
+        session: requests.Session = None,
+    ):
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.max_retry_delay = max_retry_delay
+        self.session = session or make_session(max_workers)
+        self.rate_limiter = HostRateLimiter(requests_per_second)
+
+    def _retry_delay(self, attempt: int, response=None) -> float:
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after and retry_after.isdigit() and float(retry_after) <= self.max_retry_delay:
+            return float(retry_after)
+        return self.backoff * (2 ** attempt) * (1 + random.random() / 2)
+
+    def fetch(self, url: str, headers: dict = None, report: CrawlReport = None) -> requests.Response:
+        """
+        GET `url`, retrying connection errors, 429s and 5xx responses.
+        Raises the last error once retries are exhausted.
+        """
+        host = urlparse(url).netloc
+        for attempt in range(self.max_retries + 1):
+            self.rate_limiter.wait(host)
+            response = None
+            try:
+                response = self.session.get(url, headers=headers, timeout=self.timeout)
+                if response.status_code not in RETRY_STATUS_CODES:
+                    response.raise_for_status()
+                    return response
+                error = requests.HTTPError(f"{response.status_code} for {url}", response=response)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = e
+            if attempt == self.max_retries:
+                raise error
+            if report is not None:
+                report.add(retries=1)
+            delay = self._retry_delay(attempt, response)
+            logger.warning(f"Retrying {url} in {delay:.2f}s after: {error}")
+            time.sleep(delay)
+
+    def load_page(self, url: str, validators: dict = None, report: CrawlReport = None) -> Page:
+        """
+        Fetch one page. With `validators` ({"etag": ..., "last_modified": ...}
+        from a previous crawl) a conditional GET is sent, and an unchanged
+        page comes back as a Page without a document.
+        """
+        headers = {}
+        if validators:
+            if validators.get("etag"):
+                headers["If-None-Match"] = validators["etag"]
+            if validators.get("last_modified"):
+                headers["If-Modified-Since"] = validators["last_modified"]
+        response = self.fetch(url, headers=headers or None, report=report)
+        if response.status_code == 304:
+            if report is not None:
+                report.add(not_modified=1)
+            return Page(url, etag=validators.get("etag"), last_modified=validators.get("last_modified"))
+        if report is not None:
+            report.add(bytes=len(response.content))
+        return self.to_page(url, response)
+
+    @staticmethod
+    def to_page(url: str, response: requests.Response, soup: BeautifulSoup = None) -> Page:
+        """
+        The Page for a successful response (from `soup` if it is parsed already).
+        """
+        return Page(
+            url,
+            document=html_to_document(url, soup if soup is not None else response.content),
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified"),
+        )
+
+    def load(self, url: str, report: CrawlReport = None) -> list:
+        return [self.load_page(url, report=report).document]
+
+    def crawl_pages(self, urls, validators: dict = None, fetched: dict = None) -> tuple:
+        """
+        Load every URL concurrently and return (pages, CrawlReport).
+        `validators` maps a URL to the ETag/Last-Modified seen last time.
+        `fetched` maps URLs to Pages loaded already (by the frontier), which
+        are used as they are instead of being fetched again.
+        Pages that still fail after retries are logged and skipped.
+        """
+        validators = validators or {}
+        fetched = fetched or {}
+        report = CrawlReport()
+        pages = [fetched[url] for url in urls if url in fetched]
+        report.pages = report.reused = len(pages)
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {
+                executor.submit(self.load_page, url, validators.get(url), report): url
+                for url in urls if url not in fetched
+            }
+            for future in as_completed(futures):
+                url = futures[future]
+                try:
+                    pages.append(future.result())
+                    report.pages += 1
+                except Exception as e:
+                    logger.error(f"Error loading {url}: {e}")
+                    report.failed += 1
+                    report.errors[url] = str(e)
+        report.elapsed = time.perf_counter() - start
+        logger.info(f"Crawl report: {report.as_dict()}")
+        return pages, report
+
+    def crawl(self, urls) -> tuple:
+        """
+        Load every URL concurrently and return (documents, CrawlReport).
+        """
+        pages, report = self.crawl_pages(urls)
+        return [page.document for page in pages], report
@@ -0,0 +1,53 @@
+import logging
+import time
+
+from crewai import BaseLLM
+
+from admission import Overloaded
+from core import LLM_MAX_WAIT_S, llm_admission
+
+logger = logging.getLogger(__name__)
+
+
+class AdmittedLLM(BaseLLM):
+    """
+    The agents' LLM: every call the crew makes to `llm` holds a slot of the
+    shared LLM gate (the "crew" lane) for as long as it runs, so crew runs
+    count against LLM_MAX_RPM and LLM_MAX_CONCURRENT like every other call.
+
+    A crew run is a background job, so when the gate turns a call away it
+    waits the suggested time and asks again instead of failing the job.
+    """
+
+    def __init__(self, llm):
+        super().__init__(model=llm.model, temperature=getattr(llm, "temperature", None))
+        self.llm = llm
+
+    def _admit(self):
+        while True:
+            try:
+                llm_admission.acquire("crew", timeout=LLM_MAX_WAIT_S)
+                return
+            except Overloaded as e:
+                logger.info(f"Crew LLM call deferred: {e}")
+                time.sleep(e.retry_after)
+
+    def call(self, messages, *args, **kwargs):
+        start = time.monotonic()
+        self._admit()
+        waited = time.monotonic() - start
+        if waited >= 1:
+            logger.info(f"Crew LLM call waited {waited:.1f}s for admission.")
+        try:
+            return self.llm.call(messages, *args, **kwargs)
+        finally:
+            llm_admission.release()
+
+    def supports_function_calling(self) -> bool:
+        return self.llm.supports_function_calling()
+
+    def supports_stop_words(self) -> bool:
+        return self.llm.supports_stop_words()
+
+    def get_context_window_size(self) -> int:
+        return self.llm.get_context_window_size()
@@ -0,0 +1,214 @@
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger(__name__)
+
+# index.bin record: 16-byte blake2b digest of the text, then its int64 row in vectors.f32
+INDEX_RECORD = np.dtype([("digest", "V16"), ("row", "<i8")])
+
+
+def text_digest(text: str) -> bytes:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+
+class EmbeddingStore:
+    """
+    Append-only on-disk embedding table for one model.
+
+    `vectors.f32` holds raw little-endian float32 rows and is read through a
+    read-only memory map, so lookups copy only the rows they need and
+    processes on the same host share the page cache. `index.bin` maps text
+    digests to rows. Appends take an exclusive file lock, so several workers
+    can share one cache directory.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.vectors_path = os.path.join(directory, "vectors.f32")
+        self.index_path = os.path.join(directory, "index.bin")
+        self.meta_path = os.path.join(directory, "meta.json")
+        self.dim = None
+        self._load_meta()
+        self._rows = {}
+        self._index_offset = 0
+        self._mmap = None
+        self._lock = threading.Lock()
+        self._load_index()
+
+    def _load_meta(self):
+        if self.dim is None and os.path.exists(self.meta_path):
+            with open(self.meta_path) as f:
+                self.dim = json.load(f)["dim"]
+
+    def _load_index(self):
+        """
+        Read index records appended since the last call (also by other processes).
+        """
+        if not os.path.exists(self.index_path):
+            return
+        # Another process may have written the first vectors since we started
+        self._load_meta()
+        size = os.path.getsize(self.index_path)
+        size -= size % INDEX_RECORD.itemsize
+        if size <= self._index_offset:
+            return
+        with open(self.index_path, "rb") as f:
+            f.seek(self._index_offset)
+            records = np.frombuffer(f.read(size - self._index_offset), dtype=INDEX_RECORD)
+        # Rows are written before their index records, so a record past the end of
+        # vectors.f32 comes from a write that was lost; its row would be another text's.
+        written = records["row"] < self._stored_rows()
+        if not written.all():
+            logger.warning(f"Ignoring {int((~written).sum())} embedding cache records without a vector in {self.directory}")
+            records = records[written]
+        self._rows.update(zip((bytes(digest) for digest in records["digest"]), records["row"].tolist()))
+        self._index_offset = size
+
+    def _stored_rows(self) -> int:
+        if self.dim is None or not os.path.exists(self.vectors_path):
+            return 0
+        return os.path.getsize(self.vectors_path) // (self.dim * 4)
+
+    def _vectors(self, needed_rows: int):
+        if self._mmap is None or self._mmap.shape[0] < needed_rows:
+            rows = self._stored_rows()
+            self._mmap = np.memmap(self.vectors_path, dtype="<f4", mode="r", shape=(rows, self.dim))
+        return self._mmap
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def get_many(self, digests: list) -> list:
+        """
+        Stored vectors for `digests`, with None for the ones not cached.
+        """
+        with self._lock:
+            if any(digest not in self._rows for digest in digests):
+                self._load_index()
+            rows = [self._rows.get(digest) for digest in digests]
+            found = [row for row in rows if row is not None]
+            if not found:
+                return [None] * len(digests)
+            vectors = self._vectors(max(found) + 1)
+            return [None if row is None else np.array(vectors[row]) for row in rows]
+
+    def put_many(self, digests: list, vectors) -> None:
+        vectors = np.ascontiguousarray(vectors, dtype="<f4")
+        with self._lock:
+            if self.dim is None:
+                self.dim = int(vectors.shape[1])
+                with open(self.meta_path, "w") as f:
+                    json.dump({"dim": self.dim}, f)
+            with open(self.index_path, "ab") as index_file, open(self.vectors_path, "ab") as vectors_file:
+                fcntl.flock(index_file, fcntl.LOCK_EX)
+                try:
+                    # A write that crashed partway leaves part of a row or record at the end;
+                    # drop it, or everything appended after it would sit at the wrong offset.
+                    first_row = self._truncate_partial(vectors_file, self.dim * 4)
+                    self._truncate_partial(index_file, INDEX_RECORD.itemsize)
+                    vectors_file.write(vectors.tobytes())
+                    vectors_file.flush()
+                    records = np.empty(len(digests), dtype=INDEX_RECORD)
+                    records["digest"] = digests
+                    records["row"] = np.arange(first_row, first_row + len(digests))
+                    index_file.write(records.tobytes())
+                    index_file.flush()
+                finally:
+                    fcntl.flock(index_file, fcntl.LOCK_UN)
+            self._load_index()
+
+    @staticmethod
+    def _truncate_partial(file, item_size: int) -> int:
+        """
+        Cut `file` back to a whole number of `item_size` items and return that number.
+        """
+        items, partial = divmod(file.seek(0, os.SEEK_END), item_size)
+        if partial:
+            os.ftruncate(file.fileno(), items * item_size)
+        return items
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Wraps an Embeddings model with a persistent cache keyed by
+    (model name, text hash), so unchanged chunks cost no embedding compute
+    on a rebuild. Question vectors are kept only in a bounded in-memory
+    LRU: every distinct question would otherwise grow the append-only store
+    for good, and add a locked disk write to the request.
+    """
+
+    def __init__(self, underlying, model_name: str = None, cache_dir: str = "./embedding_cache",
+                 query_cache_size: int = 1024):
+        self.underlying = underlying
+        self.model_name = model_name or underlying.model_name
+        safe_name = re.sub(r"[^A-Za-z0-9_.-]+", "_", self.model_name)
+        self.store = EmbeddingStore(os.path.join(cache_dir, safe_name))
+        self.query_cache_size = query_cache_size
+        self._queries = OrderedDict()
+        # Guards the question LRU and the hit counters, which request threads and the ingest pool share
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, texts: list) -> list:
+        """
+        Cached document vectors for `texts` (None where missing).
+        """
+        vectors = self.store.get_many([text_digest(text) for text in texts])
+        found = sum(vector is not None for vector in vectors)
+        with self._lock:
+            self.hits += found
+            self.misses += len(texts) - found
+        return vectors
+
+    def remember(self, texts: list, vectors: list):
+        if texts:
+            self.store.put_many([text_digest(text) for text in texts], vectors)
+
+    def embed_documents(self, texts: list) -> list:
+        vectors = self.lookup(texts)
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        if missing:
+            # Embed each distinct missing text once.
+            unique = list(dict.fromkeys(texts[i] for i in missing))
+            computed = dict(zip(unique, self.underlying.embed_documents(unique)))
+            self.remember(unique, [computed[text] for text in unique])
+            for i in missing:
+                vectors[i] = computed[texts[i]]
+        return [list(map(float, vector)) for vector in vectors]
+
+    def embed_query(self, text: str) -> list:
+        with self._lock:
+            if text in self._queries:
+                self._queries.move_to_end(text)
+                self.hits += 1
+                return self._queries[text]
+            self.misses += 1
+        vector = list(map(float, self.underlying.embed_query(text)))
+        with self._lock:
+            self._queries[text] = vector
+            while len(self._queries) > self.query_cache_size:
+                self._queries.popitem(last=False)
+        return vector
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        lookups = hits + misses
+        return {
+            "model_name": self.model_name,
+            "stored_vectors": len(self.store),
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+        }
@@ -0,0 +1,143 @@
+import logging
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import islice
+
+logger = logging.getLogger(__name__)
+
+# Set in each worker process by _init_worker
+_worker_model = None
+
+
+def batched(iterable, size: int):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def _init_worker(provider: str, model_name: str, threads: int):
+    """
+    Load a private copy of the embedding model in a pool worker, built the
+    same way as the parent's (see providers.make_embeddings) and limited to
+    `threads` CPU threads so the workers do not oversubscribe the cores.
+    """
+    global _worker_model
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    if provider == "huggingface":
+        import torch
+        torch.set_num_threads(threads)
+    from providers import make_embeddings
+    _worker_model = make_embeddings(provider, model_name)
+
+
+def _embed_in_worker(texts: list) -> list:
+    return _worker_model.embed_documents(texts)
+
+
+class EmbeddingPipeline:
+    """
+    Streams (id, chunk) pairs into a Chroma store batch by batch.
+
+    Each batch is embedded, either in-process or on a pool of `processes`
+    worker processes, and upserted into the collection as soon as it is
+    done. Only a few batches are in flight at once, so memory stays bounded
+    however large the site is.
+    """
+
+    def __init__(self, embedding_model, batch_size: int = 64, processes: int = 0, provider: str = "huggingface"):
+        self.embedding_model = embedding_model
+        self.batch_size = batch_size
+        self.processes = processes
+        # EMBEDDING_PROVIDER of `embedding_model`, which the worker processes rebuild it with
+        self.provider = provider
+        self._pool = None
+
+    def _get_pool(self):
+        if self._pool is None:
+            threads = max(1, (os.cpu_count() or 1) // self.processes)
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.processes,
+                initializer=_init_worker,
+                initargs=(self.provider, self.embedding_model.model_name, threads),
+            )
+        return self._pool
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def _lookup(self, texts: list) -> list:
+        """
+        Vectors the embedding cache already holds for `texts` (None where
+        missing), so worker processes only embed what is new.
+        """
+        lookup = getattr(self.embedding_model, "lookup", None)
+        return lookup(texts) if lookup is not None else [None] * len(texts)
+
+    def _merge(self, texts: list, cached: list, computed: list) -> list:
+        missing = [i for i, vector in enumerate(cached) if vector is None]
+        if hasattr(self.embedding_model, "remember"):
+            self.embedding_model.remember([texts[i] for i in missing], computed)
+        embeddings = list(cached)
+        for i, vector in zip(missing, computed):
+            embeddings[i] = vector
+        return [list(map(float, vector)) for vector in embeddings]
+
+    @staticmethod
+    def _write(vector_store, batch: list, embeddings: list):
+        ids = [id_ for id_, _ in batch]
+        vector_store._collection.upsert(
+            ids=ids,
+            embeddings=embeddings,
+            metadatas=[chunk.metadata for _, chunk in batch],
+            documents=[chunk.page_content for _, chunk in batch],
+        )
+
+    def ingest(self, vector_store, chunks_with_ids) -> dict:
+        """
+        Embed and write every (id, chunk) pair; returns a throughput report.
+        """
+        start = time.perf_counter()
+        chunks = batches = 0
+        if self.processes > 0:
+            pool = self._get_pool()
+            in_flight = {}
+            for batch in batched(chunks_with_ids, self.batch_size):
+                if len(in_flight) >= self.processes * 2:
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        batch_done, texts, cached = in_flight.pop(future)
+                        self._write(vector_store, batch_done, self._merge(texts, cached, future.result()))
+                texts = [chunk.page_content for _, chunk in batch]
+                cached = self._lookup(texts)
+                missing = [text for text, vector in zip(texts, cached) if vector is None]
+                if missing:
+                    in_flight[pool.submit(_embed_in_worker, missing)] = (batch, texts, cached)
+                else:
+                    self._write(vector_store, batch, self._merge(texts, cached, []))
+                chunks += len(batch)
+                batches += 1
+            for future in wait(in_flight).done:
+                batch_done, texts, cached = in_flight[future]
+                self._write(vector_store, batch_done, self._merge(texts, cached, future.result()))
+        else:
+            for batch in batched(chunks_with_ids, self.batch_size):
+                texts = [chunk.page_content for _, chunk in batch]
+                self._write(vector_store, batch, self.embedding_model.embed_documents(texts))
+                chunks += len(batch)
+                batches += 1
+        elapsed = time.perf_counter() - start
+        report = {
+            "chunks": chunks,
+            "batches": batches,
+            "batch_size": self.batch_size,
+            "processes": self.processes,
+            "elapsed_s": round(elapsed, 3),
+            "chunks_per_second": round(chunks / elapsed, 1) if elapsed else 0.0,
+        }
+        if hasattr(self.embedding_model, "stats"):
+            report["embedding_cache"] = self.embedding_model.stats()
+        logger.info(f"Embedding pipeline: {report}")
+        return report
@@ -0,0 +1,125 @@
+import hashlib
+import logging
+import re
+from collections import Counter
+
+from langchain_core.documents import Document
+
+logger = logging.getLogger(__name__)
+
+# Never page content
+NOISE_TAGS = ["script", "style", "noscript", "template", "iframe", "svg", "canvas", "form", "button", "nav", "aside"]
+# Site chrome, dropped only when the page has no <main>/<article> to narrow down to
+CHROME_TAGS = ["header", "footer"]
+# class/id names of navigation, sidebars, share bars and the like
+BOILERPLATE_HINTS = re.compile(
+    r"(^|[-_\s])(nav|navbar|navigation|menu|breadcrumbs?|sidebar|widget|footer|cookies?|consent|share|sharing|"
+    r"social|related|comments?|newsletter|subscribe|advert|ads|popup|modal|banner|pagination)([-_\s]|$)",
+    re.IGNORECASE,
+)
+MAIN_SELECTORS = ["main", "[role=main]", "article", "#content", ".entry-content", ".post-content"]
+HEADING_TAGS = ["h1", "h2", "h3", "h4", "h5", "h6"]
+BLOCK_TAGS = HEADING_TAGS + ["p", "li", "blockquote", "pre", "td", "th", "dt", "dd", "figcaption"]
+
+
+def _is_boilerplate(tag) -> bool:
+    if tag.attrs is None:
+        return False
+    names = " ".join(tag.get("class", []) + [tag.get("id") or ""])
+    return bool(names.strip()) and bool(BOILERPLATE_HINTS.search(names))
+
+
+def _drop(tags):
+    for tag in tags:
+        # Nested matches go with their decomposed parent
+        if not tag.decomposed:
+            tag.decompose()
+
+
+def extract_main_text(soup) -> str:
+    """
+    Text of the page's main content, one block per paragraph separated by
+    blank lines, with headings kept as markdown ("## Where to eat") so the
+    chunker can follow the page structure.
+
+    Scripts, navigation, sidebars, forms and elements whose class or id names
+    them as page chrome are removed first. `soup` is modified in place.
+    """
+    main = next((found for found in (soup.select_one(selector) for selector in MAIN_SELECTORS) if found), None)
+    if main is None:
+        main = soup.body or soup
+        _drop(main.find_all(CHROME_TAGS))
+    _drop(main.find_all(NOISE_TAGS))
+    _drop(main.find_all(_is_boilerplate))
+
+    blocks = []
+    for tag in main.find_all(BLOCK_TAGS + ["div"]):
+        if tag.find_parent(BLOCK_TAGS):
+            continue
+        if tag.name == "div":
+            # Only text sitting directly in a div with no block children
+            if tag.find(BLOCK_TAGS + ["div"]):
+                continue
+        text = " ".join(tag.get_text(" ", strip=True).split())
+        if not text:
+            continue
+        if tag.name in HEADING_TAGS:
+            text = f"{'#' * int(tag.name[1])} {text}"
+        blocks.append(text)
+    if not blocks:
+        blocks = [line for line in (" ".join(line.split()) for line in main.get_text("\n").splitlines()) if line]
+    return "\n\n".join(blocks)
+
+
+def block_key(block: str) -> str:
+    return hashlib.blake2b(" ".join(block.lower().split()).encode("utf-8"), digest_size=8).hexdigest()
+
+
+class BoilerplateFilter:
+    """
+    Drops text blocks that repeat across many pages of the site (cookie
+    notices, author boxes, "follow us" blurbs) that survived extraction.
+
+    `fit()` counts on how many pages each block appears; a block on at least
+    `min_pages` pages and at least `min_share` of all pages is boilerplate.
+    Headings are never dropped. The learnt block keys are saved in the index
+    manifest so refreshes strip the same blocks.
+    """
+
+    def __init__(self, min_pages: int = 3, min_share: float = 0.3, keys=None):
+        self.min_pages = min_pages
+        self.min_share = min_share
+        self.keys = set(keys or ())
+        self.blocks_dropped = 0
+        self.chars_in = 0
+        self.chars_out = 0
+
+    def fit(self, documents):
+        counts = Counter()
+        pages = 0
+        for document in documents:
+            pages += 1
+            counts.update({
+                block_key(block) for block in document.page_content.split("\n\n") if not block.startswith("#")
+            })
+        threshold = max(self.min_pages, self.min_share * pages)
+        self.keys = {key for key, count in counts.items() if count >= threshold}
+        logger.info(f"Found {len(self.keys)} boilerplate blocks repeated across {pages} pages.")
+        return self
+
+    def strip(self, document) -> Document:
+        blocks = document.page_content.split("\n\n")
+        kept = [block for block in blocks if block.startswith("#") or block_key(block) not in self.keys]
+        text = "\n\n".join(kept)
+        self.blocks_dropped += len(blocks) - len(kept)
+        self.chars_in += len(document.page_content)
+        self.chars_out += len(text)
+        return Document(page_content=text, metadata=dict(document.metadata))
+
+    def stats(self) -> dict:
+        return {
+            "boilerplate_blocks": len(self.keys),
+            "blocks_dropped": self.blocks_dropped,
+            "chars_in": self.chars_in,
+            "chars_out": self.chars_out,
+        }
@@ -0,0 +1,202 @@
+import hashlib
+import logging
+import posixpath
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qsl, urlencode, urljoin, urlparse, urlunparse
+from urllib.robotparser import RobotFileParser
+
+from bs4 import BeautifulSoup
+
+from crawler import USER_AGENT
+
+logger = logging.getLogger(__name__)
+
+TRACKING_PARAMS = {"gclid", "fbclid", "msclkid", "mc_cid", "mc_eid", "ref", "_ga", "_gl", "igshid"}
+TRACKING_PREFIXES = ("utm_",)
+SKIPPED_EXTENSIONS = {
+    ".jpg", ".jpeg", ".png", ".gif", ".webp", ".svg", ".ico", ".pdf", ".zip",
+    ".css", ".js", ".json", ".xml", ".mp3", ".mp4", ".webm", ".woff", ".woff2",
+}
+DEFAULT_PORTS = {"http": 80, "https": 443}
+MAX_SITEMAPS = 50
+
+
+def normalize_url(url: str, base_url: str = None):
+    """
+    Canonical form of a link so the same page is only crawled once: resolved
+    against `base_url`, lower-cased scheme and host, default port, fragment
+    and tracking parameters removed, query sorted, and no trailing slash
+    except on the root path. Returns None for non-HTTP links.
+    """
+    if base_url:
+        url = urljoin(base_url, url.strip())
+    parts = urlparse(url)
+    scheme = parts.scheme.lower()
+    if scheme not in DEFAULT_PORTS or not parts.hostname:
+        return None
+    host = parts.hostname.lower()
+    if parts.port and parts.port != DEFAULT_PORTS[scheme]:
+        host = f"{host}:{parts.port}"
+    path = posixpath.normpath(parts.path) if parts.path else "/"
+    if path.startswith("//"):
+        path = "/" + path.lstrip("/")
+    if path != "/" and path.endswith("/"):
+        path = path.rstrip("/")
+    query = urlencode(sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS and not key.lower().startswith(TRACKING_PREFIXES)
+    ))
+    return urlunparse((scheme, host, path, "", query, ""))
+
+
+class SeenSet:
+    """
+    Membership set that keeps an 8-byte digest per URL instead of the URL
+    string, so large crawls stay small in memory.
+    """
+
+    def __init__(self):
+        self._digests = set()
+
+    @staticmethod
+    def _digest(url: str) -> int:
+        return int.from_bytes(hashlib.blake2b(url.encode("utf-8"), digest_size=8).digest(), "big")
+
+    def add(self, url: str) -> bool:
+        """
+        Add `url`; return False if it was already seen.
+        """
+        digest = self._digest(url)
+        if digest in self._digests:
+            return False
+        self._digests.add(digest)
+        return True
+
+    def __contains__(self, url: str) -> bool:
+        return self._digest(url) in self._digests
+
+    def __len__(self) -> int:
+        return len(self._digests)
+
+
+class Frontier:
+    """
+    Breadth-first link discovery for one site: seeds from the base URL and
+    its sitemaps, follows internal links level by level up to `max_depth`,
+    and skips anything robots.txt disallows for our user agent.
+
+    The pages fetched for their links are kept in `pages` (URL -> Page), so
+    a crawl of the discovered links does not fetch them a second time.
+    """
+
+    def __init__(self, crawler, base_url: str, max_depth: int = 2, max_pages: int = 500,
+                 use_sitemap: bool = True, respect_robots: bool = True):
+        self.crawler = crawler
+        self.base_url = normalize_url(base_url)
+        self.domain = urlparse(self.base_url).netloc
+        self.max_depth = max_depth
+        self.max_pages = max_pages
+        self.use_sitemap = use_sitemap
+        self.respect_robots = respect_robots
+        self.robots = None
+        self.seen = SeenSet()
+        self.pages = {}
+
+    def _root(self, path: str) -> str:
+        return urljoin(self.base_url, path)
+
+    def _load_robots(self) -> list:
+        """
+        Fetch robots.txt and return the sitemap URLs it lists.
+        """
+        self.robots = RobotFileParser(self._root("/robots.txt"))
+        try:
+            response = self.crawler.fetch(self._root("/robots.txt"))
+            self.robots.parse(response.text.splitlines())
+        except Exception as e:
+            # No robots.txt means everything is allowed.
+            logger.info(f"No usable robots.txt for {self.domain}: {e}")
+            self.robots.parse([])
+        return list(self.robots.site_maps() or [])
+
+    def allowed(self, url: str) -> bool:
+        if urlparse(url).netloc != self.domain:
+            return False
+        if posixpath.splitext(urlparse(url).path)[1].lower() in SKIPPED_EXTENSIONS:
+            return False
+        if self.respect_robots and self.robots is not None:
+            return self.robots.can_fetch(USER_AGENT, url)
+        return True
+
+    def sitemap_urls(self, sitemaps: list) -> list:
+        """
+        Page URLs listed in the given sitemaps, following sitemap indexes.
+        """
+        urls, pending, visited = [], list(sitemaps), set()
+        while pending and len(visited) < MAX_SITEMAPS:
+            sitemap = pending.pop(0)
+            if sitemap in visited:
+                continue
+            visited.add(sitemap)
+            try:
+                root = ET.fromstring(self.crawler.fetch(sitemap).content)
+            except Exception as e:
+                logger.info(f"Skipping sitemap {sitemap}: {e}")
+                continue
+            locs = [el.text.strip() for el in root.iter() if el.tag.endswith("loc") and el.text]
+            if root.tag.endswith("sitemapindex"):
+                pending.extend(locs)
+            else:
+                urls.extend(locs)
+        return urls
+
+    def _links_on(self, url: str) -> list:
+        try:
+            response = self.crawler.fetch(url)
+        except Exception as e:
+            logger.error(f"Error fetching links from {url}: {e}")
+            return []
+        if "html" not in response.headers.get("Content-Type", "text/html"):
+            return []
+        soup = BeautifulSoup(response.content, "html.parser")
+        hrefs = [a_tag["href"] for a_tag in soup.find_all("a", href=True)]
+        # Extraction strips the soup, so it comes after the links are read
+        self.pages[url] = self.crawler.to_page(url, response, soup)
+        return hrefs
+
+    def _admit(self, url: str, base_url: str = None):
+        url = normalize_url(url, base_url)
+        if url is None or not self.allowed(url) or not self.seen.add(url):
+            return None
+        return url
+
+    def discover(self) -> list:
+        """
+        Return the normalized, de-duplicated page URLs of the site.
+        """
+        sitemaps = self._load_robots() if self.respect_robots else []
+        # Depth 0 is the base page plus every page the sitemaps list.
+        level = [self._admit(self.base_url)]
+        if self.use_sitemap:
+            sitemaps = sitemaps or [self._root("/sitemap.xml")]
+            level.extend(self._admit(url) for url in self.sitemap_urls(sitemaps))
+        level = [url for url in level if url][:self.max_pages]
+        links = list(level)
+
+        with ThreadPoolExecutor(max_workers=self.crawler.max_workers) as executor:
+            for depth in range(self.max_depth):
+                if not level or len(links) >= self.max_pages:
+                    break
+                next_level = []
+                for page_url, hrefs in zip(level, executor.map(self._links_on, level)):
+                    for href in hrefs:
+                        if len(links) >= self.max_pages:
+                            break
+                        url = self._admit(href, page_url)
+                        if url:
+                            links.append(url)
+                            next_level.append(url)
+                logger.info(f"Depth {depth + 1}: {len(next_level)} new links, {len(links)} total.")
+                level = next_level
+        return links
@@ -0,0 +1,179 @@
+import hashlib
+import logging
+import re
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from contextlib import contextmanager
+from pathlib import Path
+
+from frontier import normalize_url
+
+logger = logging.getLogger(__name__)
+
+
+class _Entry:
+    def __init__(self, url: str, vector_store):
+        self.url = url
+        self.vector_store = vector_store
+        self.users = 0
+
+
+class IndexCache:
+    """
+    Vector stores for many websites, shared by every session in the process.
+
+    Each normalized URL gets its own Chroma collection under `directory`,
+    built once by `build(url, persist_directory, collection_name)`. At most
+    `max_loaded` stores are kept open; opening another closes the least
+    recently used one that no session is querying, and that site is later
+    reopened from disk by `load(persist_directory, collection_name)` rather
+    than rebuilt. Sessions asking for a URL whose build is in progress wait
+    for that build instead of starting their own.
+    """
+
+    def __init__(self, build, load, directory: str = "./chroma_sites", max_loaded: int = 8):
+        self._build = build
+        self._load = load
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_loaded = max_loaded
+        self._lock = threading.Lock()
+        self._loaded = OrderedDict()  # url -> _Entry, LRU order
+        self._building = {}  # url -> Future of the load or build in progress
+        self._counters = {"hits": 0, "loads": 0, "builds": 0, "joined": 0, "failures": 0, "evictions": 0}
+
+    @staticmethod
+    def normalize(url: str) -> str:
+        normalized = normalize_url(url)
+        if normalized is None:
+            raise ValueError(f"Not an http(s) URL: {url!r}")
+        return normalized
+
+    @staticmethod
+    def collection_name(url: str) -> str:
+        # Chroma collection names: 3-512 characters of [a-zA-Z0-9._-]
+        return "site-" + hashlib.blake2b(url.encode("utf-8"), digest_size=8).hexdigest()
+
+    def path(self, url: str) -> Path:
+        slug = re.sub(r"[^a-z0-9]+", "-", url.split("://", 1)[-1].lower()).strip("-")[:60] or "site"
+        return self.directory / f"{slug}-{self.collection_name(url)[len('site-'):]}"
+
+    @contextmanager
+    def open(self, url: str):
+        """
+        The vector store for `url`, loading or building it if needed. It is
+        not closed by an eviction until the `with` block exits.
+        """
+        entry = self._acquire(self.normalize(url))
+        try:
+            yield entry.vector_store
+        finally:
+            self._release(entry)
+
+    def _acquire(self, url: str) -> _Entry:
+        while True:
+            with self._lock:
+                entry = self._loaded.get(url)
+                if entry is not None:
+                    self._loaded.move_to_end(url)
+                    entry.users += 1
+                    self._counters["hits"] += 1
+                    return entry
+                future = self._building.get(url)
+                owner = future is None
+                if owner:
+                    future = self._building[url] = Future()
+                else:
+                    self._counters["joined"] += 1
+            if owner:
+                return self._open_or_build(url, future)
+            # Raises the build's error to every session that waited for it
+            entry = future.result()
+            with self._lock:
+                if self._loaded.get(url) is entry:
+                    self._loaded.move_to_end(url)
+                    entry.users += 1
+                    return entry
+            # Evicted before this session got to it; go round again
+
+    def _open_or_build(self, url: str, future: Future) -> _Entry:
+        try:
+            vector_store = self._load_or_build(url)
+        except BaseException as e:
+            with self._lock:
+                del self._building[url]
+                self._counters["failures"] += 1
+            future.set_exception(e)
+            raise
+        entry = _Entry(url, vector_store)
+        with self._lock:
+            del self._building[url]
+            self._loaded[url] = entry
+            entry.users += 1
+            evicted = self._evict()
+        future.set_result(entry)
+        self._close(evicted)
+        return entry
+
+    def _load_or_build(self, url: str):
+        path, name = self.path(url), self.collection_name(url)
+        if path.is_dir():
+            vector_store = self._load(str(path), name)
+            if vector_store is not None:
+                with self._lock:
+                    self._counters["loads"] += 1
+                logger.info(f"Loaded the index of {url} from {path}.")
+                return vector_store
+        start = time.perf_counter()
+        logger.info(f"Building the index of {url} in {path}.")
+        try:
+            vector_store = self._build(url, str(path), name)
+        except BaseException:
+            # A half-written collection would be loaded next time as if complete
+            shutil.rmtree(path, ignore_errors=True)
+            raise
+        with self._lock:
+            self._counters["builds"] += 1
+        logger.info(f"Built the index of {url} in {time.perf_counter() - start:.1f}s.")
+        return vector_store
+
+    def _release(self, entry: _Entry):
+        with self._lock:
+            entry.users -= 1
+            # Stores in use when the cache went over max_loaded are evicted now
+            evicted = self._evict()
+        self._close(evicted)
+
+    def _evict(self) -> list:
+        # Called with the lock held; least recently used first, skipping stores in use
+        evicted = []
+        for url in list(self._loaded):
+            if len(self._loaded) <= self.max_loaded:
+                break
+            if self._loaded[url].users == 0:
+                evicted.append(self._loaded.pop(url))
+                self._counters["evictions"] += 1
+        return evicted
+
+    def _close(self, entries: list):
+        for entry in entries:
+            # Chroma keeps a persistent client's collections in memory until it is closed
+            close = getattr(getattr(entry.vector_store, "_client", None), "close", None)
+            if close is not None:
+                try:
+                    close()
+                except Exception as e:
+                    logger.warning(f"Could not close the index of {entry.url}: {e}")
+            logger.info(f"Evicted the index of {entry.url}; it stays on disk.")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                **self._counters,
+                "loaded": len(self._loaded),
+                "building": len(self._building),
+                "max_loaded": self.max_loaded,
+            }
@@ -0,0 +1,233 @@
+import hashlib
+import json
+import logging
+import os
+import time
+
+from langchain.vectorstores import Chroma
+
+from chunking import NearDuplicateFilter
+from embedding_pipeline import EmbeddingPipeline
+from extraction import BoilerplateFilter
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE = "index_manifest.json"
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def chunk_id(url: str, text: str) -> str:
+    """
+    Stable Chroma ID for a chunk: the same text on the same page always maps
+    to the same ID, so unchanged chunks are never embedded twice.
+    """
+    return hashlib.sha1(f"{url}\0{text}".encode("utf-8")).hexdigest()
+
+
+class IndexManifest:
+    """
+    Per-page record of what is in the vector store: the page's ETag,
+    Last-Modified, content hash and the IDs of its chunks, plus the keys of
+    the site's boilerplate blocks.
+
+    Stored as JSON next to the Chroma files in the persist directory.
+    """
+
+    def __init__(self, persist_directory: str):
+        self.path = os.path.join(persist_directory, MANIFEST_FILE)
+        self.pages = {}
+        self.boilerplate = []
+        if os.path.exists(self.path):
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+            self.pages = data.get("pages", {})
+            self.boilerplate = data.get("boilerplate", [])
+
+    def validators(self) -> dict:
+        return {
+            url: {"etag": entry.get("etag"), "last_modified": entry.get("last_modified")}
+            for url, entry in self.pages.items()
+        }
+
+    def record(self, page, page_hash: str, chunk_ids: list):
+        self.pages[page.url] = {
+            "etag": page.etag,
+            "last_modified": page.last_modified,
+            "content_hash": page_hash,
+            "chunk_ids": chunk_ids,
+            "indexed_at": time.time(),
+        }
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"pages": self.pages, "boilerplate": self.boilerplate}, f)
+        os.replace(tmp_path, self.path)
+
+
+def split_page(document, text_splitter, near_duplicates=None) -> tuple:
+    """
+    Split one page into chunks and return (chunks, ids) with duplicate chunk
+    texts on the page dropped, since Chroma IDs must be unique. With
+    `near_duplicates` (a NearDuplicateFilter), chunks that nearly repeat one
+    already admitted, on this page or another, are dropped as well.
+    """
+    url = document.metadata["source"]
+    chunks, ids, seen = [], [], set()
+    for chunk in text_splitter.split_documents([document]):
+        id_ = chunk_id(url, chunk.page_content)
+        if id_ in seen:
+            continue
+        if near_duplicates is not None and not near_duplicates.add(chunk.page_content):
+            continue
+        seen.add(id_)
+        chunks.append(chunk)
+        ids.append(id_)
+    return chunks, ids
+
+
+def extraction_report(boilerplate, near_duplicates, chunks: int) -> dict:
+    """
+    How much smaller boilerplate stripping and near-duplicate removal made
+    the index.
+    """
+    report = {**boilerplate.stats(), **near_duplicates.stats(), "chunks_indexed": chunks}
+    if boilerplate.chars_in:
+        report["text_reduction"] = round(1 - boilerplate.chars_out / boilerplate.chars_in, 3)
+    if near_duplicates.checked:
+        report["chunk_reduction"] = round(near_duplicates.dropped / near_duplicates.checked, 3)
+    return report
+
+
+def build_vectorstore(pages, embedding_model, text_splitter, persist_directory: str, pipeline=None):
+    """
+    Create a Chroma store from crawled pages with content-addressed chunk IDs
+    and write the manifest that later refreshes diff against. Blocks repeated
+    across the site are stripped, then chunks are split page by page, checked
+    for near-duplicates and streamed through the embedding pipeline.
+    """
+    pipeline = pipeline or EmbeddingPipeline(embedding_model)
+    manifest = IndexManifest(persist_directory)
+    manifest.pages = {}
+    boilerplate = BoilerplateFilter().fit(page.document for page in pages)
+    manifest.boilerplate = sorted(boilerplate.keys)
+    near_duplicates = NearDuplicateFilter()
+    vector_store = Chroma(persist_directory=persist_directory, embedding_function=embedding_model)
+
+    def chunks_with_ids():
+        for page in pages:
+            chunks, chunk_ids = split_page(boilerplate.strip(page.document), text_splitter, near_duplicates)
+            manifest.record(page, content_hash(page.document.page_content), chunk_ids)
+            yield from zip(chunk_ids, chunks)
+
+    report = pipeline.ingest(vector_store, chunks_with_ids())
+    logger.info(f"Split and embedded {report['chunks']} chunks at {report['chunks_per_second']} chunks/s.")
+    logger.info(f"Extraction report: {extraction_report(boilerplate, near_duplicates, report['chunks'])}")
+    manifest.save()
+    return vector_store
+
+
+def refresh_vectorstore(vector_store, links, crawler, text_splitter, persist_directory: str,
+                        pipeline=None, fetched: dict = None) -> dict:
+    """
+    Bring an existing store up to date with the site. Pages are re-fetched
+    with conditional GETs, except those in `fetched` (URL -> Page, loaded
+    while discovering the links); only chunks whose text changed are
+    embedded, and only chunk IDs that no longer exist are deleted from the
+    collection.
+    """
+    start = time.perf_counter()
+    pipeline = pipeline or EmbeddingPipeline(vector_store.embeddings)
+    manifest = IndexManifest(persist_directory)
+    report = {
+        "pages_not_modified": 0,
+        "pages_unchanged": 0,
+        "pages_changed": 0,
+        "pages_added": 0,
+        "pages_removed": 0,
+        "chunks_added": 0,
+        "chunks_deleted": 0,
+    }
+
+    stale_ids = set()
+    pending_chunks = []
+    if not manifest.pages:
+        # Store built before manifests existed: its chunk IDs are random, so
+        # replace everything once and track it from here on.
+        stale_ids.update(vector_store.get(include=[])["ids"])
+
+    pages, crawl_report = crawler.crawl_pages(links, manifest.validators(), fetched)
+    boilerplate = BoilerplateFilter(keys=manifest.boilerplate)
+    if not manifest.pages:
+        boilerplate.fit(page.document for page in pages if not page.not_modified)
+        manifest.boilerplate = sorted(boilerplate.keys)
+
+    changed_pages = []
+    for page in pages:
+        entry = manifest.pages.get(page.url)
+        if page.not_modified:
+            report["pages_not_modified"] += 1
+            continue
+        page_hash = content_hash(page.document.page_content)
+        if entry and entry["content_hash"] == page_hash:
+            # Same content, but keep the new validators for the next refresh.
+            report["pages_unchanged"] += 1
+            manifest.record(page, page_hash, entry["chunk_ids"])
+            continue
+        changed_pages.append((page, entry, page_hash))
+
+    # New chunks must not nearly repeat the chunks of pages that stay as they are.
+    near_duplicates = NearDuplicateFilter()
+    changed_urls = {page.url for page, _, _ in changed_pages}
+    live_urls = set(links)
+    steady_ids = [
+        id_ for url, entry in manifest.pages.items()
+        if url not in changed_urls and url in live_urls for id_ in entry["chunk_ids"]
+    ]
+    if steady_ids:
+        for text in vector_store.get(ids=steady_ids, include=["documents"])["documents"]:
+            near_duplicates.remember(text)
+
+    for page, entry, page_hash in changed_pages:
+        chunks, chunk_ids = split_page(boilerplate.strip(page.document), text_splitter, near_duplicates)
+        old_ids = set(entry["chunk_ids"]) if entry else set()
+        new_chunks = [(id_, chunk) for id_, chunk in zip(chunk_ids, chunks) if id_ not in old_ids]
+        kept = [(id_, chunk) for id_, chunk in zip(chunk_ids, chunks) if id_ in old_ids]
+        pending_chunks.extend(new_chunks)
+        if kept:
+            # Unchanged text may have moved on the page; refresh start_index
+            # without re-embedding.
+            vector_store._collection.update(
+                ids=[id_ for id_, _ in kept], metadatas=[chunk.metadata for _, chunk in kept]
+            )
+        stale_ids.update(old_ids - set(chunk_ids))
+        report["chunks_added"] += len(new_chunks)
+        report["pages_changed" if entry else "pages_added"] += 1
+        manifest.record(page, page_hash, chunk_ids)
+
+    # Pages that disappeared from the site. Pages that failed to fetch this
+    # time keep their chunks until a later refresh reaches them.
+    for url in set(manifest.pages) - live_urls:
+        stale_ids.update(manifest.pages.pop(url)["chunk_ids"])
+        report["pages_removed"] += 1
+
+    # Embed the new chunks of all pages together, in full batches.
+    if pending_chunks:
+        report["embedding"] = pipeline.ingest(vector_store, pending_chunks)
+
+    live_ids = {id_ for entry in manifest.pages.values() for id_ in entry["chunk_ids"]}
+    stale_ids -= live_ids
+    if stale_ids:
+        vector_store.delete(ids=list(stale_ids))
+    report["chunks_deleted"] = len(stale_ids)
+    manifest.save()
+
+    report["extraction"] = extraction_report(boilerplate, near_duplicates, report["chunks_added"])
+    report["crawl"] = crawl_report.as_dict()
+    report["elapsed_s"] = round(time.perf_counter() - start, 3)
+    logger.info(f"Refreshed vector store: {report}")
+    return report
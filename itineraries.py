@@ -0,0 +1,137 @@
+import asyncio
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+from retrieval import tokenize
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_topic(question: str) -> str:
+    """
+    The key a crew run is stored under: lowercase words without punctuation
+    or stopwords, so "Plan a trip to Goa!" and "plan trip goa" share a result.
+    """
+    return " ".join(tokenize(question))
+
+
+class ItineraryStore:
+    """
+    Results of the CrewAI fallback, one Markdown file per topic.
+
+    `get_or_run()` returns a stored itinerary younger than `ttl` seconds
+    without running the crew. Identical topics requested while a run is in
+    progress wait for that run instead of starting their own. The
+    `max_entries` most recently used results are also kept in memory; the
+    files outlive restarts.
+    """
+
+    def __init__(self, directory: str = "./itineraries", ttl: float = 86400.0, max_entries: int = 256):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # topic -> (itinerary, stored_at), LRU order
+        self._running = {}  # topic -> asyncio.Task of the run in progress
+        self._counters = {"hits": 0, "runs": 0, "joined": 0, "failures": 0, "expirations": 0}
+
+    def path(self, topic: str) -> Path:
+        slug = re.sub(r"[^a-z0-9]+", "-", topic).strip("-")[:60] or "topic"
+        digest = hashlib.blake2b(topic.encode("utf-8"), digest_size=4).hexdigest()
+        return self.directory / f"{slug}-{digest}.md"
+
+    def _remember(self, topic: str, itinerary: str, stored_at: float):
+        with self._lock:
+            self._entries[topic] = (itinerary, stored_at)
+            self._entries.move_to_end(topic)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get(self, topic: str):
+        """
+        The stored itinerary for `topic`, or None if there is none or it has
+        expired.
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(topic)
+            if entry is not None:
+                if now - entry[1] < self.ttl:
+                    self._entries.move_to_end(topic)
+                    return entry[0]
+                del self._entries[topic]
+                self._counters["expirations"] += 1
+                return None
+        path = self.path(topic)
+        try:
+            stored_at = path.stat().st_mtime
+            if now - stored_at >= self.ttl:
+                with self._lock:
+                    self._counters["expirations"] += 1
+                return None
+            itinerary = path.read_text(encoding="utf-8")
+        except FileNotFoundError:
+            return None
+        self._remember(topic, itinerary, stored_at)
+        return itinerary
+
+    def put(self, topic: str, itinerary: str):
+        path = self.path(topic)
+        temporary = path.with_suffix(f".{os.getpid()}.tmp")
+        temporary.write_text(itinerary, encoding="utf-8")
+        # Readers see either the old file or the new one, never a partial write
+        os.replace(temporary, path)
+        self._remember(topic, itinerary, time.time())
+
+    async def _run(self, topic: str, question: str, run) -> str:
+        try:
+            itinerary = await run(question)
+            self.put(topic, itinerary)
+            return itinerary
+        except Exception:
+            with self._lock:
+                self._counters["failures"] += 1
+            raise
+        finally:
+            self._running.pop(topic, None)
+
+    async def get_or_run(self, question: str, run) -> str:
+        """
+        The itinerary for the topic of `question`: stored, from a run already
+        in progress, or from `await run(question)`. Failed runs are not
+        stored, so the next request tries again.
+        """
+        topic = normalize_topic(question)
+        itinerary = self.get(topic)
+        if itinerary is not None:
+            with self._lock:
+                self._counters["hits"] += 1
+            logger.debug("Reusing a stored itinerary.")
+            return itinerary
+        task = self._running.get(topic)
+        if task is None:
+            with self._lock:
+                self._counters["runs"] += 1
+            task = asyncio.ensure_future(self._run(topic, question, run))
+            self._running[topic] = task
+        else:
+            with self._lock:
+                self._counters["joined"] += 1
+            logger.debug("Waiting for the crew run already in progress for the same topic.")
+        # A client that disconnects must not cancel the run for the others
+        return await asyncio.shield(task)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                **self._counters,
+                "in_memory": len(self._entries),
+                "in_progress": len(self._running),
+            }
@@ -0,0 +1,185 @@
+import asyncio
+import contextvars
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+# The job a worker is running; carried into executor threads with the context
+current_job = contextvars.ContextVar("current_job", default=None)
+
+
+@dataclass
+class Job:
+    job_id: str
+    question: str
+    session_id: Optional[str] = None
+    state: str = QUEUED
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Optional[str] = None
+    error: Optional[str] = None
+    # Progress events in order: {"message": ..., "at": ..., ...}
+    progress: list = field(default_factory=list)
+    # Set and replaced on every change; see JobQueue.watch()
+    changed: asyncio.Event = field(default_factory=asyncio.Event, repr=False)
+
+    @property
+    def finished(self) -> bool:
+        return self.state in (DONE, FAILED)
+
+    def status(self) -> dict:
+        end = self.finished_at or time.time()
+        return {
+            "job_id": self.job_id,
+            "state": self.state,
+            "session_id": self.session_id,
+            "progress": self.progress[-1]["message"] if self.progress else None,
+            "steps": len(self.progress),
+            "queued_s": round((self.started_at or end) - self.created_at, 3),
+            "running_s": round(end - self.started_at, 3) if self.started_at else None,
+            "error": self.error,
+        }
+
+
+class JobQueue:
+    """
+    Runs long jobs (crew runs) on `workers` asyncio workers, outside the
+    HTTP request that submitted them.
+
+    `submit()` returns a queued Job at once; clients poll `status()` or
+    follow `watch()` for progress and the result. At most `max_queued` jobs
+    wait at a time, and the `max_finished` most recent finished jobs are
+    kept for their results. `handler(job)` is awaited for each job and its
+    return value becomes the job's result; blocking work it hands to an
+    executor can report progress with `progress()`.
+    """
+
+    def __init__(self, handler, workers: int = 2, max_queued: int = 100, max_finished: int = 1000):
+        self.handler = handler
+        self.workers = workers
+        self.max_finished = max_finished
+        self._queue = asyncio.Queue(maxsize=max_queued)
+        self._jobs = OrderedDict()  # job_id -> Job, oldest first
+        self._tasks = []
+        self._loop = None
+        self._counters = {"submitted": 0, "done": 0, "failed": 0, "rejected": 0}
+
+    def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._tasks = [asyncio.create_task(self._work(), name=f"job-worker-{i}") for i in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, question: str, session_id: str = None) -> Job:
+        """
+        Queue a job; raises asyncio.QueueFull when `max_queued` jobs are
+        already waiting.
+        """
+        job = Job(job_id=uuid.uuid4().hex, question=question, session_id=session_id)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            self._counters["rejected"] += 1
+            raise
+        self._jobs[job.job_id] = job
+        self._counters["submitted"] += 1
+        self._add_progress(job, {"message": "Queued."})
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def _notify(self, job: Job):
+        changed, job.changed = job.changed, asyncio.Event()
+        changed.set()
+
+    def _add_progress(self, job: Job, event: dict):
+        job.progress.append({**event, "at": time.time()})
+        self._notify(job)
+
+    def progress(self, message: str, **fields):
+        """
+        Record a progress event for the current job. Safe to call from the
+        executor thread the job's blocking work runs on; a no-op outside a job.
+        """
+        job = current_job.get()
+        if job is None:
+            return
+        event = {"message": message, **fields}
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+        if running_loop is self._loop:
+            self._add_progress(job, event)
+        else:
+            self._loop.call_soon_threadsafe(self._add_progress, job, event)
+
+    def _retire(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(finished) - self.max_finished)]:
+            del self._jobs[job_id]
+
+    async def _work(self):
+        while True:
+            job = await self._queue.get()
+            job.state = RUNNING
+            job.started_at = time.time()
+            self._add_progress(job, {"message": "Started."})
+            token = current_job.set(job)
+            try:
+                job.result = await self.handler(job)
+                job.state = DONE
+                self._counters["done"] += 1
+            except Exception as e:
+                logger.error(f"Job {job.job_id} failed: {e}")
+                job.state = FAILED
+                job.error = str(e)
+                self._counters["failed"] += 1
+            finally:
+                current_job.reset(token)
+                job.finished_at = time.time()
+                self._notify(job)
+                self._retire()
+                self._queue.task_done()
+            logger.info(f"Job {job.job_id} {job.state} in {job.finished_at - job.started_at:.1f}s.")
+
+    async def watch(self, job: Job, keepalive: float = 15.0):
+        """
+        Yield ("progress", event) for each progress event of `job`, past and
+        new, then ("done", status) or ("error", status) once it finishes;
+        ("keepalive", None) after `keepalive` seconds without news.
+        """
+        sent = 0
+        while True:
+            changed = job.changed
+            for event in job.progress[sent:]:
+                yield "progress", event
+            sent = len(job.progress)
+            if job.finished:
+                yield ("done" if job.state == DONE else "error"), {**job.status(), "answer": job.result}
+                return
+            try:
+                await asyncio.wait_for(changed.wait(), keepalive)
+            except asyncio.TimeoutError:
+                yield "keepalive", None
+
+    def stats(self) -> dict:
+        return {
+            **self._counters,
+            "workers": self.workers,
+            "queued": self._queue.qsize(),
+            "running": sum(job.state == RUNNING for job in self._jobs.values()),
+        }
@@ -0,0 +1,75 @@
+import gc
+import logging
+import threading
+import time
+
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger(__name__)
+
+
+class Lazy:
+    """
+    An object that is expensive to import or build (a model, the crew),
+    built by `factory()` on the first `get()`. Only one build runs however
+    many threads race it; a failed build is retried on the next call.
+    """
+
+    def __init__(self, factory, name: str):
+        self._factory = factory
+        self.name = name
+        self._value = None
+        self._lock = threading.Lock()
+        self.load_s = None
+
+    def get(self):
+        if self._value is None:
+            with self._lock:
+                if self._value is None:
+                    start = time.perf_counter()
+                    value = self._factory()
+                    self.load_s = round(time.perf_counter() - start, 3)
+                    logger.info(f"Loaded {self.name} in {self.load_s:.1f}s.")
+                    self._value = value
+        return self._value
+
+    @property
+    def loaded(self) -> bool:
+        return self._value is not None
+
+
+class LazyEmbeddings(Embeddings):
+    """
+    Embeddings whose model is loaded on the first embed call or `load()`,
+    so importing the app does not pay for torch and the model weights.
+    """
+
+    def __init__(self, factory, model_name: str):
+        self.model_name = model_name
+        self._model = Lazy(factory, f"embedding model {model_name}")
+
+    def load(self):
+        return self._model.get()
+
+    @property
+    def loaded(self) -> bool:
+        return self._model.loaded
+
+    def embed_documents(self, texts: list) -> list:
+        return self.load().embed_documents(texts)
+
+    def embed_query(self, text: str) -> list:
+        return self.load().embed_query(text)
+
+
+def preload(load):
+    """
+    Run `load()` in a server's master process before it forks its workers
+    (gunicorn --preload). The loaded objects are then moved out of the
+    garbage collector's reach, so collections in the workers do not write
+    to their pages and the weights stay shared copy-on-write.
+    """
+    start = time.perf_counter()
+    load()
+    gc.freeze()
+    logger.info(f"Preloaded models in {time.perf_counter() - start:.1f}s, before forking workers.")
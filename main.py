@@ -1,26 +1,51 @@
-from langchain.document_loaders import WebBaseLoader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain.vectorstores import Chroma
-from langchain.embeddings import HuggingFaceEmbeddings
-from bs4 import BeautifulSoup
-import requests
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, JSONResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
-from fastapi import FastAPI, HTTPException
+from fastapi import BackgroundTasks, FastAPI, HTTPException
+from starlette.background import BackgroundTask
 from pydantic import BaseModel
+from typing import Optional
 from fastapi.middleware.cors import CORSMiddleware
-from langchain.chains import create_history_aware_retriever, create_retrieval_chain
-from langchain.chains.combine_documents import create_stuff_documents_chain
-from langchain_groq import ChatGroq
-from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+import asyncio
 import logging
 import os
-from urllib.parse import urlparse
-from fastapi import HTTPException
 from pathlib import Path
+from contextlib import asynccontextmanager
+from streaming import SSE_HEADERS, ReleasingStreamingResponse, sse_event, stream_answer_tokens, stream_text
+from indexer import refresh_vectorstore
+from lazy import preload
+from admission import Overloaded
+from compact_index import CompactIndex
+from observability import MetricsMiddleware, register_stats, span
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from core import (
+    ALLOWED_URL, COMPACT_INDEX, LLM_MAX_WAIT_S, PRELOAD_MODELS, WARMING_UP_MESSAGE, answer_cache, blocking_executor,
+    chain_registry, compact_vectorstore, context_packer, conversation_memory, crawler, discover_site, embedding_model,
+    embedding_pipeline, get_all_links, index_warmer, llm_admission, load_models, metrics_callbacks, open_vectorstore,
+    payload_log, persist_directory, text_splitter,
+)
+from pipelines import (
+    CONSENT_ACCEPTED_MESSAGE, PIPELINE_TYPES, crew_executor, itinerary_store, job_queue, warm_up_crew,
+)
+
+# Load or build the index (and its RAG chain) in the background at startup;
+# requests get a fast "warming up" answer until it is ready.
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    index_warmer.start()
+    if crew_enabled:
+        job_queue.start()
+        crew_warm_up = asyncio.create_task(warm_up_crew())
+    yield
+    if crew_enabled:
+        crew_warm_up.cancel()
+        await job_queue.stop()
+        crew_executor.shutdown()
+    chain_registry.invalidate()
+    blocking_executor.shutdown()
+    embedding_pipeline.close()
 
 # FastAPI setup
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # CORS Middleware
 app.add_middleware(
@@ -31,177 +56,369 @@ app.add_middleware(
     allow_headers=["*"],  # Allow all headers
 )
 
+# Request latency histograms, in-flight gauges and one timing line per request; see /metrics
+app.add_middleware(MetricsMiddleware)
+
 # Logging setup
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Constants
-ALLOWED_URL = "https://www.travellofoodie.com/"
-persist_directory = "./chroma_db"
-embedding_model = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")  # Example embedding model
-
-# Placeholder for session data (vector store and chat history)
-session_data = {
-    "vector_store": None,
-    "chat_history": []
-}
+# Pipelines served by this process (rag, agents), all on the shared core in core.py,
+# and the one used when a request names none
+PIPELINES = [name.strip() for name in os.getenv("PIPELINES", "rag,agents").split(",") if name.strip()]
+DEFAULT_PIPELINE = os.getenv("DEFAULT_PIPELINE", "rag")
+pipelines = {name: PIPELINE_TYPES[name]() for name in PIPELINES}
+if DEFAULT_PIPELINE not in pipelines:
+    raise ValueError(f"DEFAULT_PIPELINE={DEFAULT_PIPELINE!r} is not in PIPELINES={PIPELINES}.")
+# The crew workers only run when the agents pipeline is served
+crew_enabled = "agents" in pipelines
+# Retry-After for a consent that finds the crew job queue full
+CREW_RETRY_AFTER_S = 60
 
 # User Input model
 class UserInput(BaseModel):
     question: str
+    # Returned by the first response; omit it to start a new conversation
+    session_id: Optional[str] = None
+    # "rag" or "agents"; omit it for DEFAULT_PIPELINE
+    pipeline: Optional[str] = None
 
-# Utility to check and load/create the vector store
-def load_or_create_vectorstore(url: str):
-    """
-    Load the vector store if it exists, otherwise scrape and create a new one.
-    """
-    if os.path.exists(persist_directory):
-        # Load the existing vector store
-        logger.info(f"Loading existing vector store from {persist_directory}.")
-        vector_store = Chroma(persist_directory=persist_directory, embedding_function=embedding_model)
-    else:
-        # Create a new vector store by scraping the website
-        logger.info(f"Creating new vector store from {url}.")
-        vector_store = get_vectorstore_from_url(url)
-    
-    return vector_store
-
-# Scraping function to extract all links from the website
-def get_all_links(base_url: str) -> set:
-    if base_url != ALLOWED_URL:
-        raise HTTPException(status_code=400, detail=f"Only {ALLOWED_URL} is allowed.")
-    
-    try:
-        logger.info(f"Fetching links from {base_url}...")
-        response = requests.get(base_url)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.content, 'html.parser')
-        base_domain = urlparse(base_url).netloc
-        # Extract internal links
-        links = set()
-        
-        for a_tag in soup.find_all('a', href=True):
-            href = a_tag['href']
-            if not href.startswith('http'):
-                href = requests.compat.urljoin(base_url, href)
-            if urlparse(href).netloc == base_domain:
-                links.add(href)
-
-        logger.info(f"Found {len(links)} links.")
-        return links
-    except Exception as e:
-        logger.error(f"Error fetching links from {base_url}: {e}")
-        raise HTTPException(status_code=500, detail=f"Error fetching links: {str(e)}")
+BUSY_MESSAGE = "We're getting a lot of questions right now. Please try again in a few seconds."
 
-# Vector store creation from scraped website content
-def get_vectorstore_from_url(url: str):
-    """
-    Create a vector store from all pages of the specified URL.
-    Restricts scraping and storage to the predefined ALLOWED_URL.
-    """
-    if url != ALLOWED_URL:
-        raise HTTPException(status_code=400, detail="Only the fixed URL can be used to create the vector store.")
-    
-    links = get_all_links(url)
-    all_documents = []
-    
-    for link in links:
-        try:
-            logger.info(f"Loading documents from {link}...")
-            loader = WebBaseLoader(link)
-            documents = loader.load()
-            all_documents.extend(documents)
-            logger.info(f"Successfully loaded {len(documents)} documents from {link}.")
-        except Exception as e:
-            logger.error(f"Error loading {link}: {e}")
-    
-    text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=100, add_start_index=True)
-    document_chunks = text_splitter.split_documents(all_documents)
-    
-    logger.info(f"Splitting documents into {len(document_chunks)} chunks.")
-    vector_store = Chroma.from_documents(document_chunks, embedding_model, persist_directory=persist_directory)
-    
-    logger.info("Vector store created successfully.")
-    return vector_store
-# Conversational RAG Chain setup
-def get_context_retriever_chain(vector_store):
-    """
-    Creates and returns a retriever chain from the given vector store.
-    """
-    try:
-        # Initialize the retriever with similarity search
-        retriever = vector_store.as_retriever(search_type="similarity", search_kwargs={"k": 10})
-        logger.info("Retriever chain created successfully.")
-        return retriever
-    except Exception as e:
-        logger.error(f"Error creating retriever chain: {e}")
-        raise HTTPException(status_code=500, detail="Failed to initialize the retriever chain.")
+def busy_response(retry_after: int, session_id: Optional[str], message: str = BUSY_MESSAGE):
+    # Fail fast instead of queueing more work on a saturated LLM backend
+    return JSONResponse(
+        status_code=429,
+        headers={"Retry-After": str(retry_after)},
+        content={"answer": message, "session_id": session_id, "retry_after": retry_after},
+    )
 
+def select_pipeline(name: Optional[str]):
+    pipeline = pipelines.get(name or DEFAULT_PIPELINE)
+    if pipeline is None:
+        raise HTTPException(status_code=400, detail=f"Unknown pipeline {name!r}; this server runs {PIPELINES}.")
+    return pipeline
 
-def get_conversational_rag_chain(retriever_chain): 
-    llm = ChatGroq(
-        model="llama-3.1-8b-instant",
-        temperature=0.0,
-        max_retries=2,
-        api_key=""
-    )
-    
-    
-    prompt = ChatPromptTemplate.from_messages([(
-        "system", """
-        You are an intelligent assistant greet the customers politely based on their question you are responsible for answering user questions strictly based on the content provided from the specific website based on the given context:\n\n{context}
-        If the information is not available on provided specific website, respond with:
-        'I couldn't find the information to this question on the website'
-        """),
-        MessagesPlaceholder(variable_name="chat_history"),
-        ("user", "{input}")
-    ])
-    
-    stuff_documents_chain = create_stuff_documents_chain(llm, prompt)
-    
-    return create_retrieval_chain(retriever_chain, stuff_documents_chain)
 @app.post("/get_response/")
-async def get_response(user_input: UserInput):
-    logger.info(f"Received user input: {user_input.question}")
+async def get_response(user_input: UserInput, background_tasks: BackgroundTasks):
+    pipeline = select_pipeline(user_input.pipeline)
+    session_id = user_input.session_id or conversation_memory.new_session_id()
     
     if "http://" in user_input.question or "https://" in user_input.question:
-        logger.warning(f"Invalid question: URLs are not allowed. User asked: {user_input.question}")
-        return {"answer": "Only questions about the website 'https://www.travellofoodie.com/' are allowed."}
+        logger.warning("Invalid question: URLs are not allowed.")
+        return {"answer": "Only questions about the website 'https://www.travellofoodie.com/' are allowed.", "session_id": session_id}
+    
+    # Answer fast while the index is still loading in the background
+    vector_store = index_warmer.get()
+    if vector_store is None:
+        return {"answer": WARMING_UP_MESSAGE, "session_id": session_id}
     
-    # Load or create the vector store if not already loaded
-    if session_data["vector_store"] is None:
-        logger.info("No vector store found in session, loading or creating it.")
-        session_data["vector_store"] = load_or_create_vectorstore(ALLOWED_URL)
+    # Answer near-duplicate questions from the semantic cache. Follow-ups are
+    # answered from their conversation, so only a session's first question is.
+    chat_history = conversation_memory.history(session_id)
+    cached = None
+    if not chat_history:
+        with span("cache_lookup"):
+            cached = await blocking_executor.run(answer_cache.lookup, user_input.question, pipeline.name)
+        if cached.answer is not None:
+            conversation_memory.add_turn(session_id, user_input.question, cached.answer)
+            return {"answer": cached.answer, "session_id": session_id}
     
-    # Create the retriever chain and RAG conversational chain
-    retriever = get_context_retriever_chain(session_data["vector_store"])
-    conversation_rag_chain = get_conversational_rag_chain(retriever)
+    # Reuse the RAG conversational chain built for this vector store and pipeline
+    conversation_rag_chain = chain_registry.get(vector_store, pipeline.prompt)
 
     try:
-        # Invoke the conversational RAG chain
-        response = conversation_rag_chain.invoke({
-            "chat_history": session_data["chat_history"],
-            "input": user_input.question
-        })
+        # Invoke the conversational RAG chain once the LLM gate admits it
+        async with llm_admission.async_slot("rag", timeout=LLM_MAX_WAIT_S):
+            response = await conversation_rag_chain.ainvoke({
+                "chat_history": chat_history,
+                "input": user_input.question
+            }, config={"callbacks": [metrics_callbacks]})
 
         # Handle empty responses gracefully
         if response['answer'].strip() == "":
             logger.info("No relevant answer found, responding with default message.")
-            return {"answer": "I couldn't find the answer to this question on the website: https://www.travellofoodie.com/."}
+            no_answer = pipeline.no_answer()
+            # /handle_consent/ reads the question back from this turn
+            conversation_memory.add_turn(session_id, user_input.question, no_answer["answer"])
+            return {**no_answer, "session_id": session_id}
         
-        logger.info(f"Generated response: {response['answer']}")
-        return {"answer": response['answer']}
+        payload_log.log(user_input.question, response['answer'])
+        if cached is not None:
+            answer_cache.store(user_input.question, response['answer'], cached, pipeline.name)
+        conversation_memory.add_turn(session_id, user_input.question, response['answer'])
+        # Summarize older turns after the response has been sent
+        background_tasks.add_task(conversation_memory.compact, session_id)
+        return {"answer": response['answer'], "session_id": session_id}
     
+    except Overloaded as e:
+        logger.warning(str(e))
+        return busy_response(e.retry_after, session_id)
     except Exception as e:
         logger.error(f"Error generating response: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error generating response: {str(e)}")
 
 
+@app.post("/stream_response/")
+async def stream_response(user_input: UserInput):
+    """
+    Same as /get_response/, but streams the answer tokens as server-sent events
+    (`data: {"token": ...}`) followed by a `done` event with the full answer.
+    """
+    pipeline = select_pipeline(user_input.pipeline)
+    session_id = user_input.session_id or conversation_memory.new_session_id()
+    
+    if "http://" in user_input.question or "https://" in user_input.question:
+        logger.warning("Invalid question: URLs are not allowed.")
+        return StreamingResponse(
+            stream_text("Only questions about the website 'https://www.travellofoodie.com/' are allowed.", session_id),
+            media_type="text/event-stream", headers=SSE_HEADERS,
+        )
+    
+    vector_store = index_warmer.get()
+    if vector_store is None:
+        return StreamingResponse(stream_text(WARMING_UP_MESSAGE, session_id), media_type="text/event-stream", headers=SSE_HEADERS)
+    
+    chat_history = conversation_memory.history(session_id)
+    cached = None
+    if not chat_history:
+        with span("cache_lookup"):
+            cached = await blocking_executor.run(answer_cache.lookup, user_input.question, pipeline.name)
+        if cached.answer is not None:
+            conversation_memory.add_turn(session_id, user_input.question, cached.answer)
+            return StreamingResponse(stream_text(cached.answer, session_id), media_type="text/event-stream", headers=SSE_HEADERS)
+    
+    conversation_rag_chain = chain_registry.get(vector_store, pipeline.prompt)
+    # Admitted before the response starts, so a full queue can still be answered with a 429
+    try:
+        await llm_admission.acquire_async("rag", timeout=LLM_MAX_WAIT_S)
+    except Overloaded as e:
+        logger.warning(str(e))
+        return busy_response(e.retry_after, session_id)
+
+    async def answer_events():
+        tokens = []
+        try:
+            async for token in stream_answer_tokens(conversation_rag_chain, {
+                "chat_history": chat_history,
+                "input": user_input.question
+            }, config={"callbacks": [metrics_callbacks]}):
+                tokens.append(token)
+                yield sse_event({"token": token})
+        except Exception as e:
+            logger.error(f"Error streaming response: {str(e)}")
+            yield sse_event({"error": "Sorry, something went wrong. Please try again."}, event="error")
+            return
+        
+        answer = "".join(tokens)
+        done = {"answer": answer}
+        if answer.strip() == "":
+            logger.info("No relevant answer found, responding with default message.")
+            done = pipeline.no_answer()
+            answer = done["answer"]
+            yield sse_event({"token": answer})
+        elif cached is not None:
+            answer_cache.store(user_input.question, answer, cached, pipeline.name)
+        conversation_memory.add_turn(session_id, user_input.question, answer)
+        payload_log.log(user_input.question, answer)
+        yield sse_event({**done, "session_id": session_id}, event="done")
+
+    # The slot is released when the stream ends, or if it never starts;
+    # older turns are summarized once the stream has finished
+    return ReleasingStreamingResponse(
+        answer_events(), llm_admission.release, media_type="text/event-stream", headers=SSE_HEADERS,
+        background=BackgroundTask(conversation_memory.compact, session_id),
+    )
+
+
+@app.post("/handle_consent/")
+async def handle_consent(user_input: UserInput):
+    if not crew_enabled:
+        raise HTTPException(status_code=404, detail="The agents pipeline is not enabled.")
+    user_response = user_input.question.strip().lower()
+    if user_response in ["yes", "okay", "ok"]:
+        logger.info("User consented to fetch external information.")
+        try:
+            # The question that led to the consent prompt
+            question = conversation_memory.get(user_input.session_id).turns[-2]["content"]
+            job = job_queue.submit(question, user_input.session_id)
+        except asyncio.QueueFull:
+            logger.warning("Crew job queue is full.")
+            return busy_response(
+                CREW_RETRY_AFTER_S, user_input.session_id,
+                "We're busy fetching other requests. Please try again in a few minutes.",
+            )
+        except Exception as e:
+            logger.error(f"Error retrieving information from external resources: {e}")
+            return {"answer": "Here is the fetched external information at the moment."}
+        return {
+            "answer": CONSENT_ACCEPTED_MESSAGE,
+            "session_id": user_input.session_id,
+            "job_id": job.job_id,
+            "status_url": f"/jobs/{job.job_id}",
+            "events_url": f"/jobs/{job.job_id}/events",
+        }
+    elif user_response in ["no", "not now"]:
+        logger.info("User declined to fetch external information.")
+        return {"answer": "Understood. If you need further assistance, feel free to ask."}
+    else:
+        logger.warning("Received an invalid consent response.")
+        return {"answer": "Please respond with 'yes' or 'no' to proceed."}
+
+
+def get_job(job_id: str):
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired job.")
+    return job
+
+
+@app.get("/jobs/{job_id}")
+async def job_status(job_id: str):
+    return get_job(job_id).status()
+
+
+@app.get("/jobs/{job_id}/result")
+async def job_result(job_id: str):
+    """
+    The answer once the job is done; 202 with its status until then.
+    """
+    job = get_job(job_id)
+    if job.state == "done":
+        return {"answer": job.result, "session_id": job.session_id, "job_id": job.job_id}
+    if job.state == "failed":
+        return JSONResponse(status_code=500, content={**job.status(), "answer": "Sorry, something went wrong."})
+    return JSONResponse(status_code=202, content=job.status())
+
+
+@app.get("/jobs/{job_id}/events")
+async def job_events(job_id: str):
+    """
+    Server-sent `progress` events for the job, then `done` with the answer
+    (or `error`).
+    """
+    job = get_job(job_id)
+
+    async def events():
+        async for event, data in job_queue.watch(job):
+            if event == "keepalive":
+                yield ": keepalive\n\n"
+            elif event == "error":
+                yield sse_event({**data, "error": "Sorry, something went wrong."}, event="error")
+            else:
+                yield sse_event(data, event=event)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+
+# One refresh at a time: concurrent ones would race on the manifest, the
+# collection and the compact export
+refresh_lock = asyncio.Lock()
+
+@app.post("/refresh_index/")
+async def refresh_index():
+    """
+    Re-crawl the site with conditional GETs and re-embed only changed chunks.
+    """
+    vector_store = index_warmer.get()
+    if vector_store is None:
+        # The warm-up is still loading or building the index from a full crawl.
+        return JSONResponse(status_code=503, content={"status": index_warmer.state})
+    if refresh_lock.locked():
+        return JSONResponse(status_code=409, content={"status": "refresh_in_progress"})
+    async with refresh_lock:
+        return await refresh(vector_store)
+
+async def refresh(vector_store) -> dict:
+    # A compact index is read-only; the Chroma store it was exported from is refreshed
+    if isinstance(vector_store, CompactIndex):
+        source = await blocking_executor.run(open_vectorstore)
+    else:
+        source = vector_store
+    with span("index_refresh"):
+        links, fetched = await blocking_executor.run(discover_site, ALLOWED_URL)
+        report = await blocking_executor.run(
+            refresh_vectorstore, source, links, crawler, text_splitter, persist_directory, embedding_pipeline, fetched
+        )
+    if report["chunks_added"] or report["chunks_deleted"]:
+        if COMPACT_INDEX:
+            vector_store = await blocking_executor.run(compact_vectorstore, source)
+            index_warmer.replace(vector_store)
+        # Cached answers may quote content that has just changed, and the
+        # BM25 index is rebuilt from the new chunks with the chain.
+        answer_cache.invalidate()
+        chain_registry.invalidate()
+        await blocking_executor.run(chain_registry.get, vector_store)
+    return {"status": "refreshed", **report}
+
+
+@app.get("/healthz")
+async def healthz():
+    """
+    Liveness: the process is up and serving requests.
+    """
+    return {"status": "ok"}
+
+
+@app.get("/readyz")
+async def readyz():
+    """
+    Readiness: 200 once the vector store is loaded, 503 while it warms up.
+    """
+    status = index_warmer.status()
+    return JSONResponse(status_code=200 if index_warmer.ready else 503, content=status)
+
+
+@app.get("/cache_stats/")
+async def get_cache_stats():
+    return {**answer_cache.stats(), "embeddings": embedding_model.stats(), "itineraries": itinerary_store.stats()}
+
+
+@app.get("/chain_stats/")
+async def get_chain_stats():
+    return chain_registry.stats()
+
+
+@app.get("/llm_stats/")
+async def get_llm_stats():
+    """
+    The LLM gate: calls in flight, tokens left, and per lane the calls
+    waiting, admitted and turned away, and the average wait.
+    """
+    return llm_admission.stats()
+
+
+# Cache, pool and index counters, read when /metrics is scraped
+register_stats("answer_cache", answer_cache.stats)
+register_stats("chain", chain_registry.stats)
+register_stats("context_packing", context_packer.stats)
+register_stats("embedding_cache", embedding_model.stats)
+register_stats("blocking_executor", blocking_executor.stats)
+register_stats("index", index_warmer.status)
+register_stats("llm_admission", llm_admission.stats)
+if crew_enabled:
+    register_stats("crew_executor", crew_executor.stats)
+    register_stats("itineraries", itinerary_store.stats)
+    register_stats("jobs", job_queue.stats)
+
+if PRELOAD_MODELS:
+    preload(load_models)
+
+
+@app.get("/metrics")
+async def metrics():
+    """
+    Prometheus metrics: request and stage latency histograms, in-flight
+    gauges, LLM token counts and cache hit counters.
+    """
+    return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
 @app.post("/get_all_links/")
 async def get_all_links_from_base_url():
     try:
         logger.info(f"Fetching all links from the base URL {ALLOWED_URL}.")
-        links = get_all_links(ALLOWED_URL)
+        links = await blocking_executor.run(get_all_links, ALLOWED_URL)
         return {"links": list(links)}
     except Exception as e:
         logger.error(f"Error fetching links: {str(e)}")
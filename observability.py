@@ -0,0 +1,206 @@
+import contextvars
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from langchain_core.callbacks import BaseCallbackHandler
+from prometheus_client import REGISTRY, Counter, Gauge, Histogram
+from prometheus_client.core import GaugeMetricFamily
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+HTTP_LATENCY = Histogram(
+    "travellofoodie_http_request_duration_seconds",
+    "Time to serve an HTTP request, until its last body byte is sent.",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+HTTP_IN_FLIGHT = Gauge("travellofoodie_http_requests_in_flight", "HTTP requests being served.")
+STAGE_LATENCY = Histogram(
+    "travellofoodie_stage_duration_seconds",
+    "Time spent in one pipeline stage (retrieve, llm, crew, cache_lookup, crawl, index_build, ...).",
+    ["stage"],
+    buckets=LATENCY_BUCKETS,
+)
+STAGE_IN_FLIGHT = Gauge("travellofoodie_stage_in_flight", "Pipeline stages currently running.", ["stage"])
+LLM_TOKENS = Counter("travellofoodie_llm_tokens_total", "LLM tokens used, by direction.", ["direction"])
+LLM_ADMISSION_WAIT = Histogram(
+    "travellofoodie_llm_admission_wait_seconds",
+    "Time an LLM call waited for admission; see admission.AdmissionController.",
+    ["lane"],
+    buckets=LATENCY_BUCKETS,
+)
+LLM_ADMISSION_REJECTED = Counter(
+    "travellofoodie_llm_admission_rejected_total", "LLM calls turned away, by lane and reason.", ["lane", "reason"]
+)
+
+# Stage timings of the request being served: {stage: [ms, ...]}
+_trace = contextvars.ContextVar("trace", default=None)
+
+
+def _record(stage: str, seconds: float):
+    STAGE_LATENCY.labels(stage).observe(seconds)
+    trace = _trace.get()
+    if trace is not None:
+        trace.setdefault(stage, []).append(seconds * 1000)
+
+
+@contextmanager
+def span(stage: str):
+    """
+    Time the wrapped block as `stage`: observed in the stage histogram,
+    counted in the in-flight gauge and added to the request's trace line.
+    """
+    in_flight = STAGE_IN_FLIGHT.labels(stage)
+    in_flight.inc()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        in_flight.dec()
+        _record(stage, time.perf_counter() - start)
+
+
+class MetricsCallbackHandler(BaseCallbackHandler):
+    """
+    Times the retriever and LLM runs inside a LangChain chain and counts the
+    LLM's input and output tokens. Pass it in the chain's config:
+    `chain.ainvoke(inputs, config={"callbacks": [handler]})`.
+    """
+
+    # Run in the caller's task so spans land in the request's trace
+    run_inline = True
+
+    def __init__(self):
+        self._starts = {}
+        self._lock = threading.Lock()
+
+    def _start(self, run_id, stage: str):
+        STAGE_IN_FLIGHT.labels(stage).inc()
+        with self._lock:
+            self._starts[run_id] = (stage, time.perf_counter())
+
+    def _end(self, run_id):
+        with self._lock:
+            started = self._starts.pop(run_id, None)
+        if started is not None:
+            stage, start = started
+            STAGE_IN_FLIGHT.labels(stage).dec()
+            _record(stage, time.perf_counter() - start)
+
+    def on_retriever_start(self, serialized, query, *, run_id, **kwargs):
+        self._start(run_id, "retrieve")
+
+    def on_retriever_end(self, documents, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_retriever_error(self, error, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._start(run_id, "llm")
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._start(run_id, "llm")
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        self._end(run_id)
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                if usage:
+                    LLM_TOKENS.labels("input").inc(usage.get("input_tokens", 0))
+                    LLM_TOKENS.labels("output").inc(usage.get("output_tokens", 0))
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._end(run_id)
+
+
+class StatsCollector:
+    """
+    Exports the numeric fields of a `stats()` dict as gauges named
+    travellofoodie_<name>_<field>, read at scrape time.
+    """
+
+    def __init__(self, name: str, stats):
+        self.name = name
+        self.stats = stats
+
+    def collect(self):
+        for key, value in self.stats().items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                gauge = GaugeMetricFamily(f"travellofoodie_{self.name}_{key}", f"{self.name} {key}")
+                gauge.add_metric([], value)
+                yield gauge
+
+
+_collectors = {}
+
+
+def register_stats(name: str, stats):
+    """
+    Export `stats()` on /metrics, replacing an earlier collector of the same
+    name (the module may be imported more than once, e.g. by tests).
+    """
+    if name in _collectors:
+        REGISTRY.unregister(_collectors[name])
+    _collectors[name] = StatsCollector(name, stats)
+    REGISTRY.register(_collectors[name])
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware that times every HTTP request by route (streamed bodies
+    included), tracks requests in flight, and logs one line per request
+    with the time spent in each stage.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        trace = {}
+        token = _trace.set(trace)
+        HTTP_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            HTTP_IN_FLIGHT.dec()
+            _trace.reset(token)
+            route = scope.get("route")
+            route = getattr(route, "path", "unmatched")
+            HTTP_LATENCY.labels(scope["method"], route, str(status)).observe(elapsed)
+            if trace:
+                spans = " ".join(f"{stage}={sum(values):.1f}ms" for stage, values in trace.items())
+                logger.info(f"{scope['method']} {route} {status} in {elapsed * 1000:.1f}ms: {spans}")
+
+
+class PayloadSampler:
+    """
+    Logs the full question and answer of a random `rate` share of requests
+    (0 disables it), so the hot path does not pay for verbose logging.
+    """
+
+    def __init__(self, rate: float = 0.0):
+        self.rate = rate
+
+    def log(self, question: str, answer: str):
+        if self.rate > 0 and random.random() < self.rate:
+            logger.info(f"Sampled exchange: question={question!r} answer={answer!r}")
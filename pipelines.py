@@ -0,0 +1,120 @@
+import logging
+import os
+
+from concurrency import BlockingExecutor
+from core import conversation_memory, payload_log
+from itineraries import ItineraryStore
+from jobs import JobQueue
+from lazy import Lazy
+from observability import span
+
+logger = logging.getLogger(__name__)
+
+NOT_FOUND_MESSAGE = "I couldn't find the answer to this question on the website: https://www.travellofoodie.com/."
+CONSENT_MESSAGE = (
+    "The information is not available on the website. "
+    "Would you like us to fetch this information from external resources?"
+    "Enter yes or no to continue....!!!! Please respond with 'yes' or 'no'."
+)
+CONSENT_ACCEPTED_MESSAGE = "Fetching this from external sources. This can take a minute; the answer will appear here."
+
+
+class RagPipeline:
+    """
+    Answers from the website's content only, and says so when it has no
+    answer.
+    """
+
+    name = "rag"
+    # Prompt of the shared ChainRegistry this pipeline's chain is built with
+    prompt = "default"
+
+    def no_answer(self) -> dict:
+        """
+        Response fields for a question the chain found no answer to.
+        """
+        return {"answer": NOT_FOUND_MESSAGE}
+
+
+class CrewFallbackPipeline(RagPipeline):
+    """
+    RAG that offers to search external sources when the website has no
+    answer; a "yes" to /handle_consent/ queues a crew run on the question.
+    """
+
+    name = "agents"
+    prompt = "agents"
+
+    def no_answer(self) -> dict:
+        # The widget sends the next reply to /handle_consent/
+        return {"answer": CONSENT_MESSAGE, "consent": True}
+
+
+PIPELINE_TYPES = {pipeline_type.name: pipeline_type for pipeline_type in (RagPipeline, CrewFallbackPipeline)}
+
+# Crew runs take tens of seconds each; keep them off the shared pool
+CREW_WORKERS = int(os.getenv("CREW_WORKERS", "2"))
+crew_executor = BlockingExecutor(CREW_WORKERS, "crew")
+# Crew results are stored per topic for ITINERARY_TTL seconds; identical topics share one run
+ITINERARY_DIR = os.getenv("ITINERARY_DIR", "./itineraries")
+ITINERARY_TTL = float(os.getenv("ITINERARY_TTL", "86400"))
+itinerary_store = ItineraryStore(ITINERARY_DIR, ttl=ITINERARY_TTL)
+# Agent steps per minute in one crew run (crewai's own limit), and crew runs waiting for a worker
+CREW_MAX_RPM = int(os.getenv("CREW_MAX_RPM", "100"))
+CREW_MAX_QUEUED = int(os.getenv("CREW_MAX_QUEUED", "100"))
+
+# Crew callbacks run on the crew thread, inside the job's context
+def on_crew_step(step):
+    job_queue.progress("Searching external sources.")
+
+def on_crew_task(output):
+    job_queue.progress(f"{getattr(output, 'agent', None) or 'An agent'} finished.")
+
+def make_crew():
+    # crewai and its tools are slow to import, and the agents build their
+    # WebsiteSearchTool on import, so all of it waits for the warm-up or first run
+    from crewai import Crew, Process
+    from agents import travel_itinerary_researcher, travel_itinerary_writer
+    from tasks import travel_itinerary_research_task, travel_itinerary_write_task
+    return Crew(
+        agents=[travel_itinerary_researcher, travel_itinerary_writer],
+        tasks=[travel_itinerary_research_task, travel_itinerary_write_task],
+        process=Process.sequential,
+        memory=True,
+        cache=True,
+        max_rpm=CREW_MAX_RPM,
+        share_crew=True,
+        step_callback=on_crew_step,
+        task_callback=on_crew_task,
+    )
+
+crew = Lazy(make_crew, "crew")
+
+async def warm_up_crew():
+    """
+    Build the crew at startup on its own pool, so RAG readiness does not wait for it.
+    """
+    try:
+        await crew_executor.run(crew.get)
+    except Exception as e:
+        # Not fatal for RAG answers; the first crew run tries again
+        logger.warning(f"Could not build the crew during warm-up: {e}")
+
+def kickoff_crew(question: str):
+    # kickoff() writes the question into the crew's agents and tasks and records
+    # usage on them, so each run gets its own copy (as crewai's kickoff_for_each does)
+    return crew.get().copy().kickoff(inputs={'question': question})
+
+async def run_crew(question: str) -> str:
+    with span("crew"):
+        result = await crew_executor.run(kickoff_crew, question)
+    return result.get('output', 'No output generated by the agents')
+
+async def run_itinerary_job(job) -> str:
+    answer = await itinerary_store.get_or_run(job.question, run_crew)
+    payload_log.log(job.question, answer)
+    conversation_memory.add_turn(job.session_id, job.question, answer)
+    return answer
+
+# Crew runs are queued and run by CREW_WORKERS workers outside the HTTP request
+job_queue = JobQueue(run_itinerary_job, workers=CREW_WORKERS, max_queued=CREW_MAX_QUEUED)
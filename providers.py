@@ -0,0 +1,197 @@
+import asyncio
+import hashlib
+import logging
+import re
+import time
+from pathlib import Path
+from urllib.parse import urlparse
+
+import numpy as np
+import requests
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from requests.adapters import BaseAdapter
+
+from retrieval import tokenize
+
+# Swappable backends for the LLM, the embedding model and the crawler's HTTP
+# fetches. The defaults talk to Groq, HuggingFace and the live site; the
+# "fake", "hashing" and "fixtures" ones run everything offline, for load tests.
+
+logger = logging.getLogger(__name__)
+
+NOT_FOUND_ANSWER = "I couldn't find the information to this question on the website"
+SENTENCE = re.compile(r"(?<=[.!?])\s+")
+FIXTURE_SITE_DIR = Path(__file__).resolve().parent / "benchmarks" / "fixtures" / "site"
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Deterministic stand-in for the chat model: answers with the sentence of
+    the system message (the retrieved context) that shares the most words
+    with the question. The answer arrives after `latency` seconds plus one
+    word per 1/`tokens_per_second` seconds, streamed word by word, so the
+    timing resembles a hosted model without calling one.
+    """
+
+    latency: float = 0.3
+    tokens_per_second: float = 200.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake"
+
+    def _answer(self, messages) -> str:
+        question = set(tokenize(messages[-1].content))
+        sentences = [s.strip() for s in SENTENCE.split(messages[0].content) if s.strip()] if len(messages) > 1 else []
+        best = max(sentences, key=lambda sentence: len(question & set(tokenize(sentence))), default=None)
+        if best is None or not question & set(tokenize(best)):
+            return NOT_FOUND_ANSWER
+        return best
+
+    def _tokens(self, messages) -> list:
+        return re.findall(r"\S+\s*", self._answer(messages))
+
+    def _result(self, messages, tokens) -> ChatResult:
+        # Rough counts, so the token metrics move as they would with a real model
+        usage = {
+            "input_tokens": sum(len(message.content) // 4 + 1 for message in messages),
+            "output_tokens": len(tokens),
+        }
+        usage["total_tokens"] = usage["input_tokens"] + usage["output_tokens"]
+        message = AIMessage(content="".join(tokens), usage_metadata=usage)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        tokens = self._tokens(messages)
+        time.sleep(self.latency + len(tokens) / self.tokens_per_second)
+        return self._result(messages, tokens)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        tokens = self._tokens(messages)
+        await asyncio.sleep(self.latency + len(tokens) / self.tokens_per_second)
+        return self._result(messages, tokens)
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        time.sleep(self.latency)
+        for token in self._tokens(messages):
+            time.sleep(1 / self.tokens_per_second)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        await asyncio.sleep(self.latency)
+        for token in self._tokens(messages):
+            await asyncio.sleep(1 / self.tokens_per_second)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+
+
+class HashingEmbeddings(Embeddings):
+    """
+    Bag of words and word pairs hashed into `dim` buckets, L2-normalised.
+    """
+
+    model_name = "hashing"
+
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+
+    def embed_query(self, text: str) -> list:
+        tokens = tokenize(text)
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for feature in tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]:
+            digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+            vector[int.from_bytes(digest, "big") % self.dim] += 1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts: list) -> list:
+        return [self.embed_query(text) for text in texts]
+
+
+class FixtureSiteAdapter(BaseAdapter):
+    """
+    A requests transport that serves a directory of saved HTML pages as if
+    it were the site, for every host: `/name` and `/name.html` return
+    `name.html`, `/` returns `index.html` or a page linking every page, and
+    `/sitemap.xml` lists them all. Anything else is a 404.
+    """
+
+    def __init__(self, site_dir=FIXTURE_SITE_DIR):
+        super().__init__()
+        self.site_dir = Path(site_dir)
+        self.pages = {path.stem: path for path in sorted(self.site_dir.glob("*.htm*"))}
+        if not self.pages:
+            raise ValueError(f"No HTML pages in {self.site_dir}.")
+
+    def _body(self, root: str, path: str):
+        name = path.strip("/")
+        if name == "sitemap.xml":
+            locs = "".join(f"<url><loc>{root}/{stem}.html</loc></url>" for stem in self.pages)
+            xml = f'<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{locs}</urlset>'
+            return xml.encode("utf-8"), "application/xml"
+        if name in ("", "index", "index.html") and "index" not in self.pages:
+            links = "".join(f'<li><a href="/{stem}.html">{stem}</a></li>' for stem in self.pages)
+            return f"<html><head><title>Home</title></head><body><ul>{links}</ul></body></html>".encode("utf-8"), "text/html"
+        page = self.pages.get(Path(name).stem if name else "index")
+        if page is None:
+            return None, None
+        return page.read_bytes(), "text/html; charset=utf-8"
+
+    def send(self, request, **kwargs):
+        parts = urlparse(request.url)
+        body, content_type = self._body(f"{parts.scheme}://{parts.netloc}", parts.path)
+        response = requests.Response()
+        response.request = request
+        response.url = request.url
+        response.status_code = 200 if body is not None else 404
+        response.reason = "OK" if body is not None else "Not Found"
+        response._content = body or b""
+        response.headers["Content-Type"] = content_type or "text/plain"
+        response.encoding = "utf-8"
+        return response
+
+    def close(self):
+        pass
+
+
+def make_llm(provider: str, fake_latency: float = 0.3, fake_tokens_per_second: float = 200.0, **config):
+    """
+    The chat model for LLM_PROVIDER: "groq" (reads GROQ_API_KEY from the
+    environment) or "fake" (FakeChatModel; the rest of `config` is ignored).
+    """
+    if provider == "fake":
+        return FakeChatModel(latency=fake_latency, tokens_per_second=fake_tokens_per_second)
+    if provider == "groq":
+        from langchain_groq import ChatGroq
+        return ChatGroq(**config)
+    raise ValueError(f"Unknown LLM provider: {provider}")
+
+
+def make_embeddings(provider: str, model_name: str):
+    """
+    The embedding model for EMBEDDING_PROVIDER: "huggingface" (imports
+    sentence-transformers and torch, and loads the weights) or "hashing".
+    """
+    if provider == "hashing":
+        return HashingEmbeddings()
+    if provider == "huggingface":
+        from langchain.embeddings import HuggingFaceEmbeddings
+        return HuggingFaceEmbeddings(model_name=model_name)
+    raise ValueError(f"Unknown embedding provider: {provider}")
+
+
+def mount_fetcher(session: requests.Session, fetcher: str, site_dir=FIXTURE_SITE_DIR) -> requests.Session:
+    """
+    Route the session's requests for FETCHER: "http" (the network) or
+    "fixtures" (FixtureSiteAdapter over `site_dir`).
+    """
+    if fetcher == "fixtures":
+        adapter = FixtureSiteAdapter(site_dir)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        logger.info(f"Serving the site from {len(adapter.pages)} fixture pages in {adapter.site_dir}.")
+    elif fetcher != "http":
+        raise ValueError(f"Unknown fetcher: {fetcher}")
+    return session
@@ -0,0 +1,86 @@
+import hashlib
+import logging
+import re
+from collections import OrderedDict
+
+from langchain_core.messages import HumanMessage
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+
+logger = logging.getLogger(__name__)
+
+WORD = re.compile(r"[a-z0-9']+")
+# Words that only make sense with an earlier turn: "is it open on Sundays?", "what about there?"
+REFERRING_WORDS = frozenset(
+    "it its it's this that these those they them their theirs there he she him her his "
+    "one ones former latter same such above previous earlier else".split()
+)
+# Openings that continue the previous question: "and for kids?", "what about Goa?"
+FOLLOW_UP_OPENINGS = ("and ", "also ", "what about", "how about", "what else", "anything else", "more ", "tell me more")
+# Questions this short rarely say enough to search on their own
+MIN_SELF_CONTAINED_WORDS = 3
+
+REWRITE_PROMPT = ChatPromptTemplate.from_messages([
+    MessagesPlaceholder(variable_name="chat_history"),
+    ("user", "{input}"),
+    ("user", "Given the above conversation, generate a search query to look up in order to get information relevant to the conversation"),
+])
+
+
+def needs_rewrite(question: str, chat_history: list) -> bool:
+    """
+    Whether the question refers back to earlier turns, so searching for it
+    as asked would miss: a pronoun or "there", a follow-up opening such as
+    "what about", or a question of only a word or two. The first question
+    of a conversation never needs one.
+    """
+    if not any(isinstance(message, HumanMessage) for message in chat_history):
+        return False
+    text = question.lower().strip()
+    words = WORD.findall(text)
+    if len(words) < MIN_SELF_CONTAINED_WORDS or text.startswith(FOLLOW_UP_OPENINGS):
+        return True
+    return any(word in REFERRING_WORDS for word in words)
+
+
+class QueryRewriter:
+    """
+    Turns a follow-up question into a standalone search query with one LLM
+    call, and only for questions `needs_rewrite()` flags; the others are
+    searched as asked. Rewrites are remembered for the conversation (one
+    rewriter per session), keyed by the question and the last
+    `history_turns` messages.
+    """
+
+    def __init__(self, llm, prompt=REWRITE_PROMPT, history_turns: int = 4, max_entries: int = 64):
+        self._chain = prompt | llm | StrOutputParser()
+        self.history_turns = history_turns
+        self.max_entries = max_entries
+        self._rewrites = OrderedDict()
+        self._counters = {"skipped": 0, "rewrites": 0, "hits": 0}
+
+    def _key(self, question: str, chat_history: list) -> str:
+        recent = chat_history[-self.history_turns:]
+        text = "\n".join([question.strip().lower()] + [f"{message.type}: {message.content}" for message in recent])
+        return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+    def rewrite(self, question: str, chat_history: list) -> str:
+        if not needs_rewrite(question, chat_history):
+            self._counters["skipped"] += 1
+            return question
+        key = self._key(question, chat_history)
+        query = self._rewrites.get(key)
+        if query is not None:
+            self._rewrites.move_to_end(key)
+            self._counters["hits"] += 1
+            return query
+        query = self._chain.invoke({"chat_history": chat_history, "input": question}).strip() or question
+        self._counters["rewrites"] += 1
+        logger.debug("Rewrote a follow-up question as a standalone query.")
+        self._rewrites[key] = query
+        while len(self._rewrites) > self.max_entries:
+            self._rewrites.popitem(last=False)
+        return query
+
+    def stats(self) -> dict:
+        return {**self._counters, "cached": len(self._rewrites)}
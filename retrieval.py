@@ -0,0 +1,151 @@
+import logging
+import math
+import re
+import threading
+from collections import Counter, defaultdict
+from typing import Any, Optional
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from indexer import chunk_id
+
+logger = logging.getLogger(__name__)
+
+TOKEN = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from how i in is it me my of on or the to was what when where "
+    "which who why will with you your".split()
+)
+
+
+def tokenize(text: str) -> list:
+    return [token for token in TOKEN.findall(text.lower()) if token not in STOPWORDS]
+
+
+def document_key(document) -> str:
+    """
+    The chunk's ID as the indexer assigns it, used to match the same chunk
+    across result lists.
+    """
+    return chunk_id(document.metadata.get("source", ""), document.page_content)
+
+
+class BM25Index:
+    """
+    In-process inverted index over the chunks of the vector store, scored
+    with Okapi BM25. Catches exact names, dishes and places that embedding
+    similarity ranks too low.
+    """
+
+    def __init__(self, documents: list, k1: float = 1.5, b: float = 0.75):
+        self.documents = documents
+        self.k1 = k1
+        postings = defaultdict(lambda: ([], []))
+        lengths = []
+        for i, document in enumerate(documents):
+            counts = Counter(tokenize(document.page_content))
+            lengths.append(sum(counts.values()))
+            for term, count in counts.items():
+                postings[term][0].append(i)
+                postings[term][1].append(count)
+        lengths = np.array(lengths, dtype=np.float64)
+        average = lengths.mean() if len(lengths) and lengths.mean() else 1.0
+        self._norm = k1 * (1 - b + b * lengths / average)
+        self._postings = {}
+        for term, (ids, counts) in postings.items():
+            idf = math.log(1 + (len(documents) - len(ids) + 0.5) / (len(ids) + 0.5))
+            self._postings[term] = (np.array(ids), np.array(counts, dtype=np.float64), idf)
+
+    @classmethod
+    def from_vector_store(cls, vector_store, **kwargs):
+        data = vector_store.get(include=["documents", "metadatas"])
+        documents = [
+            Document(page_content=text, metadata=metadata or {})
+            for text, metadata in zip(data["documents"], data["metadatas"])
+        ]
+        logger.info(f"Built BM25 index over {len(documents)} chunks.")
+        return cls(documents, **kwargs)
+
+    def search(self, query: str, k: int) -> list:
+        """
+        Up to `k` documents matching `query`, best first.
+        """
+        if not self.documents:
+            return []
+        scores = np.zeros(len(self.documents))
+        for term in set(tokenize(query)):
+            if term in self._postings:
+                ids, counts, idf = self._postings[term]
+                scores[ids] += idf * counts * (self.k1 + 1) / (counts + self._norm[ids])
+        matched = np.flatnonzero(scores)
+        top = matched[np.argsort(-scores[matched], kind="stable")[:k]]
+        return [self.documents[i] for i in top]
+
+
+def reciprocal_rank_fusion(result_lists: list, k: int = 60) -> list:
+    """
+    Merge ranked document lists: each document scores sum(1 / (k + rank))
+    over the lists it appears in, which needs no score calibration between
+    BM25 and cosine similarity.
+    """
+    scores, documents = defaultdict(float), {}
+    for results in result_lists:
+        for rank, document in enumerate(results, start=1):
+            key = document_key(document)
+            scores[key] += 1 / (k + rank)
+            documents.setdefault(key, document)
+    return [documents[key] for key in sorted(scores, key=scores.get, reverse=True)]
+
+
+class CrossEncoderReranker:
+    """
+    Re-scores (question, chunk) pairs with a small cross-encoder, loaded on
+    first use. Needs sentence-transformers.
+    """
+
+    def __init__(self, model_name: str = "cross-encoder/ms-marco-MiniLM-L-6-v2"):
+        self.model_name = model_name
+        self._model = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    from sentence_transformers import CrossEncoder
+                    self._model = CrossEncoder(self.model_name)
+                    logger.info(f"Loaded reranker {self.model_name}.")
+        return self._model
+
+    def rerank(self, query: str, documents: list, top_n: int) -> list:
+        if not documents:
+            return []
+        scores = self.load().predict([(query, document.page_content) for document in documents])
+        order = np.argsort(-np.asarray(scores), kind="stable")[:top_n]
+        return [documents[i] for i in order]
+
+
+class HybridRetriever(BaseRetriever):
+    """
+    Vector similarity search and BM25 over the same chunks, fused with
+    reciprocal rank fusion. Each side fetches `fetch_k` candidates; the
+    fused list, or the reranker's ordering of it, is cut to `k` chunks for
+    the prompt.
+    """
+
+    vector_store: Any
+    bm25: BM25Index
+    k: int = 4
+    fetch_k: int = 20
+    rrf_k: int = 60
+    reranker: Optional[Any] = None
+
+    def _get_relevant_documents(self, query: str, *, run_manager=None) -> list:
+        vector_results = self.vector_store.similarity_search(query, k=self.fetch_k)
+        keyword_results = self.bm25.search(query, self.fetch_k)
+        fused = reciprocal_rank_fusion([vector_results, keyword_results], k=self.rrf_k)
+        if self.reranker is not None:
+            return self.reranker.rerank(query, fused[:self.fetch_k], self.k)
+        return fused[:self.k]
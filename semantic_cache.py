@@ -0,0 +1,109 @@
+import logging
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+CacheLookup = namedtuple("CacheLookup", ["answer", "vector", "generation", "similarity"])
+
+
+class SemanticCache:
+    """
+    Answer cache keyed by question meaning rather than exact text.
+
+    Questions are embedded with the same model as the index; a stored
+    question whose cosine similarity to the new one reaches `threshold`
+    returns its answer without retrieval or an LLM call. Answers are only
+    shared within a `namespace` (one per pipeline, whose prompts differ). Entries expire after
+    `ttl` seconds, the least recently used entry is evicted once
+    `max_entries` is reached, and `invalidate()` drops everything when the
+    vector store is re-indexed.
+    """
+
+    def __init__(self, embedding_model, threshold: float = 0.9, ttl: float = 3600.0, max_entries: int = 1000):
+        self.embedding_model = embedding_model
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._vectors = None  # (max_entries, dim) unit vectors, one row per slot
+        self._entries = OrderedDict()  # slot -> (question, answer, expires_at, namespace), LRU order
+        self._free_slots = list(range(max_entries - 1, -1, -1))
+        self._generation = 0
+        self._counters = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "expirations": 0, "invalidations": 0}
+
+    def _embed(self, question: str) -> np.ndarray:
+        vector = np.asarray(self.embedding_model.embed_query(question), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _drop(self, slot: int, counter: str):
+        del self._entries[slot]
+        self._free_slots.append(slot)
+        self._counters[counter] += 1
+
+    def lookup(self, question: str, namespace: str = "") -> CacheLookup:
+        """
+        Return a CacheLookup whose `answer` is None on a miss. Pass the
+        lookup back to `store()` so the question is not embedded twice.
+        """
+        vector = self._embed(question)
+        with self._lock:
+            generation = self._generation
+            now = time.monotonic()
+            for slot in [slot for slot, entry in self._entries.items() if entry[2] <= now]:
+                self._drop(slot, "expirations")
+            slots = [slot for slot, entry in self._entries.items() if entry[3] == namespace]
+            if slots:
+                slots = np.asarray(slots, dtype=np.int64)
+                similarities = self._vectors[slots] @ vector
+                best = int(np.argmax(similarities))
+                similarity = float(similarities[best])
+                if similarity >= self.threshold:
+                    slot = int(slots[best])
+                    self._entries.move_to_end(slot)
+                    self._counters["hits"] += 1
+                    logger.debug(f"Semantic cache hit ({similarity:.3f}).")
+                    return CacheLookup(self._entries[slot][1], vector, generation, similarity)
+            self._counters["misses"] += 1
+            return CacheLookup(None, vector, generation, None)
+
+    def store(self, question: str, answer: str, lookup: CacheLookup = None, namespace: str = ""):
+        """
+        Cache `answer` for `question` in `namespace`. Answers produced before the last
+        invalidation are discarded, since they came from the old index.
+        """
+        vector = lookup.vector if lookup is not None else self._embed(question)
+        with self._lock:
+            if lookup is not None and lookup.generation != self._generation:
+                return
+            if self._vectors is None:
+                self._vectors = np.zeros((self.max_entries, vector.shape[0]), dtype=np.float32)
+            if not self._free_slots:
+                self._drop(next(iter(self._entries)), "evictions")
+            slot = self._free_slots.pop()
+            self._vectors[slot] = vector
+            self._entries[slot] = (question, answer, time.monotonic() + self.ttl, namespace)
+            self._counters["stores"] += 1
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+            self._free_slots = list(range(self.max_entries - 1, -1, -1))
+            self._generation += 1
+            self._counters["invalidations"] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._counters["hits"] + self._counters["misses"]
+            return {
+                **self._counters,
+                "entries": len(self._entries),
+                "hit_rate": round(self._counters["hits"] / lookups, 3) if lookups else 0.0,
+                "threshold": self.threshold,
+                "ttl_s": self.ttl,
+                "max_entries": self.max_entries,
+            }
@@ -0,0 +1,214 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+
+from langchain_core.prompts import ChatPromptTemplate
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", """
+    You maintain a running summary of a conversation between a user and a travel assistant.
+    Merge the new turns into the existing summary. Keep destinations, dishes, dates, preferences
+    and open questions; drop greetings and filler. Answer with the updated summary only.
+    """),
+    ("user", "Existing summary:\n{summary}\n\nNew turns:\n{turns}"),
+])
+
+
+def estimate_tokens(text: str) -> int:
+    # Roughly four characters per token for English text with Llama tokenizers.
+    return len(text) // 4 + 1
+
+
+@dataclass
+class Session:
+    session_id: str
+    summary: str = ""
+    turns: list = field(default_factory=list)
+    updated_at: float = field(default_factory=time.time)
+
+
+class InMemorySessionStore:
+    """
+    Keeps the `max_sessions` most recently used sessions in process memory.
+    """
+
+    def __init__(self, max_sessions: int = 1000):
+        self.max_sessions = max_sessions
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str):
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None:
+                self._sessions.move_to_end(session_id)
+            return session
+
+    def save(self, session: Session):
+        with self._lock:
+            self._sessions[session.session_id] = session
+            self._sessions.move_to_end(session.session_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+
+class SQLiteSessionStore:
+    """
+    Persists sessions in a SQLite file so they survive restarts and can be
+    shared by several workers on one host.
+    """
+
+    def __init__(self, path: str = "sessions.db", max_age: float = 7 * 24 * 3600):
+        self.path = path
+        self.max_age = max_age
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                "session_id TEXT PRIMARY KEY, summary TEXT, turns TEXT, updated_at REAL)"
+            )
+            conn.execute("DELETE FROM sessions WHERE updated_at < ?", (time.time() - max_age,))
+
+    def _connect(self):
+        # sqlite3 connections may not be shared across threads.
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, session_id: str):
+        row = self._connect().execute(
+            "SELECT summary, turns, updated_at FROM sessions WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return Session(session_id, summary=row[0], turns=json.loads(row[1]), updated_at=row[2])
+
+    def save(self, session: Session):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO sessions VALUES (?, ?, ?, ?)",
+                (session.session_id, session.summary, json.dumps(session.turns), session.updated_at),
+            )
+
+    def __len__(self) -> int:
+        return self._connect().execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+
+def make_session_store(backend: str = "memory", **options):
+    if backend == "memory":
+        return InMemorySessionStore(**options)
+    if backend == "sqlite":
+        return SQLiteSessionStore(**options)
+    raise ValueError(f"Unknown session backend: {backend}")
+
+
+class ConversationMemory:
+    """
+    Per-session chat history with a token budget.
+
+    Recent turns are kept verbatim up to `history_token_budget`; older turns
+    are folded into a running summary, so the history sent to the LLM stays
+    roughly constant in size however long the conversation runs.
+    `llm_provider` returns the chat model used for summaries, or None to
+    fall back to keeping the tail of the old turns. `llm_slot`, if given,
+    returns a context manager each summary call is made in (see
+    admission.AdmissionController.slot).
+    """
+
+    def __init__(self, store, llm_provider=None, history_token_budget: int = 1500,
+                 summary_token_budget: int = 300, llm_slot=None):
+        self.store = store
+        self.llm_provider = llm_provider
+        self.llm_slot = llm_slot
+        self.history_token_budget = history_token_budget
+        self.summary_token_budget = summary_token_budget
+        self._lock = threading.Lock()
+        self._compacting = set()
+
+    @staticmethod
+    def new_session_id() -> str:
+        return uuid.uuid4().hex
+
+    def get(self, session_id: str) -> Session:
+        return self.store.get(session_id) or Session(session_id)
+
+    def history(self, session_id: str) -> list:
+        """
+        Messages for the prompt's chat_history: the summary, then recent turns.
+        """
+        session = self.get(session_id)
+        messages = []
+        if session.summary:
+            messages.append({"role": "system", "content": f"Summary of the earlier conversation: {session.summary}"})
+        messages.extend(session.turns)
+        return messages
+
+    def add_turn(self, session_id: str, question: str, answer: str):
+        with self._lock:
+            session = self.get(session_id)
+            session.turns.append({"role": "user", "content": question})
+            session.turns.append({"role": "assistant", "content": answer})
+            session.updated_at = time.time()
+            self.store.save(session)
+
+    def _summarize(self, summary: str, turns: list) -> str:
+        transcript = "\n".join(f"{turn['role']}: {turn['content']}" for turn in turns)
+        llm = self.llm_provider() if self.llm_provider else None
+        if llm is not None:
+            try:
+                with self.llm_slot() if self.llm_slot else nullcontext():
+                    return (SUMMARY_PROMPT | llm).invoke({"summary": summary or "(none)", "turns": transcript}).content
+            except Exception as e:
+                logger.error(f"Error summarizing conversation, keeping the tail instead: {e}")
+        # Without an LLM, keep the most recent part of the old turns.
+        return f"{summary}\n{transcript}".strip()[-self.summary_token_budget * 4:]
+
+    def compact(self, session_id: str):
+        """
+        Fold the oldest turns into the summary until the rest fit the budget.
+        Meant to run after the response has been sent.
+        """
+        with self._lock:
+            if session_id in self._compacting:
+                return
+            self._compacting.add(session_id)
+        try:
+            self._compact(session_id)
+        finally:
+            with self._lock:
+                self._compacting.discard(session_id)
+
+    def _compact(self, session_id: str):
+        session = self.get(session_id)
+        turns = list(session.turns)
+        used = sum(estimate_tokens(turn["content"]) for turn in turns)
+        old_turns = []
+        # Drop whole question/answer pairs, always keeping the latest one.
+        while used > self.history_token_budget and len(turns) > 2:
+            pair, turns = turns[:2], turns[2:]
+            old_turns.extend(pair)
+            used -= sum(estimate_tokens(turn["content"]) for turn in pair)
+        if not old_turns:
+            return
+        summary = self._summarize(session.summary, old_turns)
+        with self._lock:
+            # Turns added while the summary was generated are kept as they are.
+            latest = self.get(session_id)
+            latest.turns = latest.turns[len(old_turns):]
+            latest.summary = summary
+            self.store.save(latest)
+        logger.info(f"Summarized {len(old_turns)} turns of session {session_id}.")
@@ -58,6 +58,103 @@ document.addEventListener("DOMContentLoaded", function () {
     chatWidget.style.display = "none";
   });
 
+  // The server keeps the chat history per session; remember ours across page loads
+  const SESSION_KEY = "travellofoodie-session-id";
+
+  // Set when the last answer asked whether to search external sources;
+  // the next message is the user's reply to that question.
+  let awaitingConsent = false;
+
+  // Read a server-sent event stream, calling onEvent(name, payload) for
+  // every event before `done`; resolves with the `done` payload.
+  async function readEvents(response, onEvent) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = "";
+
+    while (true) {
+      const { value, done } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+
+      // Events are separated by a blank line; keep any partial event buffered
+      const events = buffer.split("\n\n");
+      buffer = events.pop();
+      for (const rawEvent of events) {
+        let eventName = "message";
+        let data = "";
+        for (const line of rawEvent.split("\n")) {
+          if (line.startsWith("event: ")) eventName = line.slice(7);
+          else if (line.startsWith("data: ")) data += line.slice(6);
+        }
+        // Keep-alive comments carry no data
+        if (!data) continue;
+        const payload = JSON.parse(data);
+        if (eventName === "error") throw new Error(payload.error);
+        if (eventName === "done") {
+          if (payload.session_id) localStorage.setItem(SESSION_KEY, payload.session_id);
+          return payload;
+        }
+        onEvent(eventName, payload);
+      }
+    }
+    return null;
+  }
+
+  // Post a question to the streaming endpoint and call onToken for every
+  // server-sent token.
+  async function streamResponse(question, onToken) {
+    const response = await fetch("/stream_response/", {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({
+        question: question,
+        session_id: localStorage.getItem(SESSION_KEY),
+      }),
+    });
+    if (response.status === 429) {
+      // The LLM backend is saturated; the body says when to try again
+      const payload = await response.json();
+      onToken(payload.answer);
+      return;
+    }
+    if (!response.ok || !response.body) {
+      throw new Error(`Streaming request failed with status ${response.status}`);
+    }
+    const done = await readEvents(response, (eventName, payload) => onToken(payload.token));
+    awaitingConsent = Boolean(done && done.consent);
+  }
+
+  // Send the reply to the external-sources question. A "yes" queues a crew
+  // job; follow its progress events and render the answer when it is done.
+  async function handleConsent(reply, onProgress, onToken) {
+    awaitingConsent = false;
+    const response = await fetch("/handle_consent/", {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({
+        question: reply,
+        session_id: localStorage.getItem(SESSION_KEY),
+      }),
+    });
+    const payload = await response.json();
+    if (!payload.job_id) {
+      onToken(payload.answer);
+      return;
+    }
+
+    onProgress(payload.answer);
+    const events = await fetch(payload.events_url);
+    if (!events.ok || !events.body) {
+      throw new Error(`Job events request failed with status ${events.status}`);
+    }
+    const done = await readEvents(events, (eventName, event) => {
+      if (eventName === "progress") onProgress(event.message);
+    });
+    if (!done) throw new Error("Job events ended before the job finished");
+    onToken(done.answer);
+  }
+
   // Function to handle sending a message
   function sendMessage() {
     const userMessage = chatInput.value.trim();
@@ -108,18 +205,16 @@ document.addEventListener("DOMContentLoaded", function () {
 
     chatMessages.scrollTop = chatMessages.scrollHeight;
 
-    // Send the user's message to the backend
-    fetch("/get_response/", {
-      method: "POST",
-      headers: { "Content-Type": "application/json" },
-      body: JSON.stringify({ question: userMessage }),
-    })
-      .then(response => response.json())
-      .then(data => {
-        // Remove the typing indicator once the AI response is ready
+    // Stream the answer from the backend and render tokens as they arrive
+    let aiContent = null;
+    // Tokens carry their own spaces and newlines; reading innerText back would drop them
+    let answer = "";
+
+    function appendToken(token) {
+      if (!aiContent) {
+        // Replace the typing indicator with the AI response on the first token
         typingIndicator.remove();
 
-        // Add the AI response
         const aiResponseElement = document.createElement("div");
         aiResponseElement.classList.add("message", "ai");
 
@@ -130,18 +225,30 @@ document.addEventListener("DOMContentLoaded", function () {
         aiImg.alt = "AI";
         aiIcon.appendChild(aiImg);
 
-        const aiContent = document.createElement("div");
+        aiContent = document.createElement("div");
         aiContent.classList.add("content");
-        aiContent.innerText = data.answer;
 
         aiResponseElement.appendChild(aiIcon);
         aiResponseElement.appendChild(aiContent);
         chatMessages.appendChild(aiResponseElement);
+      }
+      answer += token;
+      aiContent.textContent = answer;
+      chatMessages.scrollTop = chatMessages.scrollHeight;
+    }
 
-        chatMessages.scrollTop = chatMessages.scrollHeight;
-      })
+    function showProgress(message) {
+      typingContent.innerText = message;
+      chatMessages.scrollTop = chatMessages.scrollHeight;
+    }
+
+    const reply = awaitingConsent
+      ? handleConsent(userMessage, showProgress, appendToken)
+      : streamResponse(userMessage, appendToken);
+    reply
       .catch(error => {
         console.error("Error:", error);
+        typingIndicator.remove();
 
         // Add an error message
         const errorElement = document.createElement("div");
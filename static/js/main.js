@@ -16,6 +16,58 @@ document.addEventListener("DOMContentLoaded", function () {
       chatWidget.style.display = "none";
     });
   
+    // The server keeps the chat history per session; remember ours across page loads
+    const SESSION_KEY = "travellofoodie-session-id";
+  
+    // Post a question to the streaming endpoint and call onToken for every
+    // server-sent token; resolves with the full answer.
+    async function streamResponse(question, onToken) {
+      const response = await fetch("/stream_response/", {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({
+          question: question,
+          session_id: localStorage.getItem(SESSION_KEY),
+        }),
+      });
+      if (!response.ok || !response.body) {
+        throw new Error(`Streaming request failed with status ${response.status}`);
+      }
+  
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = "";
+      let answer = "";
+  
+      while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+  
+        // Events are separated by a blank line; keep any partial event buffered
+        const events = buffer.split("\n\n");
+        buffer = events.pop();
+        for (const rawEvent of events) {
+          let eventName = "message";
+          let data = "";
+          for (const line of rawEvent.split("\n")) {
+            if (line.startsWith("event: ")) eventName = line.slice(7);
+            else if (line.startsWith("data: ")) data += line.slice(6);
+          }
+          if (!data) continue;
+          const payload = JSON.parse(data);
+          if (eventName === "error") throw new Error(payload.error);
+          if (eventName === "done") {
+            if (payload.session_id) localStorage.setItem(SESSION_KEY, payload.session_id);
+            return payload.answer;
+          }
+          answer += payload.token;
+          onToken(payload.token);
+        }
+      }
+      return answer;
+    }
+  
     // Function to handle sending a message
     function sendMessage() {
       const userMessage = chatInput.value.trim();
@@ -68,18 +120,16 @@ document.addEventListener("DOMContentLoaded", function () {
   
       chatMessages.scrollTop = chatMessages.scrollHeight;
   
-      // Send the user's message to the backend
-      fetch("/get_response/", {
-        method: "POST",
-        headers: { "Content-Type": "application/json" },
-        body: JSON.stringify({ question: userMessage }),
-      })
-        .then(response => response.json())
-        .then(data => {
-          // Remove the typing indicator once the AI response is ready
+      // Stream the answer from the backend and render tokens as they arrive
+      let aiContent = null;
+      // Tokens carry their own spaces and newlines; reading innerText back would drop them
+      let answer = "";
+  
+      function appendToken(token) {
+        if (!aiContent) {
+          // Replace the typing indicator with the AI response on the first token
           typingIndicator.remove();
   
-          // Add the AI response
           const aiResponseElement = document.createElement("div");
           aiResponseElement.classList.add("message", "ai");
   
@@ -90,18 +140,22 @@ document.addEventListener("DOMContentLoaded", function () {
           aiImg.alt = "AI";
           aiIcon.appendChild(aiImg);
   
-          const aiContent = document.createElement("div");
+          aiContent = document.createElement("div");
           aiContent.classList.add("content");
-          aiContent.innerText = data.answer;
   
           aiResponseElement.appendChild(aiIcon);
           aiResponseElement.appendChild(aiContent);
           chatMessages.appendChild(aiResponseElement);
+        }
+        answer += token;
+        aiContent.textContent = answer;
+        chatMessages.scrollTop = chatMessages.scrollHeight;
+      }
   
-          chatMessages.scrollTop = chatMessages.scrollHeight;
-        })
+      streamResponse(userMessage, appendToken)
         .catch(error => {
           console.error("Error:", error);
+          typingIndicator.remove();
   
           // Add an error message
           const errorElement = document.createElement("div");
@@ -0,0 +1,65 @@
+import json
+
+from fastapi.responses import StreamingResponse
+
+# Headers that stop proxies (e.g. nginx) from buffering the event stream
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+def sse_event(data: dict, event: str = None) -> str:
+    """
+    Format one server-sent event with a JSON payload.
+    """
+    message = f"event: {event}\n" if event else ""
+    return f"{message}data: {json.dumps(data)}\n\n"
+
+
+async def stream_answer_tokens(chain, inputs: dict, config: dict = None):
+    """
+    Yield the answer tokens of a retrieval chain as the LLM produces them.
+    """
+    async for chunk in chain.astream(inputs, config=config):
+        token = chunk.get("answer")
+        if token:
+            yield token
+
+
+async def stream_text(answer: str, session_id: str = None):
+    """
+    Stream an already complete answer (cached or canned) as a single token.
+    """
+    yield sse_event({"token": answer})
+    yield sse_event({"answer": answer, "session_id": session_id}, event="done")
+
+
+class ReleasingStreamingResponse(StreamingResponse):
+    """
+    A StreamingResponse that holds something (an LLM admission slot) for as
+    long as it streams, and calls `release()` exactly once: when the body
+    ends or is closed, or when the response ends without it, e.g. the client
+    went away before the first chunk or sending the headers failed.
+    """
+
+    def __init__(self, content, release, **kwargs):
+        self._release = release
+        self._released = False
+        super().__init__(self._releasing(content), **kwargs)
+
+    def _release_once(self):
+        if not self._released:
+            self._released = True
+            self._release()
+
+    async def _releasing(self, content):
+        # Released as soon as the body is done, before any background task runs
+        try:
+            async for chunk in content:
+                yield chunk
+        finally:
+            self._release_once()
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self._release_once()
@@ -1,5 +1,7 @@
 # pip install streamlit langchain lanchain-openai beautifulsoup4 python-dotenv chromadb
 
+import os
+
 import streamlit as st
 from langchain_core.messages import AIMessage, HumanMessage
 from langchain_community.document_loaders import WebBaseLoader
@@ -8,15 +10,29 @@ from langchain_community.vectorstores import Chroma
 from langchain_openai import OpenAIEmbeddings, ChatOpenAI
 from dotenv import load_dotenv
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
-from langchain.chains import create_history_aware_retriever, create_retrieval_chain
+from langchain_core.runnables import RunnableLambda
+from langchain.chains import create_retrieval_chain
 from langchain.chains.combine_documents import create_stuff_documents_chain
-from langchain_groq import ChatGroq
 from langchain.embeddings import HuggingFaceEmbeddings
-persist_directory = "./chroma_db"
-embedding_model = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
+from embedding_cache import CachedEmbeddings
+from index_cache import IndexCache
+from providers import make_llm
+from query_rewrite import QueryRewriter
 load_dotenv()
 
-def get_vectorstore_from_url(url):
+# One index per website, shared by every session; see index_cache.IndexCache.
+# At most MAX_LOADED_SITES are kept open, the others are reopened from disk.
+SITE_INDEX_DIR = os.getenv("SITE_INDEX_DIR", "./chroma_sites")
+MAX_LOADED_SITES = int(os.getenv("MAX_LOADED_SITES", "8"))
+# Read from the environment or .env, like the FastAPI service
+GROQ_API_KEY = os.getenv("GROQ_API_KEY")
+
+# st.cache_resource objects are created once per process, not on every rerun or session
+@st.cache_resource
+def get_embedding_model():
+    return CachedEmbeddings(HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2"), "all-MiniLM-L6-v2")
+
+def get_vectorstore_from_url(url, persist_directory, collection_name):
     # get the text in document form
     loader = WebBaseLoader(url)
     document = loader.load()
@@ -26,51 +42,69 @@ def get_vectorstore_from_url(url):
     document_chunks = text_splitter.split_documents(document)
     
     # create a vectorstore from the chunks
-    vector_store = Chroma.from_documents(document_chunks,embedding_model, persist_directory=persist_directory)
+    vector_store = Chroma.from_documents(
+        document_chunks,
+        get_embedding_model(),
+        collection_name=collection_name,
+        persist_directory=persist_directory,
+    )
 
     return vector_store
 
-def get_context_retriever_chain(vector_store):
-    llm = ChatGroq(
+def load_vectorstore(persist_directory, collection_name):
+    vector_store = Chroma(
+        collection_name=collection_name,
+        persist_directory=persist_directory,
+        embedding_function=get_embedding_model(),
+    )
+    # An empty collection means the build never finished
+    return vector_store if vector_store._collection.count() else None
+
+@st.cache_resource
+def get_index_cache():
+    return IndexCache(
+        build=get_vectorstore_from_url,
+        load=load_vectorstore,
+        directory=SITE_INDEX_DIR,
+        max_loaded=MAX_LOADED_SITES,
+    )
+
+# One LLM client for the whole process: query rewrites and answers, in every session
+@st.cache_resource
+def get_llm():
+    return make_llm(
+        "groq",
         model="llama-3.1-8b-instant",
         temperature=0.0,
         max_retries=2,
-        api_key="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"
+        api_key=GROQ_API_KEY,
     )
-    
+
+def get_context_retriever_chain(vector_store, query_rewriter):
     retriever = vector_store.as_retriever()
     
-    prompt = ChatPromptTemplate.from_messages([
-      MessagesPlaceholder(variable_name="chat_history"),
-      ("user", "{input}"),
-      ("user", "Given the above conversation, generate a search query to look up in order to get information relevant to the conversation")
-    ])
-    
-    retriever_chain = create_history_aware_retriever(llm, retriever, prompt)
+    # Only follow-ups that refer back to earlier turns cost an LLM call to rewrite;
+    # other questions are searched as asked. See query_rewrite.needs_rewrite().
+    retriever_chain = RunnableLambda(
+        lambda inputs: retriever.invoke(query_rewriter.rewrite(inputs["input"], inputs["chat_history"]))
+    )
     
     return retriever_chain
     
 def get_conversational_rag_chain(retriever_chain): 
     
-    llm = ChatGroq(
-        model="llama-3.1-8b-instant",
-        temperature=0.0,
-        max_retries=2,
-        api_key="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"
-    )
-    
     prompt = ChatPromptTemplate.from_messages([
       ("system", "Answer the user's questions based on the below context:\n\n{context}"),
       MessagesPlaceholder(variable_name="chat_history"),
       ("user", "{input}"),
     ])
     
-    stuff_documents_chain = create_stuff_documents_chain(llm,prompt)
+    stuff_documents_chain = create_stuff_documents_chain(get_llm(),prompt)
     
     return create_retrieval_chain(retriever_chain, stuff_documents_chain)
 
-def get_response(user_input):
-    retriever_chain = get_context_retriever_chain(st.session_state.vector_store)
+def get_response(user_input, vector_store):
+    retriever_chain = get_context_retriever_chain(vector_store, st.session_state.query_rewriter)
     conversation_rag_chain = get_conversational_rag_chain(retriever_chain)
     
     response = conversation_rag_chain.invoke({
@@ -84,6 +118,10 @@ def get_response(user_input):
 st.set_page_config(page_title="Chat with websites", page_icon="🤖")
 st.title("Chat with websites")
 
+if not GROQ_API_KEY:
+    st.error("GROQ_API_KEY is not set. Add it to the environment or to a .env file and restart the app.")
+    st.stop()
+
 # sidebar
 with st.sidebar:
     st.header("Settings")
@@ -93,18 +131,27 @@ if website_url is None or website_url == "":
     st.info("Please enter a website URL")
 
 else:
-    # session state
-    if "chat_history" not in st.session_state:
+    # session state; a new website starts a new conversation
+    if "chat_history" not in st.session_state or st.session_state.get("website_url") != website_url:
         st.session_state.chat_history = [
             AIMessage(content="Hello, I am a bot. How can I help you?"),
         ]
-    if "vector_store" not in st.session_state:
-        st.session_state.vector_store = get_vectorstore_from_url(website_url)    
+        st.session_state.website_url = website_url
+        st.session_state.query_rewriter = QueryRewriter(get_llm())
+    index_cache = get_index_cache()
+    try:
+        # Built once per website for all sessions; later sessions open it from the cache
+        with st.spinner("Indexing the website..."), index_cache.open(website_url):
+            pass
+    except ValueError as e:
+        st.error(str(e))
+        st.stop()
 
     # user input
     user_query = st.chat_input("Type your message here...")
     if user_query is not None and user_query != "":
-        response = get_response(user_query)
+        with index_cache.open(website_url) as vector_store:
+            response = get_response(user_query, vector_store)
         st.session_state.chat_history.append(HumanMessage(content=user_query))
         st.session_state.chat_history.append(AIMessage(content=response))
         
@@ -25,5 +25,5 @@ travel_itinerary_write_task = Task(
   tools=[any_website_tool],
   agent=travel_itinerary_writer,
   async_execution=False,
-  output_file='new-travel-itinerary-post.md'  # Example of output customization
+  # No output_file: itineraries.ItineraryStore writes one file per topic
 )
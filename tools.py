@@ -7,7 +7,3 @@ from crewai_tools import WebsiteSearchTool, SerperDevTool
 
 any_website_tool = WebsiteSearchTool()
 
-
-
-
-specific_website_tool = WebsiteSearchTool(website='https://example.com')
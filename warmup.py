@@ -0,0 +1,101 @@
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+COLD, WARMING, READY, FAILED = "cold", "warming", "ready", "failed"
+
+
+class IndexWarmer:
+    """
+    Loads or builds the vector store once, on a background thread.
+
+    `start()` is single-flight: however many callers race it, only one load
+    runs. Request handlers call `get()`, which never blocks; it returns None
+    until the index is ready, and restarts a failed load once
+    `retry_interval` seconds have passed.
+    """
+
+    def __init__(self, loader, on_ready=None, retry_interval: float = 60.0):
+        self._loader = loader
+        self._on_ready = on_ready
+        self.retry_interval = retry_interval
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self.state = COLD
+        self.vector_store = None
+        self.error = None
+        self.started_at = None
+        self.finished_at = None
+
+    def start(self) -> bool:
+        """
+        Start loading in the background; returns False if a load is already
+        running or the index is ready.
+        """
+        with self._lock:
+            if self.state in (WARMING, READY):
+                return False
+            self.state = WARMING
+            self.error = None
+            self.started_at = time.time()
+            self.finished_at = None
+        threading.Thread(target=self._warm, name="index-warmup", daemon=True).start()
+        return True
+
+    def _warm(self):
+        logger.info("Warming up the vector store in the background.")
+        try:
+            vector_store = self._loader()
+            if self._on_ready is not None:
+                self._on_ready(vector_store)
+        except Exception as e:
+            logger.error(f"Vector store warm-up failed: {e}")
+            with self._lock:
+                self.state = FAILED
+                self.error = str(e)
+                self.finished_at = time.time()
+            return
+        with self._lock:
+            self.vector_store = vector_store
+            self.state = READY
+            self.finished_at = time.time()
+        self._ready.set()
+        logger.info(f"Vector store ready after {self.finished_at - self.started_at:.1f}s.")
+
+    def replace(self, vector_store):
+        """
+        Serve `vector_store` from now on, e.g. a fresh export after a refresh.
+        """
+        with self._lock:
+            self.vector_store = vector_store
+
+    def get(self):
+        """
+        The vector store if it is ready, otherwise None (without waiting).
+        """
+        if self.state == READY:
+            return self.vector_store
+        if self.state == COLD or (self.state == FAILED and time.time() - self.finished_at >= self.retry_interval):
+            self.start()
+        return None
+
+    def wait(self, timeout: float = None):
+        """
+        Block until the index is ready (for scripts and tests).
+        """
+        self._ready.wait(timeout)
+        return self.vector_store
+
+    @property
+    def ready(self) -> bool:
+        return self.state == READY
+
+    def status(self) -> dict:
+        end = self.finished_at or time.time()
+        return {
+            "state": self.state,
+            "error": self.error,
+            "warmup_s": round(end - self.started_at, 3) if self.started_at else None,
+        }